@@ -28,8 +28,9 @@ have the following constants and methods:
 
 batch_sys.filter_poll_many_output(out) => job_ids
     * Called after the batch system's poll many command. The method should read
-      the output and return a list of job IDs that are still in the batch
-      system.
+      the output and return a list (or any iterable) of job IDs that are still
+      in the batch system. Without this method, the output is parsed line by
+      line as it is read, with column 1 being the job ID.
 
 batch_sys.filter_submit_output(out, err) => new_out, new_err
     * Filter the standard output and standard error of the job submission
@@ -112,6 +113,8 @@ batch_sys.SUBMIT_CMD_TMPL
 
 """
 
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
 import json
 import os
 import shlex
@@ -121,11 +124,14 @@ import traceback
 from shutil import rmtree
 from signal import SIGKILL
 from subprocess import DEVNULL  # nosec
+from tempfile import TemporaryFile
+from time import time
 
 from cylc.flow.task_message import (
     CYLC_JOB_PID, CYLC_JOB_INIT_TIME, CYLC_JOB_EXIT_TIME, CYLC_JOB_EXIT,
     CYLC_MESSAGE)
 from cylc.flow.cylc_subproc import procopen
+from cylc.flow.job_agent import JOBS_AGENT_PING, encode_frame, read_frame
 from cylc.flow.task_job_logs import (
     JOB_LOG_ERR, JOB_LOG_JOB, JOB_LOG_OUT, JOB_LOG_STATUS)
 from cylc.flow.task_outputs import TASK_OUTPUT_SUCCEEDED
@@ -208,6 +214,13 @@ class BatchSysManager():
     OUT_PREFIX_CMD_ERR = "[TASK JOB ERROR]"
     _INSTANCES = {}
 
+    def __init__(self, poll_cache_window=0.0):
+        # Batch system poll results, reused for poll_cache_window seconds by
+        # a long-lived instance, e.g. in a job agent:
+        # {batch_sys_name: (time, queried_ids, ids_in_batch_sys), ...}
+        self.poll_cache_window = poll_cache_window
+        self.poll_cache = {}
+
     @classmethod
     def configure_suite_run_dir(cls, suite_run_dir):
         """Add local python module paths if not already done."""
@@ -255,6 +268,61 @@ class BatchSysManager():
         return getattr(
             self._get_sys(batch_sys_name), "SHOULD_KILL_PROC_GROUP", False)
 
+    def jobs_agent(self, in_handle, out_handle):
+        """Run job commands as a job agent, until the end of in_handle.
+
+        in_handle -- Binary file handle to read request frames from.
+        out_handle -- Binary file handle to write response frames to.
+
+        Each request is {"id": ..., "args": [...], "stdin": ...}, where
+        "args" are the arguments of a "cylc jobs-*" command (without host and
+        user options) and "stdin" is its STDIN. Each response is
+        {"id": ..., "ret_code": ..., "out": ..., "err": ...}, as the command
+        would exit with.
+
+        """
+        while True:
+            request = read_frame(in_handle)
+            if request is None:
+                break
+            ret_code = 0
+            out, err = StringIO(), StringIO()
+            with redirect_stdout(out), redirect_stderr(err):
+                try:
+                    self._jobs_agent_run(request['args'], request['stdin'])
+                except SystemExit as exc:
+                    ret_code = exc.code if isinstance(exc.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                    ret_code = 1
+            out_handle.write(encode_frame({
+                'id': request['id'],
+                'ret_code': ret_code,
+                'out': out.getvalue(),
+                'err': err.getvalue()}))
+            out_handle.flush()
+
+    def _jobs_agent_run(self, args, stdin_str):
+        """Run a job command for self.jobs_agent."""
+        cmd_key = args[0]
+        if cmd_key == JOBS_AGENT_PING:
+            return
+        opts = args[1:args.index('--')]
+        job_log_root, *job_log_dirs = args[args.index('--') + 1:]
+        if cmd_key == 'jobs-kill':
+            self.jobs_kill(job_log_root, job_log_dirs)
+        elif cmd_key == 'jobs-poll':
+            self.jobs_poll(job_log_root, job_log_dirs)
+        elif cmd_key == 'jobs-submit':
+            self.jobs_submit(
+                job_log_root,
+                job_log_dirs,
+                remote_mode='--remote-mode' in opts,
+                utc_mode='--utc-mode' in opts,
+                stdin=StringIO(stdin_str or ''))
+        else:
+            raise ValueError('%s: unknown job command' % cmd_key)
+
     def jobs_kill(self, job_log_root, job_log_dirs):
         """Kill multiple jobs.
 
@@ -341,13 +409,15 @@ class BatchSysManager():
                 ctx.get_summary_str()))
 
     def jobs_submit(self, job_log_root, job_log_dirs, remote_mode=False,
-                    utc_mode=False):
+                    utc_mode=False, stdin=None):
         """Submit multiple jobs.
 
         job_log_root -- The log/job/ sub-directory of the suite.
         job_log_dirs -- A list containing point/name/submit_num for task jobs.
         remote_mode -- am I running on the remote job host?
         utc_mode -- is the suite running in UTC mode?
+        stdin -- file handle to read job files from in remote mode, default
+                 is sys.stdin.
 
         """
         if "$" in job_log_root:
@@ -355,7 +425,8 @@ class BatchSysManager():
         self.configure_suite_run_dir(job_log_root.rsplit(os.sep, 2)[0])
 
         if remote_mode:
-            items = self._jobs_submit_prep_by_stdin(job_log_root, job_log_dirs)
+            items = self._jobs_submit_prep_by_stdin(
+                job_log_root, job_log_dirs, stdin)
         else:
             items = self._jobs_submit_prep_by_args(job_log_root, job_log_dirs)
         now = get_current_time_string(override_use_utc=utc_mode)
@@ -534,72 +605,37 @@ class BatchSysManager():
     def _jobs_poll_batch_sys(self, job_log_root, batch_sys_name, my_ctx_list):
         """Helper 2 for self.jobs_poll(job_log_root, job_log_dirs)."""
         exp_job_ids = [ctx.batch_sys_job_id for ctx in my_ctx_list]
-        bad_job_ids = list(exp_job_ids)
         exp_pids = []
-        bad_pids = []
-        items = [[self._get_sys(batch_sys_name), exp_job_ids, bad_job_ids]]
-        if getattr(items[0][0], "SHOULD_POLL_PROC_GROUP", False):
+        items = [[batch_sys_name, exp_job_ids, set()]]
+        if getattr(
+                self._get_sys(batch_sys_name), "SHOULD_POLL_PROC_GROUP",
+                False):
             exp_pids = [ctx.pid for ctx in my_ctx_list if ctx.pid is not None]
-            bad_pids.extend(exp_pids)
-            items.append([self._get_sys("background"), exp_pids, bad_pids])
+            items.append(["background", exp_pids, set()])
         debug_messages = []
-        for batch_sys, exp_ids, bad_ids in items:
-            if hasattr(batch_sys, "get_poll_many_cmd"):
-                # Some poll commands may not be as simple
-                cmd = batch_sys.get_poll_many_cmd(exp_ids)
-            else:  # if hasattr(batch_sys, "POLL_CMD"):
-                # Simple poll command that takes a list of job IDs
-                cmd = [batch_sys.POLL_CMD] + exp_ids
+        for name, exp_ids, good_ids in items:
             try:
-                proc = procopen(cmd, stdindevnull=True,
-                                stderrpipe=True, stdoutpipe=True)
-            except OSError as exc:
-                # subprocess.Popen has a bad habit of not setting the
-                # filename of the executable when it raises an OSError.
-                if not exc.filename:
-                    exc.filename = cmd[0]
-                sys.stderr.write(str(exc) + "\n")
+                ids = self._jobs_poll_batch_sys_query(
+                    name, exp_ids, debug_messages)
+            except OSError:
                 return
-            ret_code = proc.wait()
-            out, err = (f.decode() for f in proc.communicate())
-            debug_messages.append('%s - %s' % (
-                batch_sys, len(out.split('\n'))))
-            sys.stderr.write(err)
-            if (ret_code and hasattr(batch_sys, "POLL_CANT_CONNECT_ERR") and
-                    batch_sys.POLL_CANT_CONNECT_ERR in err):
+            if ids is None:
                 # Poll command failed because it cannot connect to batch system
                 # Assume jobs are still healthy until the batch system is back.
-                bad_ids[:] = []
-            elif hasattr(batch_sys, "filter_poll_many_output"):
-                # Allow custom filter
-                for id_ in batch_sys.filter_poll_many_output(out):
-                    try:
-                        bad_ids.remove(id_)
-                    except ValueError:
-                        pass
+                good_ids.update(exp_ids)
             else:
-                # Just about all poll commands return a table, with column 1
-                # being the job ID. The logic here should be sufficient to
-                # ensure that any table header is ignored.
-                for line in out.splitlines():
-                    try:
-                        head = line.split(None, 1)[0]
-                    except IndexError:
-                        continue
-                    if head in exp_ids:
-                        try:
-                            bad_ids.remove(head)
-                        except ValueError:
-                            pass
+                good_ids.update(ids)
+        good_job_ids = items[0][2]
+        good_pids = items[1][2] if len(items) > 1 else set()
 
         debug_flag = False
         for ctx in my_ctx_list:
             ctx.batch_sys_exit_polled = int(
-                ctx.batch_sys_job_id in bad_job_ids)
+                ctx.batch_sys_job_id not in good_job_ids)
             # Exited batch system, but process still running
             # This can happen to jobs in some "at" implementation
             if ctx.batch_sys_exit_polled and ctx.pid in exp_pids:
-                if ctx.pid not in bad_pids:
+                if ctx.pid in good_pids:
                     ctx.batch_sys_exit_polled = 0
                 else:
                     debug_flag = True
@@ -618,6 +654,98 @@ class BatchSysManager():
         if debug_flag:
             ctx.batch_sys_call_no_lines = ', '.join(debug_messages)
 
+    def _jobs_poll_batch_sys_query(self, batch_sys_name, exp_ids,
+                                   debug_messages):
+        """Helper 3 for self.jobs_poll(job_log_root, job_log_dirs).
+
+        Return the IDs in exp_ids still in the batch system, or None if the
+        batch system cannot be contacted. Raise OSError if the poll command
+        cannot be run.
+
+        Results are reused for self.poll_cache_window seconds, so only IDs
+        not in the last query in that window are queried.
+
+        """
+        now = time()
+        try:
+            cache_time, cache_exp_ids, cache_ids = self.poll_cache[
+                batch_sys_name]
+        except KeyError:
+            cache_time = None
+        if cache_time is None or now > cache_time + self.poll_cache_window:
+            cache_time, cache_exp_ids, cache_ids = now, set(), set()
+        query_ids = [id_ for id_ in exp_ids if id_ not in cache_exp_ids]
+        if query_ids:
+            ids = self._jobs_poll_batch_sys_cmd(
+                batch_sys_name, query_ids, debug_messages)
+            if ids is None:
+                return None
+            cache_exp_ids.update(query_ids)
+            cache_ids.update(ids)
+            if self.poll_cache_window:
+                self.poll_cache[batch_sys_name] = (
+                    cache_time, cache_exp_ids, cache_ids)
+        return cache_ids.intersection(exp_ids)
+
+    def _jobs_poll_batch_sys_cmd(self, batch_sys_name, exp_ids,
+                                 debug_messages):
+        """Run the batch system poll command for exp_ids.
+
+        Return the IDs in exp_ids still in the batch system, or None if the
+        batch system cannot be contacted. Raise OSError if the poll command
+        cannot be run.
+
+        """
+        batch_sys = self._get_sys(batch_sys_name)
+        if hasattr(batch_sys, "get_poll_many_cmd"):
+            # Some poll commands may not be as simple
+            cmd = batch_sys.get_poll_many_cmd(exp_ids)
+        else:  # if hasattr(batch_sys, "POLL_CMD"):
+            # Simple poll command that takes a list of job IDs
+            cmd = [batch_sys.POLL_CMD] + exp_ids
+        exp_id_set = set(exp_ids)
+        with TemporaryFile() as err_handle:
+            try:
+                proc = procopen(cmd, stdindevnull=True, stderr=err_handle,
+                                stdoutpipe=True)
+            except OSError as exc:
+                # subprocess.Popen has a bad habit of not setting the
+                # filename of the executable when it raises an OSError.
+                if not exc.filename:
+                    exc.filename = cmd[0]
+                sys.stderr.write(str(exc) + "\n")
+                raise
+            # Parse output as it arrives, a large batch system can have a
+            # lot of jobs to list.
+            n_lines = 0
+            ids = set()
+            if hasattr(batch_sys, "filter_poll_many_output"):
+                # Allow custom filter
+                out = proc.stdout.read().decode()
+                n_lines = len(out.split('\n'))
+                ids.update(batch_sys.filter_poll_many_output(out))
+            else:
+                # Just about all poll commands return a table, with column 1
+                # being the job ID. The logic here should be sufficient to
+                # ensure that any table header is ignored.
+                for line in proc.stdout:
+                    n_lines += 1
+                    try:
+                        head = line.decode().split(None, 1)[0]
+                    except IndexError:
+                        continue
+                    ids.add(head)
+            proc.stdout.close()
+            ret_code = proc.wait()
+            err_handle.seek(0)
+            err = err_handle.read().decode()
+        debug_messages.append('%s - %s' % (batch_sys, n_lines))
+        sys.stderr.write(err)
+        if (ret_code and hasattr(batch_sys, "POLL_CANT_CONNECT_ERR") and
+                batch_sys.POLL_CANT_CONNECT_ERR in err):
+            return None
+        return ids & exp_id_set
+
     def _job_submit_impl(
             self, job_file_path, batch_sys_name, submit_opts):
         """Helper for self.jobs_submit() and self.job_submit()."""
@@ -727,7 +855,8 @@ class BatchSysManager():
             items.append((job_log_dir, batch_sys_name, submit_opts))
         return items
 
-    def _jobs_submit_prep_by_stdin(self, job_log_root, job_log_dirs):
+    def _jobs_submit_prep_by_stdin(
+            self, job_log_root, job_log_dirs, stdin=None):
         """Prepare job files for submit by reading from STDIN.
 
         Job files are uploaded via STDIN in remote mode. Extract job submission
@@ -737,6 +866,8 @@ class BatchSysManager():
         (job_log_dir, batch_sys_name, submit_opts)
 
         """
+        if stdin is None:
+            stdin = sys.stdin
         items = [[job_log_dir, None, {}] for job_log_dir in job_log_dirs]
         items_map = {}
         for item in items:
@@ -751,7 +882,7 @@ class BatchSysManager():
         # file.
         # Write job file in correct location.
         while True:  # Note: "for cur_line in sys.stdin:" may hang
-            cur_line = sys.stdin.readline()
+            cur_line = stdin.readline()
             if not cur_line:
                 if handle is not None:
                     handle.close()
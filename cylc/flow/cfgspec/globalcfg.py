@@ -38,11 +38,18 @@ SPEC = {
     # suite
     'process pool size': [VDR.V_INTEGER, 4],
     'process pool timeout': [VDR.V_INTERVAL, DurationFloat(600)],
+    # suite
+    'xtrigger worker pool size': [VDR.V_INTEGER, 0],
+    'job agent poll cache window': [VDR.V_INTERVAL, DurationFloat(10)],
     # client
     'disable interactive command prompts': [VDR.V_BOOLEAN, True],
     # suite
     'run directory rolling archive length': [VDR.V_INTEGER, -1],
     # suite
+    'persistent run database connection': [VDR.V_BOOLEAN, False],
+    # suite
+    'event driven main loop': [VDR.V_BOOLEAN, False],
+    # suite
     'cylc': {
         'UTC mode': [VDR.V_BOOLEAN],
         'health check interval': [VDR.V_INTERVAL, DurationFloat(600)],
@@ -172,6 +179,9 @@ SPEC = {
             'task event handler retry delays': [VDR.V_INTERVAL_LIST],
             'tail command template': [
                 VDR.V_STRING, 'tail -n +1 -F %(filename)s'],
+            'use job agent': [VDR.V_BOOLEAN, False],
+            'watch job status file': [VDR.V_BOOLEAN, False],
+            'task message relay window': [VDR.V_INTERVAL],
             'batch systems': {
                 '__MANY__': {
                     'err tailer': [VDR.V_STRING],
@@ -203,6 +213,9 @@ SPEC = {
             'retrieve job logs retry delays': [VDR.V_INTERVAL_LIST],
             'task event handler retry delays': [VDR.V_INTERVAL_LIST],
             'tail command template': [VDR.V_STRING],
+            'use job agent': [VDR.V_BOOLEAN],
+            'watch job status file': [VDR.V_BOOLEAN],
+            'task message relay window': [VDR.V_INTERVAL],
             'batch systems': {
                 '__MANY__': {
                     'err tailer': [VDR.V_STRING],
@@ -272,6 +285,7 @@ SPEC = {
         'run ports': [VDR.V_INTEGER_LIST, list(range(43001, 43101))],
         'condemned hosts': [VDR.V_ABSOLUTE_HOST_LIST],
         'auto restart delay': [VDR.V_INTERVAL],
+        'request worker threads': [VDR.V_INTEGER, 4],
         'run host select': {
             'rank': [VDR.V_STRING, 'random', 'load:1', 'load:5', 'load:15',
                      'memory', 'disk-space'],
@@ -100,6 +100,9 @@ SPEC = {
         'reference test': {
             'expected task failures': [VDR.V_STRING_LIST],
         },
+        'database': {
+            'archive horizon': [VDR.V_STRING],
+        },
         'authentication': {
             # Allow owners to grant public shutdown rights at the most, not
             # full control.
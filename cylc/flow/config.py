@@ -157,6 +157,7 @@ class SuiteConfig(object):
         self.task_param_vars = {}
         self.custom_runahead_limit = None
         self.max_num_active_cycle_points = None
+        self.archive_horizon = None
 
         # runtime hierarchy dicts keyed by namespace name:
         self.runtime = {
@@ -524,6 +525,7 @@ class SuiteConfig(object):
         self.mem_log("config.py: after load_graph()")
 
         self.compute_runahead_limits()
+        self.compute_archive_horizon()
 
         self.configure_queues()
 
@@ -1078,6 +1080,26 @@ class SuiteConfig(object):
         # The custom runahead limit is None if not user-configured.
         self.custom_runahead_limit = get_interval(limit)
 
+    def compute_archive_horizon(self):
+        """Extract the database archive horizon (may be None)."""
+        horizon = self.cfg['cylc']['database']['archive horizon']
+        if not horizon:
+            self.archive_horizon = None
+            return
+        try:
+            self.archive_horizon = get_interval(horizon).standardise()
+        except IntervalParsingError:
+            raise SuiteConfigError(
+                "Illegal [cylc][database]archive horizon: %s" % horizon)
+        if self.archive_horizon < self.archive_horizon.get_null():
+            # The history of tasks in the pool would be archived.
+            raise SuiteConfigError(
+                "Negative [cylc][database]archive horizon: %s" % horizon)
+
+    def get_archive_horizon(self):
+        """Return the database archive horizon (may be None)."""
+        return self.archive_horizon
+
     def get_custom_runahead_limit(self):
         """Return the custom runahead limit (may be None)."""
         return self.custom_runahead_limit
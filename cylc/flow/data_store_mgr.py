@@ -114,7 +114,12 @@ def task_mean_elapsed_time(tdef):
 
 
 def apply_delta(key, delta, data):
-    """Apply delta to specific data-store workflow and type."""
+    """Apply delta to specific data-store workflow and type.
+
+    Copy on write: the element type dicts and the elements changed are
+    replaced in data by changed copies, so the originals can be shared with
+    snapshots of the data-store published before.
+    """
     # Merge in updated fields
     if key == WORKFLOW:
         new_data = PbWorkflow()
@@ -128,28 +133,50 @@ def apply_delta(key, delta, data):
         # For thread safe update
         data[key] = new_data
         return
+    if not delta.deltas and not delta.pruned:
+        return
+    elements = data[key] = dict(data[key])
     for element in delta.deltas:
-        if key in (TASK_PROXIES, FAMILY_PROXIES) and element.id in data[key]:
-            # fields cannot be directly assigned, so is cleared first.
-            if hasattr(element, 'prerequisites') and element.prerequisites:
-                del data[key][element.id].prerequisites[:]
-            # fields that are set to empty kinds aren't carried
-            if not element.is_held:
-                data[key][element.id].is_held = False
-        data[key].setdefault(element.id, MESSAGE_MAP[key]()).MergeFrom(element)
+        new_element = MESSAGE_MAP[key]()
+        if element.id in elements:
+            new_element.CopyFrom(elements[element.id])
+            if key in (TASK_PROXIES, FAMILY_PROXIES):
+                # fields cannot be directly assigned, so is cleared first.
+                if (hasattr(element, 'prerequisites') and
+                        element.prerequisites):
+                    del new_element.prerequisites[:]
+                # fields that are set to empty kinds aren't carried
+                if not element.is_held:
+                    new_element.is_held = False
+        new_element.MergeFrom(element)
+        elements[element.id] = new_element
     # Prune data elements by id
-    for del_id in delta.pruned:
-        if del_id not in data[key]:
-            continue
+    pruned = [del_id for del_id in delta.pruned if del_id in elements]
+    if not pruned:
+        return
+    workflow = data[WORKFLOW] = copy_element(data[WORKFLOW])
+    if key in (TASK_PROXIES, FAMILY_PROXIES):
         if key == TASK_PROXIES:
-            data[TASKS][data[key][del_id].task].proxies.remove(del_id)
-            getattr(data[WORKFLOW], key).remove(del_id)
-        elif key == FAMILY_PROXIES:
-            data[FAMILIES][data[key][del_id].family].proxies.remove(del_id)
-            getattr(data[WORKFLOW], key).remove(del_id)
+            parent_key, parent_attr = TASKS, 'task'
+        else:
+            parent_key, parent_attr = FAMILIES, 'family'
+        parents = data[parent_key] = dict(data[parent_key])
+    for del_id in pruned:
+        if key in (TASK_PROXIES, FAMILY_PROXIES):
+            parent_id = getattr(elements[del_id], parent_attr)
+            parent = parents[parent_id] = copy_element(parents[parent_id])
+            parent.proxies.remove(del_id)
+            getattr(workflow, key).remove(del_id)
         elif key == EDGES:
-            getattr(data[WORKFLOW], key).edges.remove(del_id)
-        del data[key][del_id]
+            getattr(workflow, key).edges.remove(del_id)
+        del elements[del_id]
+
+
+def copy_element(element):
+    """Return a copy of a data element, to change."""
+    new_element = type(element)()
+    new_element.CopyFrom(element)
+    return new_element
 
 
 class DataStoreMgr:
@@ -162,6 +189,10 @@ class DataStoreMgr:
             Contains dict of task and tuple (state, is_held) pairs
             for each cycle point key.
         .data (dict):
+            Workflow data by workflow ID. The data of a workflow is a
+            snapshot, published as a whole by ``apply_deltas``, and never
+            changed in place after that, so it can be read from other
+            threads without locks.
             .edges (dict):
                 cylc.flow.data_messages_pb2.PbEdge by internal ID.
             .families (dict):
@@ -269,7 +300,11 @@ class DataStoreMgr:
         """
         # Reset attributes/data-store on reload:
         if reloaded:
+            # Keep publishing to the same dict, readers may hold it.
+            data = self.data
             self.__init__(self.schd)
+            data.update(self.data)
+            self.data = data
 
         # Static elements
         self.generate_definition_elements()
@@ -288,9 +323,6 @@ class DataStoreMgr:
                 ]
             self.schd.job_pool.reload_deltas()
 
-        # Set jobs ref
-        self.data[self.workflow_id][JOBS] = self.schd.job_pool.pool
-
         # Update workflow statuses and totals (assume needed)
         self.update_workflow()
         # Apply current deltas
@@ -990,11 +1022,13 @@ class DataStoreMgr:
         for key, elements in self.updates.items():
             self.deltas[key].deltas.extend(elements.values())
 
-        # Apply deltas to local data-store
-        data = self.data[self.workflow_id]
+        # Apply deltas to a copy of the local data-store, and publish it
+        data = dict(self.data[self.workflow_id])
         for key, delta in self.deltas.items():
             delta.reloaded = reloaded
             apply_delta(key, delta, data)
+        self.data[self.workflow_id] = data
+        self.schd.job_pool.pool = data[JOBS]
 
         # Construct checksum on deltas for export
         update_time = time()
@@ -27,7 +27,7 @@ from cylc.flow.task_state import (
 
 
 class CylcSuiteDBChecker(object):
-    """Object for querying a suite database"""
+    """Object for querying a suite database, and its archives"""
     STATE_ALIASES = {
         'finish': [TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED],
         'start': [
@@ -41,13 +41,41 @@ class CylcSuiteDBChecker(object):
         'succeed': [TASK_STATUS_SUCCEEDED],
     }
 
+    # Maximum number of cycles in the "IN (...)" of a query, well below the
+    # SQLite limit of host parameters.
+    MAX_CYCLES_PER_QUERY = 500
+
     def __init__(self, rund, suite):
-        db_path = os.path.join(
-            os.path.expanduser(rund), suite, "log",
-            CylcSuiteDAO.DB_FILE_BASE_NAME)
+        db_path = self.get_db_path(rund, suite)
         if not os.path.exists(db_path):
             raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), db_path)
         self.conn = sqlite3.connect(db_path, timeout=10.0)
+        self.archive_paths = CylcSuiteDAO.get_archive_paths(db_path)
+        self.archive_conns = None
+
+    def close(self):
+        """Close the connections to the database and its archives."""
+        self.conn.close()
+        for conn in self.archive_conns or []:
+            conn.close()
+        self.archive_conns = None
+
+    def execute(self, stmt, stmt_args):
+        """Yield the rows of stmt from the database, then its archives."""
+        yield from self.conn.execute(stmt, stmt_args)
+        if self.archive_conns is None:
+            self.archive_conns = [
+                sqlite3.connect(path, timeout=10.0)
+                for path in self.archive_paths]
+        for conn in self.archive_conns:
+            yield from conn.execute(stmt, stmt_args)
+
+    @staticmethod
+    def get_db_path(rund, suite):
+        """Return the path to the public database of suite in rund."""
+        return os.path.join(
+            os.path.expanduser(rund), suite, "log",
+            CylcSuiteDAO.DB_FILE_BASE_NAME)
 
     @staticmethod
     def display_maps(res):
@@ -65,10 +93,11 @@ class CylcSuiteDBChecker(object):
                 ['cycle_point_format']):
             return row[0]
 
-    def state_lookup(self, state):
+    @classmethod
+    def state_lookup(cls, state):
         """allows for multiple states to be searched via a status alias"""
-        if state in self.STATE_ALIASES:
-            return self.STATE_ALIASES[state]
+        if state in cls.STATE_ALIASES:
+            return cls.STATE_ALIASES[state]
         else:
             return [state]
 
@@ -105,12 +134,45 @@ class CylcSuiteDBChecker(object):
             stmt += " where " + (" AND ").join(stmt_wheres)
 
         res = []
-        for row in self.conn.execute(stmt, stmt_args):
+        for row in self.execute(stmt, stmt_args):
             if not all(v is None for v in row):
                 res.append(list(row))
 
         return res
 
+    def select_cycles(self, cycles):
+        """Return the states and outputs of all tasks at cycles.
+
+        Return ({(name, cycle): status, ...}, {(name, cycle): outputs, ...})
+        where outputs is the set of the output messages of the task. Rows of
+        the database take precedence over rows of its archives.
+        """
+        cycles = list(cycles)
+        states = {}
+        outputs = {}
+        for i in range(0, len(cycles), self.MAX_CYCLES_PER_QUERY):
+            chunk = cycles[i:i + self.MAX_CYCLES_PER_QUERY]
+            in_str = ",".join(["?"] * len(chunk))
+            for name, cycle, status in self.execute(
+                    r"SELECT name, cycle, status FROM " +
+                    CylcSuiteDAO.TABLE_TASK_STATES +
+                    r" WHERE cycle IN (" + in_str + r")",
+                    chunk):
+                states.setdefault((name, cycle), status)
+            for name, cycle, outputs_str in self.execute(
+                    r"SELECT name, cycle, outputs FROM " +
+                    CylcSuiteDAO.TABLE_TASK_OUTPUTS +
+                    r" WHERE cycle IN (" + in_str + r")",
+                    chunk):
+                if (name, cycle) in outputs:
+                    continue
+                try:
+                    outputs[(name, cycle)] = set(
+                        json.loads(outputs_str).values())
+                except (TypeError, ValueError, AttributeError):
+                    pass
+        return states, outputs
+
     def task_state_getter(self, task, cycle):
         """used to get the state of a particular task at a particular cycle"""
         return self.suite_state_query(task, cycle, mask="status")[0]
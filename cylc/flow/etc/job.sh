@@ -109,6 +109,13 @@ cylc__job__main() {
     export CYLC_TASK_WORK_PATH="${CYLC_TASK_WORK_DIR}"
     # Env-Script
     cylc__job__run_inst_func 'env_script'
+    # Start task message relay, if configured
+    if [[ -n "${CYLC_TASK_MESSAGE_RELAY_WINDOW:-}" ]]; then
+        CYLC_TASK_MESSAGE_RELAY="$(cylc message-relay \
+            "--window=${CYLC_TASK_MESSAGE_RELAY_WINDOW}" "--pid=$$" \
+            -- "${CYLC_SUITE_NAME}" "${CYLC_TASK_JOB}")" || true
+        export CYLC_TASK_MESSAGE_RELAY
+    fi
     # Send task started message
     cylc message -- "${CYLC_SUITE_NAME}" "${CYLC_TASK_JOB}" 'started' &
     CYLC_TASK_MESSAGE_STARTED_PID=$!
@@ -0,0 +1,230 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Run Python functions, e.g. xtrigger functions, in long-lived workers."""
+
+from collections import deque
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+import multiprocessing
+from multiprocessing.connection import wait
+import signal
+from time import time
+import traceback
+
+from cylc.flow import LOG
+from cylc.flow.subprocpool import SubProcPool, run_function
+from cylc.flow.timer_heap import TimerHeap
+from cylc.flow.wallclock import get_current_time_string
+
+
+def _run_worker(conn):
+    """Serve function calls received on conn, until None is received.
+
+    Each call is the arguments of "cylc function-run", and is answered with
+    (ret_code, out, err) as the command would exit with. Function imports are
+    cached in the worker, by "get_func".
+    """
+    # Interrupts are for the suite server program, which stops the workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            break
+        if args is None:
+            break
+        ret_code = 0
+        out, err = StringIO(), StringIO()
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                run_function(*args)
+            except SystemExit as exc:
+                ret_code = exc.code if isinstance(exc.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                ret_code = 1
+        conn.send((ret_code, out.getvalue(), err.getvalue()))
+
+
+class FuncWorkerPool(object):
+    """Manage queueing of function calls to a pool of worker processes.
+
+    This is an alternative to running each function in its own
+    "cylc function-run" subprocess in the SubProcPool. It has the same
+    put_command/callback interface, and the function context is expected to
+    be a cylc.flow.subprocctx.SubFuncContext, whose `.cmd` is the
+    "cylc function-run" command. On exit of the function call, `.out`,
+    `.err` and `.ret_code` of the context are set as the command would.
+
+    Each worker runs one call at a time. A worker is killed and replaced
+    if a call reaches the timeout, and replaced if it dies.
+
+    """
+
+    ERR_WORKER_DIED = "\nworker process died (%s)"
+    ERR_TIMEOUT = "\nkilled on timeout (%s)"
+    JOIN_TIMEOUT = 1.0
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.closed = False
+        self.queuings = deque()
+        # {conn: process, ...}
+        self.workers = {}
+        # Workers waiting for calls: [conn, ...]
+        self.idles = []
+        # Calls in workers: {conn: [ctx, callback, callback_args], ...}
+        self.runnings = {}
+        # Calls in workers by timeout: {conn: timeout, ...}
+        self.timeouts = TimerHeap()
+        # Workers are started fresh, so they do not inherit the threads and
+        # file descriptors of the suite server program.
+        self.mp_context = multiprocessing.get_context('spawn')
+
+    def close(self):
+        """Close pool."""
+        self.closed = True
+
+    def is_not_done(self):
+        """Return True if queuings or runnings not empty."""
+        return self.queuings or self.runnings
+
+    def process(self):
+        """Process done function calls and start more."""
+        if self.runnings:
+            for conn in wait(list(self.runnings), 0.0):
+                try:
+                    ret_code, out, err = conn.recv()
+                except (EOFError, OSError):
+                    process = self._stop_worker(conn)
+                    self._call_exit(
+                        conn, process.exitcode, '',
+                        self.ERR_WORKER_DIED % process.exitcode)
+                else:
+                    self._call_exit(conn, ret_code, out, err)
+                    self.idles.append(conn)
+        for conn in self.timeouts.pop_due(time()):
+            process = self._stop_worker(conn, kill=True)
+            self._call_exit(
+                conn, process.exitcode, '', self.ERR_TIMEOUT % self.timeout)
+        while self.queuings:
+            if self.idles:
+                conn = self.idles.pop()
+            elif len(self.workers) < self.size:
+                conn = self._start_worker()
+            else:
+                break
+            ctx, callback, callback_args = self.queuings.popleft()
+            LOG.debug(ctx.cmd)
+            try:
+                conn.send(ctx.cmd[1:])
+            except (OSError, ValueError):
+                process = self._stop_worker(conn)
+                ctx.ret_code = 1
+                ctx.err = self.ERR_WORKER_DIED % process.exitcode
+                self._run_callback(ctx, callback, callback_args)
+                continue
+            ctx.timeout = time() + self.timeout
+            self.runnings[conn] = [ctx, callback, callback_args]
+            self.timeouts.set(conn, ctx.timeout)
+
+    def put_command(self, ctx, callback=None, callback_args=None):
+        """Queue a new function call.
+
+        Arguments:
+            ctx (cylc.flow.subprocctx.SubFuncContext):
+                A context object containing the function to run and its
+                status.
+            callback (callable):
+                Function to call back when the function call exits or on
+                error. Should have signature:
+                    callback(ctx, *callback_args) -> None
+            callback_args (list):
+                Extra arguments to the callback function.
+        """
+        if self.closed:
+            ctx.err = SubProcPool.ERR_SUITE_STOPPING
+            ctx.ret_code = SubProcPool.RET_CODE_SUITE_STOPPING
+            self._run_callback(ctx, callback, callback_args)
+        else:
+            self.queuings.append([ctx, callback, callback_args])
+
+    def terminate(self):
+        """Drain queue, and stop all workers."""
+        self.close()
+        while self.queuings:
+            ctx, callback, callback_args = self.queuings.popleft()
+            ctx.err = SubProcPool.ERR_SUITE_STOPPING
+            ctx.ret_code = SubProcPool.RET_CODE_SUITE_STOPPING
+            self._run_callback(ctx, callback, callback_args)
+        for conn in list(self.workers):
+            if conn in self.runnings:
+                process = self._stop_worker(conn, kill=True)
+                self._call_exit(
+                    conn, process.exitcode, '',
+                    self.ERR_WORKER_DIED % process.exitcode)
+            else:
+                self._stop_worker(conn)
+
+    def _call_exit(self, conn, ret_code, out, err):
+        """Set results of the call in worker conn, and call its callback."""
+        self.timeouts.remove(conn)
+        ctx, callback, callback_args = self.runnings.pop(conn)
+        ctx.ret_code = ret_code
+        ctx.out = out
+        ctx.err = err
+        self._run_callback(ctx, callback, callback_args)
+
+    @staticmethod
+    def _run_callback(ctx, callback, callback_args):
+        """Process function call completion."""
+        ctx.timestamp = get_current_time_string()
+        if callable(callback):
+            if not callback_args:
+                callback_args = []
+            callback(ctx, *callback_args)
+
+    def _start_worker(self):
+        """Start a worker process, return its connection."""
+        conn, worker_conn = self.mp_context.Pipe()
+        process = self.mp_context.Process(
+            target=_run_worker, args=(worker_conn,), daemon=True)
+        process.start()
+        worker_conn.close()
+        self.workers[conn] = process
+        LOG.debug('started function worker (pid=%d)', process.pid)
+        return conn
+
+    def _stop_worker(self, conn, kill=False):
+        """Stop the worker process of conn, return the process.
+
+        If kill is False, ask the worker to exit before killing it.
+        """
+        process = self.workers.pop(conn)
+        if conn in self.idles:
+            self.idles.remove(conn)
+        if not kill:
+            try:
+                conn.send(None)
+            except (OSError, ValueError):
+                pass
+            process.join(self.JOIN_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+            process.join()
+        conn.close()
+        return process
@@ -0,0 +1,364 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Run job commands in long-lived job agents, one per (host, owner).
+
+A job agent is a "cylc jobs-agent" process, run via ssh on remote job hosts.
+It reads requests to run "cylc jobs-submit", "cylc jobs-poll" and
+"cylc jobs-kill" from its STDIN, runs them in its own process, and writes the
+results to its STDOUT. Each message is a frame: the length of its JSON
+content in bytes, as a decimal number on its own line, followed by the JSON
+content. This saves the ssh connection, Python start up and imports of a new
+job command for each batch of jobs.
+"""
+
+from itertools import count
+import json
+import os
+import shlex
+from subprocess import PIPE  # nosec
+from time import time
+
+from cylc.flow import LOG
+from cylc.flow.cylc_subproc import procopen
+from cylc.flow.subprocpool import SubProcPool
+from cylc.flow.wallclock import get_current_time_string
+
+JOBS_AGENT = 'jobs-agent'
+JOBS_AGENT_PING = 'ping'
+
+
+def encode_frame(obj):
+    """Return the frame for a JSON serialisable object, as bytes.
+
+    Examples:
+        >>> encode_frame({'args': ['ping']})
+        b'18\\n{"args": ["ping"]}'
+
+    """
+    data = json.dumps(obj).encode()
+    return b'%d\n%s' % (len(data), data)
+
+
+def decode_frames(buf):
+    """Decode and remove complete frames from the start of a bytearray.
+
+    Return a list of the decoded objects.
+
+    Examples:
+        >>> buf = bytearray(encode_frame([1]) + encode_frame([2]) + b'3\\n[')
+        >>> decode_frames(buf)
+        [[1], [2]]
+        >>> buf
+        bytearray(b'3\\n[')
+
+    """
+    objs = []
+    while True:
+        end_of_header = buf.find(b'\n')
+        if end_of_header == -1:
+            break
+        end = end_of_header + 1 + int(buf[:end_of_header])
+        if len(buf) < end:
+            break
+        objs.append(json.loads(buf[end_of_header + 1:end].decode()))
+        del buf[:end]
+    return objs
+
+
+def read_frame(handle):
+    """Read a frame from a binary file handle.
+
+    Return the decoded object, or None at the end of the file.
+    """
+    header = handle.readline()
+    if not header.strip():
+        return None
+    size = int(header)
+    data = handle.read(size)
+    if len(data) < size:
+        return None
+    return json.loads(data.decode())
+
+
+class JobAgent(object):
+    """A job agent process for a (host, owner), and its requests."""
+
+    __slots__ = [
+        'proc', 'label', 'write_buf', 'read_buf', 'requests', 'last_contact',
+        'ping_id', 'is_eof']
+
+    def __init__(self, proc, label):
+        self.proc = proc
+        self.label = label
+        # Bytes of requests not yet written to the agent
+        self.write_buf = bytearray()
+        # Bytes of responses not yet decoded
+        self.read_buf = bytearray()
+        # Requests sent to the agent, in order:
+        # {request_id: [ctx, callback, callback_args], ...}
+        self.requests = {}
+        self.last_contact = time()
+        self.ping_id = None
+        self.is_eof = False
+
+
+class JobAgentPool(object):
+    """Manage job agents, and the job commands running in them.
+
+    This is an alternative to running each job command in its own subprocess
+    in the SubProcPool, with the same put_command/callback interface. The
+    command context is expected to be a cylc.flow.subprocctx.SubProcContext,
+    whose `.cmd` is the "cylc jobs-*" command, with its STDIN in the
+    "stdin_files" or "stdin_str" keyword arguments. The (host, owner) to run
+    the command on is determined by its "--host=HOST" and "--user=OWNER"
+    options. On exit of the command, `.out`, `.err` and `.ret_code` of the
+    context are set as the command would.
+
+    Each agent runs one command at a time, in the order received. Batch
+    system poll results are reused by an agent for poll_cache_window
+    seconds, so the number of batch system queries depends on the number of
+    (host, owner), rather than the number of jobs, to poll. An agent
+    is started on demand, and sent a ping after PING_INTERVAL seconds without
+    contact. An agent is killed if its oldest command reaches the timeout, or
+    if a ping is not answered in PING_TIMEOUT seconds. The commands in an
+    agent that dies or is killed fail, and a new agent is started for the
+    next command.
+
+    """
+
+    CMD = ['cylc', JOBS_AGENT]
+    ERR_AGENT_DIED = "\njob agent died (%s)"
+    ERR_TIMEOUT = "\nkilled on timeout (%s)"
+    PING_INTERVAL = 60.0
+    PING_TIMEOUT = 30.0
+    READ_SIZE = 65536
+
+    def __init__(self, timeout, poll_cache_window=0.0):
+        self.timeout = timeout
+        self.poll_cache_window = poll_cache_window
+        self.closed = False
+        # {(host, owner): JobAgent, ...}
+        self.agents = {}
+        self.request_ids = count()
+
+    def close(self):
+        """Close pool."""
+        self.closed = True
+
+    def is_not_done(self):
+        """Return True if any command is not done."""
+        return any(
+            len(agent.requests) > (agent.ping_id is not None)
+            for agent in self.agents.values())
+
+    def process(self):
+        """Write requests to, and read results from, the job agents."""
+        now = time()
+        for key, agent in list(self.agents.items()):
+            self._write(agent)
+            self._read(agent)
+            ret_code = agent.proc.poll()
+            if agent.is_eof or ret_code is not None:
+                self._stop_agent(key, self.ERR_AGENT_DIED % ret_code)
+                continue
+            if agent.requests:
+                request_id = next(iter(agent.requests))
+                if request_id == agent.ping_id:
+                    timeout = agent.last_contact + self.PING_TIMEOUT
+                else:
+                    timeout = agent.requests[request_id][0].timeout
+                if now > timeout:
+                    self._stop_agent(key, self.ERR_TIMEOUT % self.timeout)
+            elif now > agent.last_contact + self.PING_INTERVAL:
+                agent.ping_id = self._send(agent, [JOBS_AGENT_PING], None)
+                agent.requests[agent.ping_id] = [None, None, None]
+                # Ping timeout is relative to the time sent.
+                agent.last_contact = now
+
+    def put_command(self, ctx, callback=None, callback_args=None):
+        """Send a new job command to the job agent of its (host, owner).
+
+        Arguments:
+            ctx (cylc.flow.subprocctx.SubProcContext):
+                A context object containing the command to run and its
+                status.
+            callback (callable):
+                Function to call back when the command exits or on error.
+                Should have signature:
+                    callback(ctx, *callback_args) -> None
+            callback_args (list):
+                Extra arguments to the callback function.
+        """
+        if self.closed:
+            ctx.err = SubProcPool.ERR_SUITE_STOPPING
+            ctx.ret_code = SubProcPool.RET_CODE_SUITE_STOPPING
+            self._run_callback(ctx, callback, callback_args)
+            return
+        args = []
+        auth_args = []
+        for arg in ctx.cmd[1:]:
+            if arg.startswith(('--host=', '--user=')):
+                auth_args.append(arg)
+            else:
+                args.append(arg)
+        try:
+            stdin_str = self._get_stdin_str(ctx)
+        except (IOError, OSError) as exc:
+            ctx.err = str(exc)
+            ctx.ret_code = 1
+            self._run_callback(ctx, callback, callback_args)
+            return
+        key = tuple(sorted(auth_args))
+        agent = self.agents.get(key)
+        if agent is None:
+            try:
+                agent = self._start_agent(key)
+            except OSError as exc:
+                ctx.err = str(exc)
+                ctx.ret_code = 1
+                self._run_callback(ctx, callback, callback_args)
+                return
+        LOG.debug(ctx.cmd)
+        ctx.timeout = time() + self.timeout
+        request_id = self._send(agent, args, stdin_str)
+        agent.requests[request_id] = [ctx, callback, callback_args]
+        self._write(agent)
+
+    def terminate(self):
+        """Stop all agents, commands running in them fail."""
+        self.close()
+        for key in list(self.agents):
+            self._stop_agent(key, SubProcPool.ERR_SUITE_STOPPING)
+
+    @staticmethod
+    def _get_stdin_str(ctx):
+        """Return the STDIN of a job command context, as a string."""
+        if ctx.cmd_kwargs.get('stdin_files'):
+            texts = []
+            for file_ in ctx.cmd_kwargs['stdin_files']:
+                if hasattr(file_, 'read'):
+                    texts.append(file_.read())
+                else:
+                    with open(file_) as handle:
+                        texts.append(handle.read())
+            return ''.join(
+                text.decode() if isinstance(text, bytes) else text
+                for text in texts)
+        return ctx.cmd_kwargs.get('stdin_str')
+
+    def _read(self, agent):
+        """Read from the agent, and process results of commands."""
+        for handle in (agent.proc.stderr, agent.proc.stdout):
+            while True:
+                try:
+                    data = os.read(handle.fileno(), self.READ_SIZE)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    data = b''
+                if not data:
+                    if handle is agent.proc.stdout:
+                        agent.is_eof = True
+                    break
+                if handle is agent.proc.stdout:
+                    agent.read_buf.extend(data)
+                else:
+                    for line in data.decode(errors='replace').splitlines():
+                        LOG.debug('[%s err] %s', agent.label, line)
+        try:
+            responses = decode_frames(agent.read_buf)
+        except ValueError as exc:
+            # Bad output, e.g. from a shell start up file
+            LOG.warning('[%s] bad output: %s', agent.label, exc)
+            agent.is_eof = True
+            return
+        for response in responses:
+            agent.last_contact = time()
+            try:
+                ctx, callback, callback_args = agent.requests.pop(
+                    response['id'])
+            except KeyError:
+                continue
+            if response['id'] == agent.ping_id:
+                agent.ping_id = None
+                continue
+            ctx.ret_code = response['ret_code']
+            ctx.out = response['out']
+            ctx.err = response['err']
+            self._run_callback(ctx, callback, callback_args)
+
+    def _send(self, agent, args, stdin_str):
+        """Buffer a request to the agent, return its ID."""
+        request_id = next(self.request_ids)
+        agent.write_buf.extend(encode_frame(
+            {'id': request_id, 'args': args, 'stdin': stdin_str}))
+        return request_id
+
+    @staticmethod
+    def _run_callback(ctx, callback, callback_args):
+        """Process command completion."""
+        ctx.timestamp = get_current_time_string()
+        if callable(callback):
+            if not callback_args:
+                callback_args = []
+            callback(ctx, *callback_args)
+
+    def _start_agent(self, key):
+        """Start the job agent for key, which is its --host/--user options."""
+        cmd = self.CMD + list(key)
+        if self.poll_cache_window:
+            cmd.append('--poll-cache-window=%s' % self.poll_cache_window)
+        proc = procopen(cmd, stdin=PIPE, stdoutpipe=True, stderrpipe=True)
+        for handle in (proc.stdin, proc.stdout, proc.stderr):
+            os.set_blocking(handle.fileno(), False)
+        agent = JobAgent(proc, ' '.join(shlex.quote(arg) for arg in cmd))
+        self.agents[key] = agent
+        LOG.debug('[%s] started (pid=%d)', agent.label, proc.pid)
+        return agent
+
+    def _stop_agent(self, key, err):
+        """Kill the job agent for key, its commands fail with err."""
+        agent = self.agents.pop(key)
+        if agent.proc.poll() is None:
+            agent.proc.kill()
+        agent.proc.wait()
+        for handle in (agent.proc.stdin, agent.proc.stdout, agent.proc.stderr):
+            try:
+                handle.close()
+            except OSError:
+                pass
+        LOG.debug(
+            '[%s] stopped (ret_code=%s)', agent.label, agent.proc.returncode)
+        for request_id, (ctx, callback, callback_args) in (
+                agent.requests.items()):
+            if request_id == agent.ping_id:
+                continue
+            ctx.ret_code = agent.proc.returncode or 1
+            ctx.err = err
+            self._run_callback(ctx, callback, callback_args)
+
+    def _write(self, agent):
+        """Write as many buffered request bytes as possible to the agent."""
+        while agent.write_buf:
+            try:
+                size = os.write(agent.proc.stdin.fileno(), agent.write_buf)
+            except BlockingIOError:
+                break
+            except OSError:
+                # Agent has gone, dealt with on read
+                agent.write_buf.clear()
+                break
+            del agent.write_buf[:size]
@@ -15,6 +15,8 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Write task job files."""
 
+from hashlib import sha1
+from io import StringIO
 import os
 import re
 import stat
@@ -31,19 +33,152 @@ from cylc.flow.pathutil import (
 
 class JobFileWriter(object):
 
-    """Write task job files."""
+    """Write task job files.
+
+    The shell syntax of job files is checked with "bash -n". To save a
+    process for each job file, job files are written in batches:
+    * User script sections (scripts, global init-script, user environment)
+      are checked on their own, once for each unique content.
+    * The remaining sections of all job files in a batch are checked
+      together, in one process.
+    Only job files that fail these checks are checked on their own, to
+    report any errors.
+
+    Most job script sections are the same for all jobs of a task with the
+    same runtime configuration, except for a few per-job fields. These
+    sections are compiled into a template, cached by a key from the caller,
+    and only the per-job fields are filled in for each job.
+    """
+
+    BASH = '/bin/bash'
+    MAX_SYNTAX_CACHE_SIZE = 1024
+    MAX_TEMPLATES = 1024
+    # Fields of job_conf that may vary between jobs with the same template.
+    # They may only be written as is in template sections.
+    TEMPLATE_FIELDS = ('dependencies', 'job_d', 'task_id', 'try_num')
+    # Placeholder delimiter, cannot be in any job_conf value
+    TEMPLATE_DELIM = '\0'
 
     def __init__(self):
         self.suite_env = {}
         self.batch_sys_mgr = BatchSysManager()
+        # Digests of user script sections with good syntax
+        self.syntax_ok_cache = set()
+        # Compiled job script templates: {template_key: template, ...}
+        self.templates = {}
 
     def set_suite_env(self, suite_env):
         """Configure suite environment for all job files."""
         self.suite_env.clear()
         self.suite_env.update(suite_env)
+        self.templates.clear()
 
     def write(self, local_job_file_path, job_conf, check_syntax=True):
-        """Write each job script section in turn."""
+        """Write a job file, raise any exception in writing it."""
+        exc = self.write_batch(
+            [(local_job_file_path, job_conf, None)], check_syntax)[0]
+        if exc is not None:
+            raise exc
+
+    def write_batch(self, items, check_syntax=True):
+        """Write a batch of job files.
+
+        Arguments:
+            items (list):
+                [(local_job_file_path, job_conf, template_key), ...]
+                Jobs with the same template_key (not None) must differ only
+                in the TEMPLATE_FIELDS of their job_conf.
+            check_syntax (bool):
+                Check the shell syntax of the job files.
+
+        Return a list with None for each job file written, or the exception
+        raised in writing it.
+        """
+        results = []
+        tmp_items = []  # [(index, tmp_name, sections), ...]
+        for local_job_file_path, job_conf, template_key in items:
+            try:
+                tmp_name, sections = self._write_tmp(
+                    local_job_file_path, job_conf, template_key)
+            except Exception as exc:
+                results.append(exc)
+            else:
+                tmp_items.append((len(results), tmp_name, sections))
+                results.append(None)
+        if check_syntax and tmp_items:
+            for (index, _, _), exc in zip(
+                    tmp_items,
+                    self._check_syntax(
+                        [item[1:] for item in tmp_items])):
+                results[index] = exc
+        for index, tmp_name, _ in tmp_items:
+            if results[index] is not None:
+                continue
+            try:
+                # Make job file executable
+                mode = (
+                    os.stat(tmp_name).st_mode |
+                    stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+                os.chmod(tmp_name, mode)
+                os.rename(tmp_name, items[index][0])
+            except OSError as exc:
+                results[index] = exc
+        return results
+
+    def _write_tmp(self, local_job_file_path, job_conf, template_key=None):
+        """Write a job file to a temporary file.
+
+        Return the temporary file name, and the job script sections as
+        [(is_user_section, text), ...].
+        """
+        template = None
+        if template_key is not None:
+            template = self.templates.get(template_key)
+        if template is None:
+            template = self._compile_template(job_conf)
+            if template_key is not None:
+                if len(self.templates) >= self.MAX_TEMPLATES:
+                    self.templates.clear()
+                self.templates[template_key] = template
+        sections = []
+        for is_user_section, item in template:
+            if callable(item):
+                # Section written for each job
+                text = self._get_section_text(item, job_conf)
+            else:
+                # Compiled section, fill in fields at odd indexes
+                parts = list(item)
+                for i in range(1, len(parts), 2):
+                    if parts[i] == 'dependencies':
+                        parts[i] = ' '.join(job_conf['dependencies'])
+                    else:
+                        parts[i] = str(job_conf[parts[i]])
+                text = ''.join(parts)
+            if text:
+                sections.append((is_user_section, text))
+
+        tmp_name = local_job_file_path + '.tmp'
+        try:
+            with open(tmp_name, 'w') as handle:
+                for _, text in sections:
+                    handle.write(text)
+        except IOError as exc:
+            # Remove temporary file
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+            raise exc
+        return tmp_name, sections
+
+    def _compile_template(self, job_conf):
+        """Compile a job script template from job_conf.
+
+        Return [(is_user_section, item), ...], where item is either a
+        function to write the section for each job, or the section text
+        split by TEMPLATE_DELIM, with the names of TEMPLATE_FIELDS at odd
+        indexes.
+        """
 
         # ########### !!!!!!!! WARNING !!!!!!!!!!! #####################
         # BE EXTREMELY WARY OF CHANGING THE ORDER OF JOB SCRIPT SECTIONS
@@ -56,56 +191,126 @@ class JobFileWriter(object):
         # that cylc commands can be used in defining user environment
         # variables: NEXT_CYCLE=$( cylc cycle-point --offset-hours=6 )
 
-        tmp_name = local_job_file_path + '.tmp'
-        run_d = get_remote_suite_run_dir(
-            job_conf['host'], job_conf['owner'], job_conf['suite_name'])
-        try:
-            with open(tmp_name, 'w') as handle:
-                self._write_header(handle, job_conf)
-                self._write_directives(handle, job_conf)
-                self._write_prelude(handle, job_conf)
-                self._write_environment_1(handle, job_conf, run_d)
-                self._write_global_init_script(handle, job_conf)
+        # Fields replaced by placeholders
+        tmpl_conf = dict(job_conf)
+        for key in self.TEMPLATE_FIELDS:
+            tmpl_conf[key] = '%s%s%s' % (
+                self.TEMPLATE_DELIM, key, self.TEMPLATE_DELIM)
+        tmpl_conf['dependencies'] = [tmpl_conf['dependencies']]
+        template = []
+        for is_user_section, is_per_job, write_section in [
+                (False, True, self._write_header),
+                # Batch system handlers may do anything with job_conf
+                (False, True, self._write_directives),
+                (False, False, self._write_prelude),
+                (False, False, self._write_environment_1),
+                (True, False, self._write_global_init_script),
                 # suite bin access must be before runtime environment
                 # because suite bin commands may be used in variable
                 # assignment expressions: FOO=$(command args).
-                self._write_environment_2(handle, job_conf)
-                self._write_script(handle, job_conf)
-                self._write_epilogue(handle, job_conf, run_d)
-        except IOError as exc:
-            # Remove temporary file
-            try:
-                os.unlink(tmp_name)
-            except OSError:
-                pass
-            raise exc
-        # check syntax
-        if check_syntax:
-            try:
-                with Popen(
-                        ['/bin/bash', '-n', tmp_name],
-                        stderr=PIPE, stdin=DEVNULL) as proc:
-                    if proc.wait():
-                        # This will leave behind the temporary file,
-                        # which is useful for debugging syntax errors, etc.
-                        raise RuntimeError(proc.communicate()[1].decode())
-            except OSError as exc:
-                # Popen has a bad habit of not telling you anything if it fails
-                # to run the executable.
-                if exc.filename is None:
-                    exc.filename = '/bin/bash'
+                (True, False, self._write_environment_2),
+                (True, False, self._write_script),
+                (False, False, self._write_epilogue)]:
+            if is_per_job:
+                template.append((is_user_section, write_section))
+            else:
+                text = self._get_section_text(write_section, tmpl_conf)
+                if text:
+                    template.append(
+                        (is_user_section, text.split(self.TEMPLATE_DELIM)))
+        return template
+
+    @staticmethod
+    def _get_section_text(write_section, job_conf):
+        """Return text written by a job script section writer."""
+        handle = StringIO()
+        write_section(handle, job_conf)
+        return handle.getvalue()
+
+    def _check_syntax(self, tmp_items):
+        """Check shell syntax of temporary job files.
+
+        tmp_items is [(tmp_name, sections), ...].
+        Return a list with None for each good job file, or the exception.
+
+        A bad job file is left behind, which is useful for debugging syntax
+        errors, etc. A job file that cannot be checked is removed.
+        """
+        results = []
+        batch = []  # Sections to check together: [text, ...]
+        batch_indexes = []
+        for tmp_name, sections in tmp_items:
+            if all(
+                    self._is_user_section_ok(text)
+                    for is_user_section, text in sections if is_user_section
+            ):
+                batch_indexes.append(len(results))
+                batch.extend(
+                    text for is_user_section, text in sections
+                    if not is_user_section)
+                results.append(None)
+            else:
+                results.append(self._run_bash_n(tmp_name))
+        # Each section is complete, so the sections can be checked together.
+        # Look for bad job files only if the batch is not clean.
+        if batch and self._run_bash_n(
+                stdin_str='\n'.join(batch), is_strict=True) is not None:
+            for index in batch_indexes:
+                results[index] = self._run_bash_n(tmp_items[index][0])
+        for index, exc in enumerate(results):
+            if isinstance(exc, OSError):
                 # Remove temporary file
                 try:
-                    os.unlink(tmp_name)
+                    os.unlink(tmp_items[index][0])
                 except OSError:
                     pass
-                raise exc
-        # Make job file executable
-        mode = (
-            os.stat(tmp_name).st_mode |
-            stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
-        os.chmod(tmp_name, mode)
-        os.rename(tmp_name, local_job_file_path)
+        return results
+
+    def _is_user_section_ok(self, text):
+        """Return True if a user script section has good syntax.
+
+        Good results are cached.
+        """
+        key = sha1(text.encode()).digest()
+        if key in self.syntax_ok_cache:
+            return True
+        if self._run_bash_n(stdin_str=text) is not None:
+            return False
+        if len(self.syntax_ok_cache) >= self.MAX_SYNTAX_CACHE_SIZE:
+            self.syntax_ok_cache.clear()
+        self.syntax_ok_cache.add(key)
+        return True
+
+    @classmethod
+    def _run_bash_n(cls, file_name=None, stdin_str=None, is_strict=False):
+        """Check shell syntax of a file, or of a string via STDIN.
+
+        Return None if good, a RuntimeError with the error message if bad,
+        or an OSError if the check cannot be run. If is_strict, treat any
+        warning as bad, e.g. a here document delimited by end-of-file.
+        """
+        cmd = [cls.BASH, '-n']
+        if file_name:
+            cmd.append(file_name)
+        try:
+            with Popen(
+                    cmd,
+                    stderr=PIPE,
+                    stdin=(DEVNULL if stdin_str is None else PIPE)
+            ) as proc:
+                if stdin_str is None:
+                    err = proc.communicate()[1]
+                else:
+                    err = proc.communicate(stdin_str.encode())[1]
+                if proc.wait() or is_strict and err:
+                    return RuntimeError(err.decode())
+        except OSError as exc:
+            # Popen has a bad habit of not telling you anything if it fails
+            # to run the executable.
+            if exc.filename is None:
+                exc.filename = cls.BASH
+            return exc
+        return None
 
     @staticmethod
     def _check_script_value(value):
@@ -174,9 +379,17 @@ class JobFileWriter(object):
                 job_conf, 'copyable environment variables'):
             if key in os.environ:
                 handle.write("\nexport %s='%s'" % (key, os.environ[key]))
+        relay_window = self._get_host_item(
+            job_conf, 'task message relay window')
+        if relay_window:
+            handle.write(
+                "\nexport CYLC_TASK_MESSAGE_RELAY_WINDOW='%s'" %
+                float(relay_window))
 
-    def _write_environment_1(self, handle, job_conf, run_d):
+    def _write_environment_1(self, handle, job_conf):
         """Suite and task environment."""
+        run_d = get_remote_suite_run_dir(
+            job_conf['host'], job_conf['owner'], job_conf['suite_name'])
         handle.write("\n\ncylc__job__inst__cylc_env() {")
         handle.write("\n    # CYLC SUITE ENVIRONMENT:")
         # write the static suite variables
@@ -324,8 +537,10 @@ class JobFileWriter(object):
                 handle.write("\n}")
 
     @staticmethod
-    def _write_epilogue(handle, job_conf, run_d):
+    def _write_epilogue(handle, job_conf):
         """Write epilogue."""
+        run_d = get_remote_suite_run_dir(
+            job_conf['host'], job_conf['owner'], job_conf['suite_name'])
         handle.write(f'\n\n. "{run_d}/.service/etc/job.sh"\ncylc__job__main')
         handle.write("\n\n%s%s\n" % (
             BatchSysManager.LINE_PREFIX_EOF, job_conf['job_d']))
@@ -110,6 +110,10 @@ class JobPool:
 
     def add_job_msg(self, job_d, msg):
         """Add message to job."""
+        self.add_job_msgs(job_d, [msg])
+
+    def add_job_msgs(self, job_d, msgs):
+        """Add messages to job, in one update."""
         update_time = time()
         point, name, sub_num = self.parse_job_item(job_d)
         j_id = (
@@ -117,8 +121,11 @@ class JobPool:
             f'{ID_DELIM}{name}{ID_DELIM}{sub_num}')
         try:
             j_delta = PbJob(stamp=f'{j_id}@{update_time}')
-            j_delta.messages.append(msg)
-            self.updates.setdefault(j_id, PbJob(id=j_id)).MergeFrom(j_delta)
+            j_delta.messages.extend(msgs)
+            j_update = self.updates.get(j_id)
+            if j_update is None:
+                j_update = self.updates[j_id] = PbJob(id=j_id)
+            j_update.MergeFrom(j_delta)
             self.updates_pending = True
         except TypeError as exc:
             LOG.error(f'Unable to append to {j_id} message field: {str(exc)}')
@@ -0,0 +1,322 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Watch job status files for task messages.
+
+Jobs append their messages to their "job.status" files (see
+"cylc.flow.task_message"), as well as sending them to the suite server
+program. If the job log directory is on a file system shared with the suite
+server program, the "JobStatusWatcher" reads the lines appended to the job
+status files of the watched jobs, and puts the messages they record in the
+message queue of the suite server program, as if they were received.
+
+Changes are detected with inotify on Linux, via ctypes. Elsewhere, or if
+inotify is not available, the sizes of the watched files are checked every
+POLL_INTERVAL seconds.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+from threading import Event, Lock, Thread
+from time import time
+
+from cylc.flow import LOG
+from cylc.flow.task_message import (
+    ABORT_MESSAGE_PREFIX, CYLC_JOB_EXIT, CYLC_JOB_EXIT_TIME,
+    CYLC_JOB_INIT_TIME, CYLC_MESSAGE, FAIL_MESSAGE_PREFIX)
+from cylc.flow.task_outputs import TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED
+
+
+class _Inotify(object):
+    """Minimal inotify interface, for modifications of files."""
+
+    IN_MODIFY = 0x00000002
+    IN_IGNORED = 0x00008000
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError('libc not found')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        for name in ('inotify_init1', 'inotify_add_watch', 'inotify_rm_watch'):
+            if not hasattr(self._libc, name):
+                raise OSError('%s not available' % name)
+        self.fd = self._call(
+            self._libc.inotify_init1, os.O_NONBLOCK | os.O_CLOEXEC)
+
+    def _call(self, func, *args):
+        """Call libc func, raise OSError on error."""
+        ret = func(*args)
+        if ret == -1:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return ret
+
+    def add_watch(self, path):
+        """Watch path for modifications, return the watch descriptor."""
+        return self._call(
+            self._libc.inotify_add_watch, self.fd, os.fsencode(path),
+            self.IN_MODIFY)
+
+    def rm_watch(self, wdesc):
+        """Stop watching a watch descriptor."""
+        try:
+            self._call(self._libc.inotify_rm_watch, self.fd, wdesc)
+        except OSError:
+            pass  # e.g. file removed
+
+    def read(self):
+        """Return [(wdesc, mask), ...] for all pending events."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wdesc, mask, _, size = self.EVENT_HEADER.unpack_from(
+                    data, pos)
+                pos += self.EVENT_HEADER.size + size
+                events.append((wdesc, mask))
+        return events
+
+    def close(self):
+        """Close the inotify instance."""
+        os.close(self.fd)
+
+
+class _WatchedFile(object):
+    """A watched job status file, and where it has been read up to."""
+
+    __slots__ = ['job_d', 'path', 'offset', 'wdesc', 'exit_value']
+
+    def __init__(self, job_d, path):
+        self.job_d = job_d
+        self.path = path
+        self.offset = 0
+        self.wdesc = None
+        # Value of CYLC_JOB_EXIT, until its CYLC_JOB_EXIT_TIME is read
+        self.exit_value = None
+
+
+class JobStatusWatcher(object):
+    """Watch job status files, and put their messages in a message queue.
+
+    Messages are put as (job_d, event_time, severity, message), as the
+    network server does for messages sent by jobs. The same message is
+    normally received from both sources, so the suite server program should
+    only process messages for which "is_new_message" returns True.
+
+    A job is watched from "watch" until its exit is read, or until a job of
+    the same task is watched. The keys of the messages of a job are kept for
+    SEEN_TIMEOUT seconds after that, to ignore the same messages arriving
+    late from the other source.
+
+    """
+
+    POLL_INTERVAL = 1.0
+    SEEN_TIMEOUT = 600.0
+
+    def __init__(self, message_queue):
+        self.message_queue = message_queue
+        # {(point, name): _WatchedFile, ...}
+        self._files = {}
+        # {wdesc: _WatchedFile, ...}
+        self._wdescs = {}
+        # Keys of messages: {job_d: set([(event_time, message), ...]), ...}
+        self._seen = {}
+        # Jobs no longer watched: {job_d: time to forget, ...}
+        self._seen_expires = {}
+        self._lock = Lock()
+        # Files are read by "watch" and by the watcher thread.
+        self._read_lock = Lock()
+        self._inotify = None
+        self._stop_event = Event()
+        self._thread = None
+
+    def watch(self, job_d, path):
+        """Watch the job status file at path, for job_d.
+
+        job_d is the job ID as "point/name/submit_num". Start the watcher
+        thread if not already started.
+        """
+        point, name = job_d.split('/')[0:2]
+        watched_file = _WatchedFile(job_d, path)
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            if (point, name) in self._files:
+                self._unwatch(self._files[(point, name)])
+            self._files[(point, name)] = watched_file
+            self._seen.setdefault(job_d, set())
+            self._seen_expires.pop(job_d, None)
+            if self._inotify is not None:
+                try:
+                    watched_file.wdesc = self._inotify.add_watch(path)
+                except OSError as exc:
+                    LOG.warning('%s: cannot watch: %s', path, exc)
+                else:
+                    self._wdescs[watched_file.wdesc] = watched_file
+        # Read what is already there, e.g. if the job has started.
+        self._read_files([watched_file])
+
+    def is_new_message(self, job_d, event_time, message):
+        """Return True if the message has not been seen for job_d.
+
+        Only messages of watched jobs are remembered.
+        """
+        with self._lock:
+            seen = self._seen.get(job_d)
+            if seen is None:
+                return True
+            key = (event_time, message)
+            if key in seen:
+                return False
+            seen.add(key)
+            return True
+
+    def stop(self):
+        """Stop the watcher thread."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _start(self):
+        """Start the watcher thread."""
+        try:
+            self._inotify = _Inotify()
+        except OSError as exc:
+            LOG.debug(
+                'job status watcher: inotify not available (%s),'
+                ' checking every %ss', exc, self.POLL_INTERVAL)
+        self._thread = Thread(
+            target=self._run, name='job-status-watcher', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """Read modified job status files, until stopped."""
+        while not self._stop_event.is_set():
+            if self._inotify is None:
+                self._stop_event.wait(self.POLL_INTERVAL)
+                with self._lock:
+                    watched_files = list(self._files.values())
+            else:
+                if not select.select(
+                        [self._inotify.fd], [], [], self.POLL_INTERVAL)[0]:
+                    continue
+                with self._lock:
+                    watched_files = []
+                    for wdesc, mask in self._inotify.read():
+                        watched_file = self._wdescs.get(wdesc)
+                        if watched_file is None:
+                            continue
+                        if mask & self._inotify.IN_IGNORED:
+                            # File removed
+                            del self._wdescs[wdesc]
+                            watched_file.wdesc = None
+                        if watched_file not in watched_files:
+                            watched_files.append(watched_file)
+            self._read_files(watched_files)
+            self._expire_seen()
+
+    def _read_files(self, watched_files):
+        """Read new lines of watched files, queue their messages."""
+        with self._read_lock:
+            for watched_file in watched_files:
+                self._read_file(watched_file)
+
+    def _read_file(self, watched_file):
+        """Read new lines of a watched file, queue their messages."""
+        try:
+            if os.stat(watched_file.path).st_size == watched_file.offset:
+                return
+            with open(watched_file.path, 'rb') as handle:
+                handle.seek(0, os.SEEK_END)
+                if handle.tell() < watched_file.offset:
+                    # File rewritten, e.g. on job vacation
+                    watched_file.offset = 0
+                handle.seek(watched_file.offset)
+                data = handle.read()
+        except OSError:
+            return  # not there yet, or removed
+        # Only complete lines, the job may be half way through a write.
+        data = data[:data.rfind(b'\n') + 1]
+        watched_file.offset += len(data)
+        for line in data.decode(errors='replace').splitlines():
+            item = self._get_message(watched_file, line)
+            if item is not None:
+                self.message_queue.put((watched_file.job_d,) + item)
+
+    def _get_message(self, watched_file, line):
+        """Return (event_time, severity, message) for a job status line.
+
+        Return None if the line does not record a message.
+        """
+        key, _, value = line.partition('=')
+        if key == CYLC_JOB_INIT_TIME:
+            return (value, 'INFO', TASK_OUTPUT_STARTED)
+        if key == CYLC_JOB_EXIT:
+            watched_file.exit_value = value
+        elif key == CYLC_JOB_EXIT_TIME and watched_file.exit_value:
+            exit_value = watched_file.exit_value
+            watched_file.exit_value = None
+            with self._lock:
+                self._unwatch(watched_file)
+            if exit_value == TASK_OUTPUT_SUCCEEDED.upper():
+                return (value, 'INFO', TASK_OUTPUT_SUCCEEDED)
+            if exit_value.startswith('"'):
+                # See "cylc__job_abort" in "job.sh"
+                return (value, 'CRITICAL', ABORT_MESSAGE_PREFIX + exit_value)
+            return (value, 'CRITICAL', FAIL_MESSAGE_PREFIX + exit_value)
+        elif key == CYLC_MESSAGE:
+            try:
+                event_time, severity, message = value.split('|', 2)
+            except ValueError:
+                return None
+            return (event_time, severity, message)
+        return None
+
+    def _unwatch(self, watched_file):
+        """Stop watching a job status file.
+
+        Call with self._lock held.
+        """
+        task_key = tuple(watched_file.job_d.split('/')[0:2])
+        # A later job of the same task may be watched already.
+        if self._files.get(task_key) is watched_file:
+            del self._files[task_key]
+        if watched_file.wdesc is not None:
+            self._wdescs.pop(watched_file.wdesc, None)
+            self._inotify.rm_watch(watched_file.wdesc)
+            watched_file.wdesc = None
+        self._seen_expires[watched_file.job_d] = time() + self.SEEN_TIMEOUT
+
+    def _expire_seen(self):
+        """Forget messages of jobs no longer watched after SEEN_TIMEOUT."""
+        now = time()
+        with self._lock:
+            for job_d, expire in list(self._seen_expires.items()):
+                if now > expire:
+                    del self._seen_expires[job_d]
+                    self._seen.pop(job_d, None)
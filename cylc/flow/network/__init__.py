@@ -16,11 +16,13 @@
 """Package for network interfaces to cylc suite server objects."""
 
 import asyncio
+from functools import partial
 import getpass
 import json
 import os
 from threading import Thread
 from time import sleep
+import zlib
 
 import zmq
 import zmq.asyncio
@@ -38,6 +40,20 @@ from cylc.flow.suite_files import (
 
 API = 5  # cylc API version
 
+ACCEPT_ENCODING = 'accept_encoding'
+"""Request field listing the response encodings accepted by a client.
+
+Clients that send it accept responses framed as [header, payload], see
+``encode_frames``. Other clients get the payload only, as before.
+"""
+ENCODING_IDENTITY = 'identity'
+ENCODINGS = {
+    'zlib': (partial(zlib.compress, level=1), zlib.decompress),
+}
+"""Response compressions: {name: (compress, decompress), ...}."""
+COMPRESS_THRESHOLD = 16384
+"""Payloads larger than this (in bytes) are compressed, if accepted."""
+
 
 def encode_(message):
     """Convert the structure holding a message field from JSON to a string."""
@@ -51,6 +67,42 @@ def decode_(message):
     return msg
 
 
+def encode_frames(payload, accept_encoding, threshold=None):
+    """Return response frames [header, payload] for a payload of bytes.
+
+    Compress the payload with the first of the encodings in accept_encoding
+    that is known, if larger than threshold (default COMPRESS_THRESHOLD).
+    """
+    if threshold is None:
+        threshold = COMPRESS_THRESHOLD
+    encoding = ENCODING_IDENTITY
+    if len(payload) > threshold:
+        for name in accept_encoding:
+            if name in ENCODINGS:
+                payload = ENCODINGS[name][0](payload)
+                encoding = name
+                break
+    return [encode_({'encoding': encoding}).encode(), payload]
+
+
+def decode_frames(frames):
+    """Return the payload of response frames, as bytes.
+
+    Frames of servers that do not frame responses are the payload only.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    header, payload = frames
+    encoding = json.loads(header.decode())['encoding']
+    if encoding != ENCODING_IDENTITY:
+        try:
+            payload = ENCODINGS[encoding][1](payload)
+        except (KeyError, zlib.error) as exc:
+            raise ClientError(
+                f'Cannot decode response of encoding "{encoding}": {exc}')
+    return payload
+
+
 def get_location(suite: str, owner: str, host: str):
     """Extract host and port from a suite's contact file.
 
@@ -32,8 +32,11 @@ from cylc.flow.exceptions import (
     SuiteServiceFileError
 )
 from cylc.flow.network import (
+    ACCEPT_ENCODING,
+    ENCODINGS,
     encode_,
     decode_,
+    decode_frames,
     get_location,
     ZMQSocketBase
 )
@@ -81,7 +84,9 @@ class SuiteRuntimeClient(ZMQSocketBase):
         * Accepts responses of the format: {"data": {...}}
         * Accepts error in the format: {"error": {"message": MSG}}
         * Returns requests of the format: {"command": CMD,
-        "args": {...}}
+        "args": {...}, "accept_encoding": [...]}
+        * Accepts responses framed as [header, payload], with compressed
+        payloads, or as payload only from older servers.
 
     Raises:
         ClientError: if the suite is not running.
@@ -160,7 +165,10 @@ class SuiteRuntimeClient(ZMQSocketBase):
         # there is no need to encrypt messages ourselves before sending.
 
         # send message
-        msg = {'command': command, 'args': args}
+        msg = {
+            'command': command,
+            'args': args,
+            ACCEPT_ENCODING: list(ENCODINGS)}
         msg.update(self.header)
         LOG.debug('zmq:send %s', msg)
         message = encode_(msg)
@@ -168,7 +176,7 @@ class SuiteRuntimeClient(ZMQSocketBase):
 
         # receive response
         if self.poller.poll(timeout):
-            res = await self.socket.recv()
+            res = decode_frames(await self.socket.recv_multipart())
         else:
             if callable(self.timeout_handler):
                 self.timeout_handler()
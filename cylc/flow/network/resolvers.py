@@ -16,6 +16,7 @@
 
 """GraphQL resolvers for use in data accessing and mutation of workflows."""
 
+from copy import copy
 from operator import attrgetter
 from fnmatch import fnmatchcase
 from graphene.utils.str_converters import to_snake_case
@@ -162,6 +163,17 @@ class BaseResolvers:
     def __init__(self, data):
         self.data = data
 
+    def snapshot(self):
+        """Return a copy of these resolvers, to resolve a single query.
+
+        Workflow data are snapshots, replaced as a whole when updated (see
+        cylc.flow.data_store_mgr.DataStoreMgr), so the copy resolves the
+        whole query from the data of each workflow at the time of the call.
+        """
+        resolvers = copy(self)
+        resolvers.data = dict(self.data)
+        return resolvers
+
     # Query resolvers
     async def get_workflows_data(self, args):
         """Return list of data from workflows."""
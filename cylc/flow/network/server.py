@@ -15,17 +15,23 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Server for suite runtime API."""
 
+import asyncio
 import getpass
+from heapq import heappop, heappush
+from itertools import count
+import json
 from queue import Queue
 from textwrap import dedent
-from time import sleep
+from threading import Lock, Thread
+from time import time
 
 from graphql.execution.executors.asyncio import AsyncioExecutor
 import zmq
 
 from cylc.flow import LOG
 from cylc.flow.cfgspec.glbl_cfg import glbl_cfg
-from cylc.flow.network import encode_, decode_, ZMQSocketBase
+from cylc.flow.network import (
+    ACCEPT_ENCODING, encode_, decode_, encode_frames, ZMQSocketBase)
 from cylc.flow.network.authorisation import Priv, authorise
 from cylc.flow.network.resolvers import Resolvers
 from cylc.flow.network.schema import schema
@@ -62,15 +68,27 @@ class SuiteRuntimeServer(ZMQSocketBase):
             passed in from the application.
         barrier (object): Threading Barrier object used to sync threads, for
             the main thread to ensure socket setup has finished.
+        n_workers (int): Number of threads serving requests concurrently,
+            default from the global configuration.
 
     Usage:
         * Define endpoints using the ``expose`` decorator.
         * Call endpoints using the function name.
 
+    Concurrency:
+        Requests are received on a ROUTER socket by the listener thread, and
+        served by a pool of worker threads. Queued requests are passed to
+        idle workers by priority lane (see ``LANES``), so task messages are
+        not held up by bulk reads. Latencies of requests are recorded by
+        endpoint, see ``get_server_metrics``.
+
     Message interface:
         * Accepts requests of the format: {"command": CMD, "args": {...}}
         * Returns responses of the format: {"data": {...}}
         * Returns error in the format: {"error": {"message": MSG}}
+        * Frames responses as [header, payload], compressing large payloads,
+          for clients that send "accept_encoding" (see
+          ``cylc.flow.network.encode_frames``).
 
     Common Arguments:
         Arguments which are shared between multiple commands.
@@ -111,9 +129,32 @@ class SuiteRuntimeServer(ZMQSocketBase):
 
     """
 
+    LANE_MESSAGES = 0
+    LANE_DEFAULT = 1
+    LANE_BULK = 2
+    LANES = {
+        # Job and external trigger messages are served first.
+        'put_ext_trigger': LANE_MESSAGES,
+        'put_messages': LANE_MESSAGES,
+        # Bulk reads are served last, and never by all workers at once.
+        'get_graph_raw': LANE_BULK,
+        'get_suite_state_summary': LANE_BULK,
+        'graphql': LANE_BULK,
+        'pb_data_elements': LANE_BULK,
+        'pb_entire_workflow': LANE_BULK,
+    }
+    """Priority lanes of requests by command, lower lanes are served first.
+
+    Other commands are in LANE_DEFAULT.
+    """
+
+    WORKER_READY = b'READY'
+    WORKER_STOP = b'STOP'
+    WORKER_JOIN_TIMEOUT = 5.0
+
     def __init__(self, schd, context=None, barrier=None,
-                 threaded=True, daemon=False):
-        super().__init__(zmq.REP, bind=True, context=context,
+                 threaded=True, daemon=False, n_workers=None):
+        super().__init__(zmq.ROUTER, bind=True, context=context,
                          barrier=barrier, threaded=threaded, daemon=daemon)
         self.schd = schd
         self.suite = schd.suite
@@ -123,6 +164,25 @@ class SuiteRuntimeServer(ZMQSocketBase):
         self.resolvers = Resolvers(
             self.schd.ws_data_mgr.data,
             schd=self.schd)
+        if n_workers is None:
+            n_workers = glbl_cfg().get(
+                ['suite servers', 'request worker threads'])
+        self.n_workers = max(1, n_workers)
+        # Backend for workers, bound by the listener thread.
+        self.backend = None
+        self.worker_threads = []
+        # Requests waiting for a worker, by lane:
+        # [(lane, seq, client_id, recv_time, msg), ...]
+        self.requests = []
+        self.request_seq = count()
+        # Worker IDs waiting for requests, and lanes of requests in workers:
+        # [worker_id, ...], {worker_id: lane, ...}
+        self.idle_workers = []
+        self.busy_workers = {}
+        # Latencies by endpoint: {command: [count, wait_total, wait_max,
+        # service_total, service_max], ...}
+        self.metrics = {}
+        self.metrics_lock = Lock()
 
     def _socket_options(self):
         """Set socket options.
@@ -142,7 +202,11 @@ class SuiteRuntimeServer(ZMQSocketBase):
         # start accepting requests
         self.queue = Queue()
         self.register_endpoints()
-        self._listener()
+        self._start_workers()
+        try:
+            self._listener()
+        finally:
+            self._stop_workers()
 
     def _bespoke_stop(self):
         """Stop the listener and Authenticator.
@@ -156,7 +220,13 @@ class SuiteRuntimeServer(ZMQSocketBase):
             self.queue.put('STOP')
 
     def _listener(self):
-        """The server main loop, listen for and serve requests."""
+        """The server main loop, listen for requests and pass them on.
+
+        Requests from clients, on the ROUTER socket, are passed to idle
+        workers by priority lane, then in order of arrival. Responses from
+        workers, on the backend socket, are passed back to the clients.
+        """
+        poller = None
         while True:
             # process any commands passed to the listener by its parent process
             if self.queue.qsize():
@@ -165,17 +235,125 @@ class SuiteRuntimeServer(ZMQSocketBase):
                     break
                 raise ValueError('Unknown command "%s"' % command)
 
+            if poller is None:
+                poller = zmq.Poller()
+                poller.register(self.socket, zmq.POLLIN)
+                poller.register(self.backend, zmq.POLLIN)
             try:
                 # wait RECV_TIMEOUT for a message
-                msg = self.socket.recv_string()
-            except zmq.error.Again:
-                # timeout, continue with the loop, this allows the listener
-                # thread to stop
-                continue
+                events = dict(poller.poll(self.RECV_TIMEOUT * 1000))
+                if events.get(self.backend):
+                    self._recv_backend()
+                if events.get(self.socket):
+                    self._recv_frontend()
+                self._dispatch()
             except zmq.error.ZMQError as exc:
                 LOG.exception('unexpected error: %s', exc)
-                continue
 
+            # Note: we are using CurveZMQ to secure the messages (see
+            # self.curve_auth, self.socket.curve_...key etc.). We have set up
+            # public-key cryptography on the ZMQ messaging and sockets, so
+            # there is no need to encrypt messages ourselves before sending.
+
+    def _recv_frontend(self):
+        """Queue requests from clients by lane."""
+        while True:
+            try:
+                client_id, empty, msg = self.socket.recv_multipart(
+                    zmq.NOBLOCK)
+            except zmq.error.Again:
+                return
+            except ValueError:
+                LOG.warning('malformed request frames')
+                continue
+            try:
+                lane = self.LANES.get(
+                    json.loads(msg).get('command'), self.LANE_DEFAULT)
+            except (AttributeError, ValueError):
+                # leave the worker to report the error
+                lane = self.LANE_DEFAULT
+            heappush(self.requests, (
+                lane, next(self.request_seq), client_id, time(), msg))
+
+    def _recv_backend(self):
+        """Register ready workers, and return responses to clients."""
+        while True:
+            try:
+                frames = self.backend.recv_multipart(zmq.NOBLOCK)
+            except zmq.error.Again:
+                return
+            worker_id = frames[0]
+            self.busy_workers.pop(worker_id, None)
+            self.idle_workers.append(worker_id)
+            if frames[2:] != [self.WORKER_READY]:
+                # [worker_id, b'', client_id, response frames...]
+                self.socket.send_multipart([frames[2], b''] + frames[3:])
+
+    def _dispatch(self):
+        """Pass queued requests to idle workers, by lane."""
+        while self.requests and self.idle_workers:
+            lane, _, client_id, recv_time, msg = self.requests[0]
+            if lane == self.LANE_BULK and (
+                list(self.busy_workers.values()).count(self.LANE_BULK) >=
+                    self.n_workers - 1 > 0):
+                # keep a worker for other lanes
+                break
+            heappop(self.requests)
+            worker_id = self.idle_workers.pop()
+            self.busy_workers[worker_id] = lane
+            self.backend.send_multipart([
+                worker_id, b'', client_id, str(recv_time).encode(), msg])
+
+    def _start_workers(self):
+        """Bind the backend socket, and start the worker threads."""
+        backend_addr = 'inproc://cylc-server-%s' % id(self)
+        self.backend = self.context.socket(zmq.ROUTER)
+        self.backend.bind(backend_addr)
+        for i in range(self.n_workers):
+            thread = Thread(
+                target=self._worker, args=(backend_addr,),
+                name='server-worker-%d' % i, daemon=True)
+            thread.start()
+            self.worker_threads.append(thread)
+
+    def _stop_workers(self):
+        """Ask the worker threads to stop, and wait for them."""
+        stop_time = time() + self.WORKER_JOIN_TIMEOUT
+        for worker_id in self.idle_workers + list(self.busy_workers):
+            self.backend.send_multipart([worker_id, b'', self.WORKER_STOP])
+        # Workers not ready yet are told to stop when ready.
+        while (
+            any(thread.is_alive() for thread in self.worker_threads)
+            and time() < stop_time
+        ):
+            if self.backend.poll(100):
+                frames = self.backend.recv_multipart()
+                if frames[2:] == [self.WORKER_READY]:
+                    self.backend.send_multipart(
+                        [frames[0], b'', self.WORKER_STOP])
+        for thread in self.worker_threads:
+            thread.join(max(0.0, stop_time - time()))
+        self.worker_threads.clear()
+        self.idle_workers.clear()
+        self.busy_workers.clear()
+        self.backend.close(linger=0)
+        self.backend = None
+
+    def _worker(self, backend_addr):
+        """Serve requests from the backend socket, until told to stop."""
+        # The graphql endpoint needs an event loop in this thread.
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        socket = self.context.socket(zmq.DEALER)
+        socket.connect(backend_addr)
+        socket.send_multipart([b'', self.WORKER_READY])
+        while True:
+            frames = socket.recv_multipart()
+            if frames[1:] == [self.WORKER_STOP]:
+                break
+            _, client_id, recv_time, msg = frames
+            start_time = time()
+            command = None
+            accept_encoding = None
             # attempt to decode the message, authenticating the user in the
             # process
             try:
@@ -184,22 +362,46 @@ class SuiteRuntimeServer(ZMQSocketBase):
                 # failed to decode message, possibly resulting from failed
                 # authentication
                 LOG.exception('failed to decode message: "%s"', exc)
+                response = encode_({'error': {
+                    'message': 'failed to decode message'}}).encode()
             else:
                 # success case - serve the request
                 res = self._receiver(message)
-                if message['command'] in PB_METHOD_MAP:
-                    response = res['data']
-                else:
-                    response = encode_(res).encode()
-                # send back the string to bytes response
-                self.socket.send(response)
-
-            # Note: we are using CurveZMQ to secure the messages (see
-            # self.curve_auth, self.socket.curve_...key etc.). We have set up
-            # public-key cryptography on the ZMQ messaging and sockets, so
-            # there is no need to encrypt messages ourselves before sending.
-
-            sleep(0)  # yield control to other threads
+                command = message.get('command')
+                accept_encoding = message.get(ACCEPT_ENCODING)
+                try:
+                    if command in PB_METHOD_MAP and 'data' in res:
+                        response = res['data']
+                    else:
+                        response = encode_(res).encode()
+                except Exception as exc:
+                    # an uncaught exception would kill the worker, and the
+                    # client would never get a response
+                    LOG.exception('failed to encode response: "%s"', exc)
+                    response = encode_({'error': {
+                        'message': 'failed to encode response'}}).encode()
+            if isinstance(accept_encoding, list):
+                frames = encode_frames(response, accept_encoding)
+            else:
+                # older clients take the response only
+                frames = [response]
+            socket.send_multipart([b'', client_id] + frames)
+            self._add_metric(
+                command, start_time - float(recv_time), time() - start_time)
+        socket.close(linger=0)
+        asyncio.get_event_loop().close()
+
+    def _add_metric(self, command, wait, service):
+        """Record the latencies of a request."""
+        if not isinstance(command, str) or command not in self.endpoints:
+            command = None
+        with self.metrics_lock:
+            metric = self.metrics.setdefault(command, [0, 0.0, 0.0, 0.0, 0.0])
+            metric[0] += 1
+            metric[1] += wait
+            metric[2] = max(metric[2], wait)
+            metric[3] += service
+            metric[4] = max(metric[4], service)
 
     def _receiver(self, message):
         """Wrap incoming messages and dispatch them to exposed methods.
@@ -310,7 +512,7 @@ class SuiteRuntimeServer(ZMQSocketBase):
                 request_string,
                 variables=variables,
                 context={
-                    'resolvers': self.resolvers,
+                    'resolvers': self.resolvers.snapshot(),
                 },
                 executor=AsyncioExecutor(),
                 return_promise=False,
@@ -498,6 +700,33 @@ class SuiteRuntimeServer(ZMQSocketBase):
         """
         return self.schd.info_get_suite_info()
 
+    @authorise(Priv.READ)
+    @expose
+    def get_server_metrics(self):
+        """Return the latencies of requests served, by endpoint.
+
+        Returns:
+            dict: ``{endpoint: {...}, ...}``
+
+            Each endpoint has the number of requests served (``count``), and
+            the mean and max times in seconds they waited for a worker
+            (``wait_mean``, ``wait_max``), and were served in
+            (``service_mean``, ``service_max``). Requests that could not be
+            decoded are under the ``null`` endpoint.
+
+        """
+        metrics = {}
+        with self.metrics_lock:
+            for command, (num, wait, wait_max, service, service_max) in (
+                    self.metrics.items()):
+                metrics[command] = {
+                    'count': num,
+                    'wait_mean': wait / num,
+                    'wait_max': wait_max,
+                    'service_mean': service / num,
+                    'service_max': service_max}
+        return metrics
+
     @authorise(Priv.READ)
     @expose
     def get_suite_state_summary(self):
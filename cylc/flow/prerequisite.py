@@ -24,16 +24,147 @@ from cylc.flow.exceptions import TriggerExpressionError
 from cylc.flow.data_messages_pb2 import PbPrerequisite, PbCondition
 
 
+class TriggerExpression(object):
+    """A compiled conditional trigger expression.
+
+    The expression is compiled once (e.g. per graph dependency) into a
+    closure, and can be shared by any number of Prerequisite objects. Leaves
+    of the expression are indices of the messages of a prerequisite, which is
+    evaluated against bit masks of satisfied and of live (not dropped by
+    pre-initial simplification) messages.
+
+    Args:
+        nested_expr (list): (Nested) list of leaves and conditional
+            characters, e.g. `[0, "&", [1, "|", 2]]`. Other items are
+            converted to leaf indices using `get_index`.
+        get_index (callable): Return the index of an item in `nested_expr`
+            that is not an int, a list or a conditional character. Items
+            for which this raises KeyError or ValueError are invalid, and
+            evaluation of the expression will raise TriggerExpressionError.
+
+    Examples:
+        >>> expr = TriggerExpression([0, '|', 1, '&', 2])
+        >>> expr.evaluate(0b001, 0b111)
+        True
+        >>> expr.evaluate(0b010, 0b111)
+        False
+        >>> expr.evaluate(0b110, 0b111)
+        True
+
+        Dropped (pre-initial) messages are removed from the expression:
+        >>> expr.evaluate(0b000, 0b110)
+        False
+        >>> expr.evaluate(0b100, 0b101)
+        True
+        >>> expr.evaluate(0b000, 0b000) is None
+        True
+
+        Invalid items:
+        >>> expr = TriggerExpression(['@wall_clock', '|', 0])
+        >>> expr.evaluate(0b1, 0b1)
+        Traceback (most recent call last):
+        cylc.flow.exceptions.TriggerExpressionError: invalid term: @wall_clock
+
+    """
+
+    __slots__ = ['_func', '_bad_items']
+
+    OR = '|'
+    AND = '&'
+
+    def __init__(self, nested_expr, get_index=None):
+        self._bad_items = []
+        self._func = self._compile(nested_expr, get_index)
+
+    def evaluate(self, sat_mask, live_mask):
+        """Evaluate the expression.
+
+        Args:
+            sat_mask (int): Bit mask of satisfied message indices.
+            live_mask (int): Bit mask of live message indices.
+
+        Return:
+            bool: True if satisfied, False if not, or None if all messages
+            in the expression have been dropped.
+
+        Raise:
+            TriggerExpressionError: If the expression has invalid items.
+
+        """
+        if self._bad_items:
+            raise TriggerExpressionError(
+                'invalid term: %s' % ', '.join(self._bad_items))
+        return self._func(sat_mask, live_mask)
+
+    def _compile(self, item, get_index):
+        """Return a closure to evaluate item."""
+        if isinstance(item, list):
+            # Split on "|" first, so "&" binds more tightly, as in Python.
+            or_terms = [[]]
+            for sub_item in item:
+                if sub_item == self.OR:
+                    or_terms.append([])
+                elif sub_item != self.AND:
+                    or_terms[-1].append(self._compile(sub_item, get_index))
+            funcs = [self._join(self.AND, terms) for terms in or_terms]
+            return self._join(self.OR, funcs)
+        if not isinstance(item, int):
+            try:
+                item = get_index(item)
+            except (KeyError, TypeError, ValueError):
+                self._bad_items.append(str(item))
+                return self._dropped
+        bit = 1 << item
+
+        def _leaf(sat_mask, live_mask):
+            if live_mask & bit:
+                return bool(sat_mask & bit)
+            return None
+
+        return _leaf
+
+    @staticmethod
+    def _dropped(*_):
+        """Evaluate an invalid item (ignored)."""
+        return None
+
+    @classmethod
+    def _join(cls, oper, funcs):
+        """Return a closure to evaluate oper on the results of funcs.
+
+        Results of None (dropped terms) are ignored.
+
+        """
+        if len(funcs) == 1:
+            return funcs[0]
+        funcs = tuple(funcs)
+        # For "&", any False gives False; for "|", any True gives True.
+        short = oper == cls.OR
+
+        def _oper(sat_mask, live_mask):
+            ret = None
+            for func in funcs:
+                value = func(sat_mask, live_mask)
+                if value is None:
+                    continue
+                if value == short:
+                    return short
+                ret = value
+            return ret
+
+        return _oper
+
+
 class Prerequisite(object):
     """The concrete result of an abstract logical trigger expression."""
 
     # Memory optimization - constrain possible attributes to this list.
     __slots__ = ["satisfied", "_all_satisfied",
                  "target_point_strings", "start_point",
-                 "pre_initial_messages", "conditional_expression", "point"]
+                 "pre_initial_messages", "conditional_expression", "point",
+                 "_messages", "_trigger_expression", "_message_bits",
+                 "_sat_mask", "_live_mask"]
 
-    # Extracts T from "foo.T succeeded" etc.
-    SATISFIED_TEMPLATE = 'bool(self.satisfied[("%s", "%s", "%s")])'
     MESSAGE_TEMPLATE = '%s.%s %s'
 
     DEP_STATE_SATISFIED = 'satisfied naturally'
@@ -60,10 +191,25 @@ class Prerequisite(object):
         # ['task name', 'point string' ,'output']
         self.pre_initial_messages = []
 
+        # Messages in the order they were added (may contain duplicates).
+        # Message indices in this list are the leaves of trigger expressions.
+        self._messages = []
+
         # Expression present only when conditions are used.
         # 'foo.1 failed & bar.1 succeeded'
         self.conditional_expression = None
 
+        # Compiled conditional expression, see set_condition.
+        # TriggerExpression
+        self._trigger_expression = None
+
+        # Bit mask of each message in self._messages, and masks of satisfied
+        # and live (not dropped) messages, for evaluating conditionals.
+        # {('task name', 'point string', 'output'): int, ...}
+        self._message_bits = None
+        self._sat_mask = 0
+        self._live_mask = 0
+
         # The cached state of this prerequisite:
         # * `None` (no cached state)
         # * `True` (prerequisite satisfied)
@@ -81,14 +227,22 @@ class Prerequisite(object):
             pre_initial (bool): Set this output as a pre-initial dependency.
 
         """
-        message = (name, str(point), output)
+        point_str = str(point)
+        message = (name, point_str, output)
 
         # Add a new prerequisite message in an UNSATISFIED state.
         self.satisfied[message] = self.DEP_STATE_UNSATISFIED
+        self._messages.append(message)
+        if self._message_bits is not None:
+            bit = 1 << (len(self._messages) - 1)
+            self._message_bits[message] = (
+                self._message_bits.get(message, 0) | bit)
+            self._live_mask |= bit
+            self._sat_mask &= ~self._message_bits[message]
         if self._all_satisfied is not None:
             self._all_satisfied = False
-        if point and str(point) not in self.target_point_strings:
-            self.target_point_strings.append(str(point))
+        if point and point_str not in self.target_point_strings:
+            self.target_point_strings.append(point_str)
         if pre_initial and message not in self.pre_initial_messages:
             self.pre_initial_messages.append(message)
 
@@ -98,19 +252,22 @@ class Prerequisite(object):
         Returns None if this prerequisite is not a conditional one.
 
         """
-        expr = self.conditional_expression
-        if not expr:
-            return None
-        for message in self.satisfied:
-            expr = expr.replace(self.SATISFIED_TEMPLATE % message,
-                                self.MESSAGE_TEMPLATE % message)
-        return expr
+        return self.conditional_expression
 
-    def set_condition(self, expr):
+    def set_condition(self, expr, trigger_expression=None):
         """Set the conditional expression for this prerequisite.
 
         Resets the cached state (self._all_satisfied).
 
+        Args:
+            expr (str): The expression in the graph format, with messages
+                as in self.MESSAGE_TEMPLATE, e.g. "foo.1 succeeded | bar.1
+                succeeded".
+            trigger_expression (TriggerExpression): The compiled expression,
+                if already available, with leaves as indices of the messages
+                in the order they were added. Otherwise "expr" is compiled
+                if it is conditional.
+
         """
 
         drop_these = []
@@ -121,11 +278,13 @@ class Prerequisite(object):
                 drop_these.append(message)
 
         # Needed to drop pre warm-start dependence:
+        point_str = str(self.point)
         for message in self.satisfied:
             if message in drop_these:
                 continue
             if self.start_point:
-                if message[1]:  # Cycle point.
+                # Cycle point, not dropped if the same as self.point.
+                if message[1] and message[1] != point_str:
                     if get_point(message[1]) < self.start_point <= self.point:
                         # Drop if outside of relevant point range.
                         drop_these.append(message)
@@ -139,12 +298,34 @@ class Prerequisite(object):
                 simpler = ConditionalSimplifier(
                     expr, [self.MESSAGE_TEMPLATE % m for m in drop_these])
                 expr = simpler.get_cleaned()
-            # Make a Python expression so we can eval() the logic.
-            for message in self.satisfied:
-                expr = expr.replace(self.MESSAGE_TEMPLATE % message,
-                                    self.SATISFIED_TEMPLATE % message)
+            if trigger_expression is None:
+                trigger_expression = self._compile_condition(expr)
+            self._trigger_expression = trigger_expression
+            self._message_bits = {}
+            for index, message in enumerate(self._messages):
+                self._message_bits[message] = (
+                    self._message_bits.get(message, 0) | (1 << index))
+            self._sat_mask = 0
+            self._live_mask = 0
+            for message, state in self.satisfied.items():
+                self._live_mask |= self._message_bits[message]
+                if state:
+                    self._sat_mask |= self._message_bits[message]
             self.conditional_expression = expr
 
+    def _compile_condition(self, expr):
+        """Compile a conditional expression string with message leaves."""
+        indices = {}
+        for index, message in enumerate(self._messages):
+            indices.setdefault(self.MESSAGE_TEMPLATE % message, index)
+        try:
+            nested_expr = ConditionalSimplifier.listify(expr)
+        except ValueError as exc:
+            raise TriggerExpressionError('"%s":\n%s%s' % (
+                expr, exc,
+                " (could be unmatched parentheses in the graph string?)"))
+        return TriggerExpression(nested_expr, indices.__getitem__)
+
     def is_satisfied(self):
         """Return True if prerequisite is satisfied.
 
@@ -159,7 +340,7 @@ class Prerequisite(object):
                 # No prerequisites left after pre-initial simplification.
                 return True
             if self.conditional_expression:
-                # Trigger expression with at least one '|': use eval.
+                # Trigger expression with at least one '|'.
                 self._all_satisfied = self._conditional_is_satisfied()
             else:
                 self._all_satisfied = all(self.satisfied.values())
@@ -172,15 +353,12 @@ class Prerequisite(object):
 
         """
         try:
-            res = eval(self.conditional_expression)
-        except (SyntaxError, ValueError) as exc:
-            err_msg = str(exc)
-            if str(exc).find("unexpected EOF") != -1:
-                err_msg += (
-                    " (could be unmatched parentheses in the graph string?)")
+            res = self._trigger_expression.evaluate(
+                self._sat_mask, self._live_mask)
+        except TriggerExpressionError as exc:
             raise TriggerExpressionError(
-                '"%s":\n%s' % (self.get_raw_conditional_expression(), err_msg))
-        return res
+                '"%s":\n%s' % (self.get_raw_conditional_expression(), exc))
+        return res is not False
 
     def satisfy_me(self, all_task_outputs):
         """Evaluate pre-requisite against known outputs.
@@ -188,13 +366,17 @@ class Prerequisite(object):
         Updates cache with the evaluation result.
 
         """
-        relevant_messages = all_task_outputs & set(self.satisfied)
+        relevant_messages = all_task_outputs & self.satisfied.keys()
+        if not relevant_messages:
+            return relevant_messages
         for message in relevant_messages:
             self.satisfied[message] = self.DEP_STATE_SATISFIED
-            if self.conditional_expression is None:
-                self._all_satisfied = all(self.satisfied.values())
-            else:
-                self._all_satisfied = self._conditional_is_satisfied()
+            if self.conditional_expression is not None:
+                self._sat_mask |= self._message_bits[message]
+        if self.conditional_expression is None:
+            self._all_satisfied = all(self.satisfied.values())
+        else:
+            self._all_satisfied = self._conditional_is_satisfied()
         return relevant_messages
 
     def dump(self):
@@ -272,6 +454,7 @@ class Prerequisite(object):
         if self.conditional_expression is None:
             self._all_satisfied = True
         else:
+            self._sat_mask = self._live_mask
             self._all_satisfied = self._conditional_is_satisfied()
 
     def set_not_satisfied(self):
@@ -282,6 +465,7 @@ class Prerequisite(object):
         """
         for message in self.satisfied:
             self.satisfied[message] = self.DEP_STATE_UNSATISFIED
+        self._sat_mask = 0
         if not self.satisfied:
             self._all_satisfied = True
         elif self.conditional_expression is None:
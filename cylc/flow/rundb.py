@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Provide data access object for the suite runtime database."""
 
+import os
 import re
 import sqlite3
 import traceback
@@ -168,6 +169,10 @@ class CylcSuiteDAO(object):
     """Data access object for the suite runtime database."""
 
     CONN_TIMEOUT = 0.2
+    # Number of prepared statements cached by each connection.
+    CONN_CACHED_STATEMENTS = 256
+    # Pragmas for persistent connections to a non-public database.
+    PERSISTENT_PRAGMAS = ("journal_mode=WAL", "synchronous=NORMAL")
     DB_FILE_BASE_NAME = "db"
     MAX_TRIES = 100
     CHECKPOINT_LATEST_ID = 0
@@ -183,6 +188,7 @@ class CylcSuiteDAO(object):
     TABLE_TASK_EVENTS = "task_events"
     TABLE_TASK_ACTION_TIMERS = "task_action_timers"
     TABLE_CHECKPOINT_ID = "checkpoint_id"
+    TABLE_CHECKPOINT_PARENTS = "checkpoint_parents"
     TABLE_TASK_LATE_FLAGS = "task_late_flags"
     TABLE_TASK_OUTPUTS = "task_outputs"
     TABLE_TASK_POOL = "task_pool"
@@ -218,6 +224,10 @@ class CylcSuiteDAO(object):
             ["time"],
             ["event"],
         ],
+        TABLE_CHECKPOINT_PARENTS: [
+            ["id", {"datatype": "INTEGER", "is_primary_key": True}],
+            ["parent", {"datatype": "INTEGER"}],
+        ],
         TABLE_INHERITANCE: [
             ["namespace", {"is_primary_key": True}],
             ["inheritance"],
@@ -314,17 +324,77 @@ class CylcSuiteDAO(object):
         ],
     }
 
-    def __init__(self, db_file_name=None, is_public=False):
+    # Secondary indexes: {name: (table, [column, ...]), ...}
+    # Increment INDEXES_VERSION on any change, for "create_indexes" to
+    # migrate existing databases.
+    # Lookups by name and cycle of task_states and task_outputs use their
+    # primary keys. There is no index of task_jobs.run_status or
+    # task_states.status, as most rows have the same value, so it would be
+    # slower than scanning the table (see "etc/bin/bench-rundb-indexes.py").
+    INDEXES = {
+        "task_events_cycle_name_idx": (
+            TABLE_TASK_EVENTS, ["cycle", "name", "submit_num"]),
+        "task_outputs_name_idx": (
+            TABLE_TASK_OUTPUTS, ["name", "cycle"]),
+        "task_states_cycle_status_idx": (
+            TABLE_TASK_STATES, ["cycle", "status"]),
+    }
+    INDEXES_VERSION = 1
+
+    # History tables archived by cycle point: {name: cycle column, ...}
+    ARCHIVE_TABLES = {
+        TABLE_BROADCAST_EVENTS: "point",
+        TABLE_TASK_EVENTS: "cycle",
+        TABLE_TASK_JOBS: "cycle",
+        TABLE_TASK_LATE_FLAGS: "cycle",
+        TABLE_TASK_OUTPUTS: "cycle",
+        TABLE_TASK_STATES: "cycle",
+    }
+    # Tables of checkpoints, archived by checkpoint ID.
+    ARCHIVE_CHECKPOINT_TABLES = [
+        TABLE_BROADCAST_STATES_CHECKPOINTS,
+        TABLE_CHECKPOINT_ID,
+        TABLE_CHECKPOINT_PARENTS,
+        TABLE_SUITE_PARAMS_CHECKPOINTS,
+        TABLE_TASK_POOL_CHECKPOINTS,
+    ]
+    # A task pool checkpoint with a row in checkpoint_parents only has the
+    # rows that differ from its parent checkpoint, and a row with a NULL
+    # status for each task removed since. Every (CHECKPOINT_MAX_DELTAS + 1)th
+    # checkpoint of a DAO has all rows, to bound the chains to read.
+    CHECKPOINT_MAX_DELTAS = 7
+    # Archive databases are in this directory, beside the database.
+    ARCHIVE_DIR_BASE_NAME = "db-archive"
+    # Maximum number of values in the "IN (...)" of a statement.
+    MAX_IN_VALUES = 500
+
+    def __init__(self, db_file_name=None, is_public=False,
+                 is_persistent=False, archive_d=None):
         """Initialise object.
 
         db_file_name - Path to the database file
         is_public - If True, allow retries, etc
+        is_persistent - If True, keep the connection open between calls to
+                        "self.execute_queued_items", so SQLite can reuse its
+                        page cache and prepared statements. For a non-public
+                        database, use WAL journalling with synchronous=NORMAL,
+                        so commits do not wait for a sync of the file system.
+        archive_d - Directory of the archive databases, by default
+                    ARCHIVE_DIR_BASE_NAME beside the database file
 
         """
         self.db_file_name = db_file_name
+        self.archive_d = archive_d
         self.is_public = is_public
+        self.is_persistent = is_persistent
         self.conn = None
+        # (st_dev, st_ino) of the database file of a persistent connection.
+        self.db_file_id = None
         self.n_tries = 0
+        # Last task pool checkpoint taken, the parent of the next one:
+        # (id, number of deltas since a full checkpoint,
+        #  {(cycle, name): (cycle, name, spawned, status, is_held), ...})
+        self.last_checkpoint = None
 
         self.tables = {}
         for name, attrs in sorted(self.TABLES_ATTRS.items()):
@@ -377,11 +447,46 @@ class CylcSuiteDAO(object):
     def connect(self):
         """Connect to the database."""
         if self.conn is None:
-            self.conn = sqlite3.connect(self.db_file_name, self.CONN_TIMEOUT)
+            self.conn = sqlite3.connect(
+                self.db_file_name, self.CONN_TIMEOUT,
+                cached_statements=self.CONN_CACHED_STATEMENTS)
+            if self.is_persistent:
+                if not self.is_public:
+                    for pragma in self.PERSISTENT_PRAGMAS:
+                        self.conn.execute("PRAGMA " + pragma)
+                stat = os.stat(self.db_file_name)
+                self.db_file_id = (stat.st_dev, stat.st_ino)
         return self.conn
 
+    def check_db_file(self):
+        """Close a persistent connection if its database file has gone.
+
+        E.g. if the suite run directory is removed, or if the database file is
+        replaced. The next call to "self.connect" will then open whatever is
+        at the path now, or fail, which ensures that the suite dies if the
+        private database has been removed.
+        """
+        if self.conn is None or not self.is_persistent:
+            return
+        try:
+            stat = os.stat(self.db_file_name)
+        except OSError:
+            self.close()
+        else:
+            if (stat.st_dev, stat.st_ino) != self.db_file_id:
+                self.close()
+
+    def flush_wal(self):
+        """Write any WAL journal of an open connection to the database file.
+
+        This ensures that the database file is complete on its own, e.g. so
+        that it can be copied.
+        """
+        if self.conn is not None:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
     def create_tables(self):
-        """Create tables."""
+        """Create tables, and their secondary indexes."""
         names = []
         for row in self.connect().execute(
                 "SELECT name FROM sqlite_master WHERE type==? ORDER BY name",
@@ -393,28 +498,95 @@ class CylcSuiteDAO(object):
                 cur = self.conn.execute(table.get_create_stmt())
         if cur is not None:
             self.conn.commit()
+        self.create_indexes()
+
+    def create_indexes(self):
+        """Create the secondary indexes in INDEXES, if not up to date.
+
+        The version of the index set is recorded as the "user_version" of
+        the database. Indexes of other versions are dropped. Indexes missing,
+        e.g. after an upgrade rebuilds a table, are created again. Indexes of
+        tables that lack their columns, not upgraded yet, are left out.
+
+        Return True if the indexes have been changed.
+        """
+        conn = self.connect()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        # Automatic indexes of primary keys have no SQL.
+        names = set(name for name, in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type==? AND sql IS NOT NULL",
+            ["index"]))
+        if version == self.INDEXES_VERSION and names == set(self.INDEXES):
+            return False
+        for name in names.difference(self.INDEXES):
+            conn.execute("DROP INDEX %s" % name)
+        for name, (table, columns) in sorted(self.INDEXES.items()):
+            table_columns = set(
+                row[1]
+                for row in conn.execute("PRAGMA table_info(%s)" % table))
+            if not table_columns.issuperset(columns):
+                # Table of an older schema, not upgraded yet.
+                continue
+            conn.execute("CREATE INDEX IF NOT EXISTS %s ON %s(%s)" % (
+                name, table, ",".join(columns)))
+        conn.execute("PRAGMA user_version=%d" % self.INDEXES_VERSION)
+        conn.commit()
+        return True
 
     def execute_queued_items(self):
         """Execute queued items for each table."""
-        try:
+        if self.execute_items(self.get_queued_items()):
+            # Clear the queues
             for table in self.tables.values():
-                # DELETE statements may have varying number of WHERE args so we
-                # can only executemany for each identical template statement.
-                for stmt, stmt_args_list in table.delete_queues.items():
-                    self._execute_stmt(stmt, stmt_args_list)
-                # INSERT statements are uniform for each table, so all INSERT
-                # statements can be executed using a single "executemany" call.
-                if table.insert_queue:
-                    self._execute_stmt(
-                        table.get_insert_stmt(), table.insert_queue)
-                # UPDATE statements can have varying number of SET and WHERE
-                # args so we can only executemany for each identical template
-                # statement.
-                for stmt, stmt_args_list in table.update_queues.items():
-                    self._execute_stmt(stmt, stmt_args_list)
+                table.delete_queues.clear()
+                table.insert_queue.clear()
+                table.update_queues.clear()
+
+    def get_queued_items(self):
+        """Return queued items as a list of (stmt, stmt_args_list).
+
+        Items are listed in the order they should be executed.
+        """
+        items = []
+        for table in self.tables.values():
+            # DELETE statements may have varying number of WHERE args so we
+            # can only executemany for each identical template statement.
+            items.extend(table.delete_queues.items())
+            # INSERT statements are uniform for each table, so all INSERT
+            # statements can be executed using a single "executemany" call.
+            if table.insert_queue:
+                items.append((table.get_insert_stmt(), table.insert_queue))
+            # UPDATE statements can have varying number of SET and WHERE
+            # args so we can only executemany for each identical template
+            # statement.
+            items.extend(table.update_queues.items())
+        return items
+
+    def pop_queued_items(self):
+        """Return queued items as "self.get_queued_items", clear the queues.
+
+        This allows the items to be executed later, e.g. by a writer thread.
+        """
+        items = self.get_queued_items()
+        for table in self.tables.values():
+            table.delete_queues = {}
+            table.insert_queue = []
+            table.update_queues = {}
+        return items
+
+    def execute_items(self, items):
+        """Execute a list of (stmt, stmt_args_list) in a single transaction.
+
+        Return True on success. If this is the public database, return False
+        on failure. If this is the private database, raise on failure.
+        """
+        self.check_db_file()
+        try:
+            for stmt, stmt_args_list in items:
+                self._execute_stmt(stmt, stmt_args_list)
             # Connection should only be opened if we have executed something.
             if self.conn is None:
-                return
+                return True
             self.conn.commit()
         except sqlite3.Error:
             if not self.is_public:
@@ -428,24 +600,22 @@ class CylcSuiteDAO(object):
                     self.conn.rollback()
                 except sqlite3.Error:
                     pass
-            return
+            return False
         else:
-            # Clear the queues
-            for table in self.tables.values():
-                table.delete_queues.clear()
-                table.insert_queue.clear()
-                table.update_queues.clear()
             # Report public database retry recovery if necessary
             if self.n_tries:
                 LOG.warning(
                     "%(file)s: recovered after (%(attempt)d) attempt(s)\n" % {
                         "file": self.db_file_name, "attempt": self.n_tries})
             self.n_tries = 0
+            return True
         finally:
             # Note: This is not strictly necessary. However, if the suite run
             # directory is removed, a forced reconnection to the private
-            # database will ensure that the suite dies.
-            self.close()
+            # database will ensure that the suite dies. A persistent
+            # connection is checked by "self.check_db_file" instead.
+            if not self.is_persistent:
+                self.close()
 
     def _execute_stmt(self, stmt, stmt_args_list):
         """Helper for "self.execute_queued_items".
@@ -620,11 +790,10 @@ class CylcSuiteDAO(object):
                 "table": self.TABLE_TASK_JOBS}
             stmt_args = [cycle, name, submit_num]
         try:
-            for row in self.connect().execute(stmt, stmt_args):
-                ret = {}
-                for key, value in zip(keys, row):
-                    ret[key] = value
-                return ret
+            # Jobs of a task at an archived cycle are in the archive, and
+            # any later jobs, with higher submit numbers, in the database.
+            for row in self.select_with_archives(stmt, stmt_args):
+                return dict(zip(keys, row))
         except sqlite3.DatabaseError:
             return None
 
@@ -669,16 +838,24 @@ class CylcSuiteDAO(object):
         # Ignore bandit false positive: B608: hardcoded_sql_expressions
         # Not an injection, simply putting the table name in the SQL query
         # expression as a string constant local to this module.
-        stmt = (  # nosec
-            r"SELECT name,cycle,submit_num FROM %(name)s"
-            r" WHERE name==? AND cycle==?"
-        ) % {"name": self.TABLE_TASK_STATES}
+        # The database and its archives are read, so the submit numbers of
+        # tasks at archived cycles carry on from their archived jobs.
+        task_ids = list(task_ids)
+        n_ids = self.MAX_IN_VALUES // 2
         ret = {}
-        for task_name, task_cycle in task_ids:
-            for name, cycle, submit_num in self.connect().execute(
-                stmt, (task_name, task_cycle,)
-            ):
-                ret[(name, cycle)] = submit_num
+        for i in range(0, len(task_ids), n_ids):
+            chunk = task_ids[i:i + n_ids]
+            stmt = (  # nosec
+                r"SELECT name,cycle,submit_num FROM %(name)s WHERE %(where)s"
+            ) % {
+                "name": self.TABLE_TASK_STATES,
+                "where": " OR ".join(["(name==? AND cycle==?)"] * len(chunk))}
+            stmt_args = [value for task_id in chunk for value in task_id]
+            for name, cycle, submit_num in self.select_with_archives(
+                    stmt, stmt_args):
+                if submit_num is not None and (
+                        ret.get((name, cycle)) or 0) <= submit_num:
+                    ret[(name, cycle)] = submit_num
         return ret
 
     def select_xtriggers_for_restart(self, callback):
@@ -694,19 +871,72 @@ class CylcSuiteDAO(object):
 
         If id_key is specified,
         select from task_pool table if id_key == CHECKPOINT_LATEST_ID.
-        Otherwise select from task_pool_checkpoints where id == id_key.
+        Otherwise select the task pool of checkpoint id_key, see
+        "execute_task_pool_checkpoint".
         """
         form_stmt = r"SELECT cycle,name,spawned,status,is_held FROM %s"
         if id_key is None or id_key == self.CHECKPOINT_LATEST_ID:
-            stmt = form_stmt % self.TABLE_TASK_POOL
-            stmt_args = []
+            rows = self.connect().execute(form_stmt % self.TABLE_TASK_POOL)
         else:
-            stmt = (
-                form_stmt % self.TABLE_TASK_POOL_CHECKPOINTS + r" WHERE id==?")
-            stmt_args = [id_key]
-        for row_idx, row in enumerate(self.connect().execute(stmt, stmt_args)):
+            rows = self.execute_task_pool_checkpoint(
+                form_stmt % r"%(task_pool_from)s", {}, id_key)
+        for row_idx, row in enumerate(rows):
             callback(row_idx, list(row))
 
+    def select_checkpoint_parents(self):
+        """Return {id: parent, ...} of the delta task pool checkpoints."""
+        return dict(self.connect().execute(
+            r"SELECT id,parent FROM %s" % self.TABLE_CHECKPOINT_PARENTS))
+
+    def execute_task_pool_checkpoint(self, form_stmt, form_data, id_key):
+        """Yield the rows of a statement on the task pool of a checkpoint.
+
+        form_stmt should select the cycle and name of the task pool first,
+        from "%(task_pool_from)s", qualifying the columns of the task pool by
+        "%(task_pool)s". form_data has the values of its other fields.
+
+        The task pool of a delta checkpoint is the latest row of each task in
+        the chain of checkpoints from id_key back to a full checkpoint,
+        leaving out tasks removed from the pool. The statement is executed
+        on the latest rows of the deltas, then on the rows of the full
+        checkpoint, leaving out the tasks in the deltas, so the bulk of the
+        rows are selected as fast as from a full checkpoint.
+        """
+        chain = [id_key]
+        parents = self.select_checkpoint_parents()
+        while chain[-1] in parents and len(chain) <= len(parents):
+            chain.append(parents[chain[-1]])
+        deltas = chain[:-1]
+        form_data = dict(form_data)
+        form_data["task_pool"] = self.TABLE_TASK_POOL_CHECKPOINTS
+        conn = self.connect()
+        keys = set()
+        if deltas:
+            # Parents have lower IDs. In an aggregate query with MAX(),
+            # SQLite takes the values of the other columns from the row of
+            # the maximum.
+            in_str = ",".join("?" * len(deltas))
+            keys.update(conn.execute(
+                r"SELECT DISTINCT cycle,name FROM %s WHERE id IN (%s)" % (
+                    self.TABLE_TASK_POOL_CHECKPOINTS, in_str),
+                deltas))
+            form_data["task_pool_from"] = (
+                r"(SELECT cycle,name,spawned,status,is_held FROM"
+                r" (SELECT MAX(id),cycle,name,spawned,status,is_held FROM %s"
+                r" WHERE id IN (%s) GROUP BY cycle,name)"
+                r" WHERE status IS NOT NULL) AS %s" % (
+                    self.TABLE_TASK_POOL_CHECKPOINTS, in_str,
+                    self.TABLE_TASK_POOL_CHECKPOINTS))
+            for row in conn.execute(form_stmt % form_data, deltas):
+                yield row
+        form_data["task_pool_from"] = (
+            r"(SELECT * FROM %s WHERE id==?) AS %s" % (
+                self.TABLE_TASK_POOL_CHECKPOINTS,
+                self.TABLE_TASK_POOL_CHECKPOINTS))
+        for row in conn.execute(form_stmt % form_data, chain[-1:]):
+            if (row[0], row[1]) not in keys:
+                yield row
+
     def select_task_pool_for_restart(self, callback, id_key=None):
         """Select from task_pool+task_states+task_jobs for restart.
 
@@ -716,7 +946,8 @@ class CylcSuiteDAO(object):
 
         If id_key is specified,
         select from task_pool table if id_key == CHECKPOINT_LATEST_ID.
-        Otherwise select from task_pool_checkpoints where id == id_key.
+        Otherwise select the task pool of checkpoint id_key, see
+        "execute_task_pool_checkpoint".
         """
         form_stmt = r"""
             SELECT
@@ -734,7 +965,7 @@ class CylcSuiteDAO(object):
                 %(task_timeout_timers)s.timeout,
                 %(task_outputs)s.outputs
             FROM
-                %(task_pool)s
+                %(task_pool_from)s
             JOIN
                 %(task_states)s
             ON  %(task_pool)s.cycle == %(task_states)s.cycle AND
@@ -759,6 +990,7 @@ class CylcSuiteDAO(object):
         """
         form_data = {
             "task_pool": self.TABLE_TASK_POOL,
+            "task_pool_from": self.TABLE_TASK_POOL,
             "task_states": self.TABLE_TASK_STATES,
             "task_late_flags": self.TABLE_TASK_LATE_FLAGS,
             "task_timeout_timers": self.TABLE_TASK_TIMEOUT_TIMERS,
@@ -766,13 +998,11 @@ class CylcSuiteDAO(object):
             "task_outputs": self.TABLE_TASK_OUTPUTS,
         }
         if id_key is None or id_key == self.CHECKPOINT_LATEST_ID:
-            stmt = form_stmt % form_data
-            stmt_args = []
+            rows = self.connect().execute(form_stmt % form_data)
         else:
-            form_data["task_pool"] = self.TABLE_TASK_POOL_CHECKPOINTS
-            stmt = (form_stmt + r" WHERE %(task_pool)s.id==?") % form_data
-            stmt_args = [id_key]
-        for row_idx, row in enumerate(self.connect().execute(stmt, stmt_args)):
+            rows = self.execute_task_pool_checkpoint(
+                form_stmt, form_data, id_key)
+        for row_idx, row in enumerate(rows):
             callback(row_idx, list(row))
 
     def select_task_times(self):
@@ -802,7 +1032,133 @@ class CylcSuiteDAO(object):
             'name', 'cycle', 'host', 'batch_system',
             'submit_time', 'start_time', 'succeed_time'
         )
-        return columns, [r for r in self.connect().execute(q)]
+        return columns, self.select_with_archives(q)
+
+    @classmethod
+    def get_archive_paths(cls, db_file_name, archive_d=None):
+        """Return the paths of the archive databases of db_file_name.
+
+        The archives are in archive_d, by default ARCHIVE_DIR_BASE_NAME beside
+        db_file_name.
+        """
+        if archive_d is None:
+            archive_d = os.path.join(
+                os.path.dirname(db_file_name), cls.ARCHIVE_DIR_BASE_NAME)
+        try:
+            names = os.listdir(archive_d)
+        except OSError:
+            return []
+        return [
+            os.path.join(archive_d, name) for name in sorted(names)
+            if not name.endswith(("-journal", "-shm", "-wal"))]
+
+    def select_with_archives(self, stmt, stmt_args=None):
+        """Return the rows of stmt from the database and its archives."""
+        if stmt_args is None:
+            stmt_args = []
+        rows = list(self.connect().execute(stmt, stmt_args))
+        for archive_path in self.get_archive_paths(
+                self.db_file_name, self.archive_d):
+            try:
+                conn = sqlite3.connect(archive_path, self.CONN_TIMEOUT)
+            except sqlite3.Error:
+                continue
+            try:
+                rows.extend(conn.execute(stmt, stmt_args))
+            except sqlite3.Error as exc:
+                LOG.warning("%s: %s", archive_path, exc)
+            finally:
+                conn.close()
+        return rows
+
+    def select_archive_cycles(self):
+        """Return the set of the cycles of the rows of ARCHIVE_TABLES."""
+        return set(row[0] for row in self.connect().execute(
+            " UNION ".join(
+                "SELECT DISTINCT %s FROM %s" % (column, table)
+                for table, column in sorted(self.ARCHIVE_TABLES.items()))))
+
+    def select_checkpoint_cycles(self):
+        """Return {id: set([cycle, ...]), ...} of the task pool checkpoints.
+
+        The latest checkpoint is left out.
+        """
+        checkpoint_cycles = {}
+        for id_, cycle in self.connect().execute(
+                "SELECT DISTINCT id, cycle FROM %s WHERE id!=?" % (
+                    self.TABLE_TASK_POOL_CHECKPOINTS),
+                [self.CHECKPOINT_LATEST_ID]):
+            checkpoint_cycles.setdefault(id_, set()).add(cycle)
+        return checkpoint_cycles
+
+    def archive(self, archive_path, cycles=None, checkpoint_ids=None):
+        """Move rows to the archive database at archive_path.
+
+        Move the rows of cycles of ARCHIVE_TABLES, and the rows of
+        checkpoint_ids of ARCHIVE_CHECKPOINT_TABLES, in one transaction.
+        Create the archive database, with the same schema, if needed.
+
+        Rows of the archive are never replaced. A row whose primary key is
+        already in the archive with other values, e.g. the task_states row of
+        a task inserted again at an archived cycle, is left in the database,
+        which readers read before the archives.
+
+        Return {table: [{column: value, ...}, ...], ...} of the rows left.
+        """
+        os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+        CylcSuiteDAO(archive_path).close()
+        moves = []
+        for values, tables in [
+                (list(cycles or []), sorted(self.ARCHIVE_TABLES.items())),
+                (list(checkpoint_ids or []),
+                 [(table, "id") for table in self.ARCHIVE_CHECKPOINT_TABLES])]:
+            for i in range(0, len(values), self.MAX_IN_VALUES):
+                chunk = values[i:i + self.MAX_IN_VALUES]
+                for table, column in tables:
+                    moves.append((table, column, chunk))
+        left_rows = {}
+        if not moves:
+            return left_rows
+        conn = self.connect()
+        conn.execute("ATTACH DATABASE ? AS archive", [archive_path])
+        try:
+            for table, column, chunk in moves:
+                columns = [col.name for col in self.tables[table].columns]
+                columns_str = ", ".join(columns)
+                where_str = "%s IN (%s)" % (column, ",".join("?" * len(chunk)))
+                conn.execute(
+                    "INSERT OR IGNORE INTO archive.%s (%s)"
+                    " SELECT %s FROM main.%s WHERE %s" % (
+                        table, columns_str, columns_str, table, where_str),
+                    chunk)
+                if not any(
+                        col.is_primary_key
+                        for col in self.tables[table].columns):
+                    conn.execute(
+                        "DELETE FROM main.%s WHERE %s" % (table, where_str),
+                        chunk)
+                    continue
+                # Only delete the rows now in the archive.
+                conn.execute(
+                    "DELETE FROM main.%s WHERE %s AND EXISTS ("
+                    " SELECT 1 FROM archive.%s AS archived WHERE %s)" % (
+                        table, where_str, table, " AND ".join(
+                            "archived.%s IS main.%s.%s" % (col, table, col)
+                            for col in columns)),
+                    chunk)
+                for row in conn.execute(
+                        "SELECT %s FROM main.%s WHERE %s" % (
+                            columns_str, table, where_str),
+                        chunk):
+                    left_rows.setdefault(table, []).append(
+                        dict(zip(columns, row)))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        finally:
+            conn.execute("DETACH DATABASE archive")
+        return left_rows
 
     def take_checkpoints(self, event, other_daos=None):
         """Add insert items to *_checkpoints tables.
@@ -812,6 +1168,11 @@ class CylcSuiteDAO(object):
         prepare an insert into the checkpoint_id table the event and the
         current time.
 
+        The task pool is checkpointed as a delta of the last checkpoint taken
+        by this DAO, or else the last checkpoint in the database, if it
+        still exists, and the chain of deltas from the last full checkpoint
+        is not longer than CHECKPOINT_MAX_DELTAS.
+
         If other_daos is a specified, it should be a list of CylcSuiteDAO
         objects.  The logic will prepare insertion of the same items into the
         *_checkpoints tables of these DAOs as well.
@@ -829,17 +1190,66 @@ class CylcSuiteDAO(object):
                 id_, get_current_time_string(), event])
         for table_name in [
                 self.TABLE_SUITE_PARAMS,
-                self.TABLE_BROADCAST_STATES,
-                self.TABLE_TASK_POOL]:
+                self.TABLE_BROADCAST_STATES]:
             for row in self.connect().execute("SELECT * FROM %s" % table_name):
                 for dao in daos:
                     dao.tables[table_name + "_checkpoints"].add_insert_item(
                         [id_] + list(row))
+        pool = {
+            row[0:2]: row for row in self.connect().execute(
+                "SELECT cycle,name,spawned,status,is_held FROM %s" %
+                self.TABLE_TASK_POOL)}
+        rows = list(pool.values())
+        n_deltas = 0
+        if self.last_checkpoint is None and id_ > 1:
+            self.last_checkpoint = self._select_last_checkpoint(id_ - 1)
+        if self.last_checkpoint is not None:
+            parent, n_deltas, parent_pool = self.last_checkpoint
+            n_deltas += 1
+            if n_deltas > self.CHECKPOINT_MAX_DELTAS or not list(
+                    self.connect().execute(
+                        "SELECT id FROM checkpoint_id WHERE id==?",
+                        [parent])):
+                n_deltas = 0
+            else:
+                rows = [
+                    row for key, row in pool.items()
+                    if parent_pool.get(key) != row]
+                rows.extend(
+                    key + (None, None, None)
+                    for key in parent_pool if key not in pool)
+                for dao in daos:
+                    dao.tables[self.TABLE_CHECKPOINT_PARENTS].add_insert_item(
+                        [id_, parent])
+        for row in rows:
+            for dao in daos:
+                dao.tables[self.TABLE_TASK_POOL_CHECKPOINTS].add_insert_item(
+                    [id_] + list(row))
+        self.last_checkpoint = (id_, n_deltas, pool)
+
+    def _select_last_checkpoint(self, id_key):
+        """Return the last_checkpoint tuple of checkpoint id_key."""
+        n_deltas = 0
+        parents = self.select_checkpoint_parents()
+        parent = id_key
+        while parent in parents and n_deltas < len(parents):
+            parent = parents[parent]
+            n_deltas += 1
+        if n_deltas >= self.CHECKPOINT_MAX_DELTAS:
+            return (id_key, n_deltas, {})  # the next checkpoint is full
+        form_stmt = r"SELECT cycle,name,spawned,status,is_held FROM %s"
+        return (id_key, n_deltas, {
+            row[0:2]: row for row in self.execute_task_pool_checkpoint(
+                form_stmt % r"%(task_pool_from)s", {}, id_key)})
 
     def vacuum(self):
         """Vacuum to the database."""
         return self.connect().execute("VACUUM")
 
+    def optimize(self):
+        """Update the statistics of the query planner, where useful."""
+        return self.connect().execute("PRAGMA optimize")
+
     def remove_columns(self, table, to_drop):
         conn = self.connect()
 
@@ -47,9 +47,13 @@ from cylc.flow.exceptions import (
     TaskProxySequenceBoundsError
 )
 import cylc.flow.flags
+from cylc.flow.func_worker_pool import FuncWorkerPool
 from cylc.flow.host_appointer import HostAppointer, EmptyHostList
 from cylc.flow.hostuserutil import get_host, get_user, get_fqdn_by_host
+from cylc.flow.job_agent import JobAgentPool
 from cylc.flow.job_pool import JobPool
+from cylc.flow.job_status_watcher import JobStatusWatcher
+from cylc.flow.suite_state_service import SuiteStateService
 from cylc.flow.loggingutil import (
     TimestampRotatingFileHandler,
     ReferenceLogFileHandler
@@ -91,6 +95,7 @@ from cylc.flow.task_state import (
 from cylc.flow.templatevars import load_template_vars
 from cylc.flow import __version__ as CYLC_VERSION
 from cylc.flow.data_store_mgr import DataStoreMgr
+from cylc.flow.wakeup import Wakeup, WakeupQueue
 from cylc.flow.wallclock import (
     get_current_time_string,
     get_seconds_as_interval_string,
@@ -195,6 +200,10 @@ class Scheduler(object):
         self.state_summary_mgr = None
         self.pool = None
         self.proc_pool = None
+        self.func_pool = None
+        self.job_agent_pool = None
+        self.job_status_watcher = None
+        self.suite_state_service = None
         self.task_job_mgr = None
         self.task_events_mgr = None
         self.suite_event_handler = None
@@ -206,6 +215,7 @@ class Scheduler(object):
         self.command_queue = None
         self.message_queue = None
         self.ext_trigger_queue = None
+        self.main_loop_wakeup = None
         self.ws_data_mgr = None
         self.job_pool = None
 
@@ -228,7 +238,8 @@ class Scheduler(object):
 
         self.suite_db_mgr = SuiteDatabaseManager(
             suite_files.get_suite_srv_dir(self.suite),  # pri_d
-            os.path.join(self.suite_run_dir, 'log'))                 # pub_d
+            os.path.join(self.suite_run_dir, 'log'),                 # pub_d
+            glbl_cfg().get(['persistent run database connection']))
         self.broadcast_mgr = BroadcastMgr(self.suite_db_mgr)
         self.xtrigger_mgr = None  # type: XtriggerManager
 
@@ -391,11 +402,29 @@ see `COPYING' in the Cylc source distribution.
         self.profiler.log_memory("scheduler.py: start configure")
 
         # Start up essential services
-        self.proc_pool = SubProcPool()
+        if glbl_cfg().get(['event driven main loop']):
+            # Wake the main loop on queued items and commands, and on child
+            # process exits.
+            self.main_loop_wakeup = Wakeup()
+            self.main_loop_wakeup.watch_child_exits()
+            self.command_queue = WakeupQueue(self.main_loop_wakeup)
+            self.message_queue = WakeupQueue(self.main_loop_wakeup)
+            self.ext_trigger_queue = WakeupQueue(self.main_loop_wakeup)
+        else:
+            self.command_queue = Queue()
+            self.message_queue = Queue()
+            self.ext_trigger_queue = Queue()
+        self.proc_pool = SubProcPool(self.main_loop_wakeup)
+        if glbl_cfg().get(['xtrigger worker pool size']):
+            self.func_pool = FuncWorkerPool(
+                glbl_cfg().get(['xtrigger worker pool size']),
+                glbl_cfg().get(['process pool timeout']))
+        self.job_agent_pool = JobAgentPool(
+            glbl_cfg().get(['process pool timeout']),
+            glbl_cfg().get(['job agent poll cache window']))
+        self.job_status_watcher = JobStatusWatcher(self.message_queue)
+        self.suite_state_service = SuiteStateService(self.main_loop_wakeup)
         self.state_summary_mgr = StateSummaryMgr()
-        self.command_queue = Queue()
-        self.message_queue = Queue()
-        self.ext_trigger_queue = Queue()
         self.suite_event_handler = SuiteEventHandler(self.proc_pool)
         self.job_pool = JobPool(self.suite, self.owner)
         self.task_events_mgr = TaskEventsManager(
@@ -404,13 +433,17 @@ see `COPYING' in the Cylc source distribution.
         self.task_events_mgr.uuid_str = self.uuid_str
         self.task_job_mgr = TaskJobManager(
             self.suite, self.proc_pool, self.suite_db_mgr,
-            self.task_events_mgr, self.job_pool)
+            self.task_events_mgr, self.job_pool,
+            job_agent_pool=self.job_agent_pool,
+            job_status_watcher=self.job_status_watcher)
         self.task_job_mgr.task_remote_mgr.uuid_str = self.uuid_str
 
         self.xtrigger_mgr = XtriggerManager(
             self.suite, self.owner,
             broadcast_mgr=self.broadcast_mgr,
             proc_pool=self.proc_pool,
+            func_pool=self.func_pool,
+            suite_state_service=self.suite_state_service,
             suite_run_dir=self.suite_run_dir,
             suite_share_dir=self.suite_share_dir,
             suite_source_dir=self.suite_dir)
@@ -610,7 +643,10 @@ see `COPYING' in the Cylc source distribution.
 
     def process_queued_task_messages(self):
         """Handle incoming task messages for each task proxy."""
+        # {task_id: [(submit_num, event_time, severity, message), ...], ...}
         messages = {}
+        # Parsed task job IDs: {task_job: (task_id, submit_num), ...}
+        task_jobs = {}
         while self.message_queue.qsize():
             try:
                 task_job, event_time, severity, message = (
@@ -618,28 +654,37 @@ see `COPYING' in the Cylc source distribution.
             except Empty:
                 break
             self.message_queue.task_done()
-            cycle, task_name, submit_num = (
-                self.job_pool.parse_job_item(task_job))
-            task_id = TaskID.get(task_name, cycle)
+            # Messages of watched jobs arrive from the job status file too.
+            if (
+                self.job_status_watcher is not None and
+                not self.job_status_watcher.is_new_message(
+                    task_job, event_time, message)
+            ):
+                continue
+            try:
+                task_id, submit_num = task_jobs[task_job]
+            except KeyError:
+                cycle, task_name, submit_num = (
+                    self.job_pool.parse_job_item(task_job))
+                task_id = TaskID.get(task_name, cycle)
+                task_jobs[task_job] = (task_id, submit_num)
             messages.setdefault(task_id, [])
             messages[task_id].append(
                 (submit_num, event_time, severity, message))
+        # Dispatch to tasks in the main pool by ID, in one batch.
+        items = []
+        for task_id, message_items in messages.items():
+            itask = self.pool.get_pool_task(task_id)
+            if itask is None:
+                continue
+            for submit_num, event_time, severity, message in message_items:
+                items.append(
+                    (itask, submit_num, event_time, severity, message))
         # Note on to_poll_tasks: If an incoming message is going to cause a
         # reverse change to task state, it is desirable to confirm this by
         # polling.
-        to_poll_tasks = []
-        for itask in self.pool.get_tasks():
-            message_items = messages.get(itask.identity)
-            if message_items is None:
-                continue
-            should_poll = False
-            for submit_num, event_time, severity, message in message_items:
-                if self.task_events_mgr.process_message(
-                        itask, severity, message, event_time,
-                        self.task_events_mgr.FLAG_RECEIVED, submit_num):
-                    should_poll = True
-            if should_poll:
-                to_poll_tasks.append(itask)
+        to_poll_tasks = self.task_events_mgr.process_messages(
+            items, self.task_events_mgr.FLAG_RECEIVED)
         self.task_job_mgr.poll_task_jobs(
             self.suite, to_poll_tasks, poll_succ=True)
 
@@ -1237,6 +1282,13 @@ see `COPYING' in the Cylc source distribution.
                 self.is_updated = True
 
         self.broadcast_mgr.expire_broadcast(self.pool.get_min_point())
+        archive_horizon = self.config.get_archive_horizon()
+        if (
+                archive_horizon is not None and
+                self.pool.get_min_point() is not None
+        ):
+            self.suite_db_mgr.archive(
+                self.pool.get_min_point() - archive_horizon)
         self.xtrigger_mgr.housekeep()
         self.suite_db_mgr.put_xtriggers(self.xtrigger_mgr.sat_xtrig)
         LOG.debug("END TASK PROCESSING (took %s seconds)" % (time() - time0))
@@ -1295,18 +1347,23 @@ see `COPYING' in the Cylc source distribution.
         if self.pool.can_stop(self.stop_mode):
             self.update_data_structure()
             self.proc_pool.close()
+            self.job_agent_pool.close()
             if self.stop_mode != StopMode.REQUEST_NOW_NOW:
                 # Wait for process pool to complete,
                 # unless --now --now is requested
                 stop_process_pool_empty_msg = (
                     "Waiting for the command process pool to empty" +
                     " for shutdown")
-                while self.proc_pool.is_not_done():
+                while (
+                        self.proc_pool.is_not_done() or
+                        self.job_agent_pool.is_not_done()
+                ):
                     sleep(self.INTERVAL_STOP_PROCESS_POOL_EMPTY)
                     if stop_process_pool_empty_msg:
                         LOG.info(stop_process_pool_empty_msg)
                         stop_process_pool_empty_msg = None
                     self.proc_pool.process()
+                    self.job_agent_pool.process()
                     self.process_command_queue()
             if self.options.profile_mode:
                 self.profiler.log_memory(
@@ -1580,6 +1637,10 @@ see `COPYING' in the Cylc source distribution.
                 self.is_updated = True
                 self.task_events_mgr.pflag = True
             self.proc_pool.process()
+            self.job_agent_pool.process()
+            if self.func_pool is not None:
+                self.func_pool.process()
+            self.suite_state_service.process()
 
             # PROCESS ALL TASKS whenever something has changed that might
             # require renegotiation of dependencies, etc.
@@ -1622,8 +1683,36 @@ see `COPYING' in the Cylc source distribution.
             # Quick sleep if there are items pending in process pool.
             # (Should probably use quick sleep logic for other queues?)
             elapsed = time() - tinit
-            quick_mode = self.proc_pool.is_not_done()
-            if (elapsed >= self.INTERVAL_MAIN_LOOP or
+            # Results of function worker and job agent calls do not set the
+            # wakeup.
+            funcs_not_done = (
+                self.func_pool is not None and self.func_pool.is_not_done() or
+                self.job_agent_pool.is_not_done())
+            quick_mode = (
+                funcs_not_done or self.proc_pool.is_not_done() or
+                self.suite_state_service.is_not_done())
+            if self.main_loop_wakeup is not None:
+                # Wait for queued items or child process exits, or for the
+                # main loop interval (the next timer check) to be up.
+                if (
+                        self.task_events_mgr.pflag
+                        or self.xtrigger_mgr.pflag
+                        or self.task_job_mgr.task_remote_mgr.ready
+                ):
+                    # Task processing is due on the next pass.
+                    interval = 0.0
+                elif funcs_not_done or (
+                        quick_mode and
+                        not self.main_loop_wakeup.is_watching_child_exits):
+                    interval = self.INTERVAL_MAIN_LOOP_QUICK
+                else:
+                    interval = self.INTERVAL_MAIN_LOOP
+                next_deadline = self.pool.get_next_task_deadline()
+                if next_deadline is not None:
+                    # Wake up for the next clock trigger, expiry or retry.
+                    interval = min(interval, next_deadline - tinit)
+                self.main_loop_wakeup.wait(max(0.0, interval - elapsed))
+            elif (elapsed >= self.INTERVAL_MAIN_LOOP or
                     quick_mode and elapsed >= self.INTERVAL_MAIN_LOOP_QUICK):
                 # Main loop has taken quite a bit to get through
                 # Still yield control to other threads by sleep(0.0)
@@ -1744,16 +1833,14 @@ see `COPYING' in the Cylc source distribution.
 
         broadcast_mgr = self.task_events_mgr.broadcast_mgr
         broadcast_mgr.add_ext_triggers(self.ext_trigger_queue)
-        now = time()
-        for itask in self.pool.get_tasks():
-            # External trigger matching and task expiry must be done
-            # regardless, so they need to be in separate "if ..." blocks.
-            if broadcast_mgr.match_ext_trigger(itask):
-                process = True
-            if self.pool.set_expired_task(itask, now):
-                process = True
-            if itask.is_ready(now):
-                process = True
+        if broadcast_mgr.ext_triggers:
+            for itask in self.pool.get_tasks():
+                if broadcast_mgr.match_ext_trigger(itask):
+                    process = True
+        # Only tasks with clock trigger, expiry or retry times due are
+        # checked here. Other changes to task readiness set the flags above.
+        if self.pool.process_task_deadlines(time()):
+            process = True
         if (
             self.config.run_mode('simulation') and
             self.pool.sim_time_check(self.message_queue)
@@ -1779,6 +1866,18 @@ see `COPYING' in the Cylc source distribution.
                 self.proc_pool.terminate()
             self.proc_pool.process()
 
+        if self.func_pool is not None:
+            self.func_pool.terminate()
+
+        if self.job_agent_pool is not None:
+            self.job_agent_pool.terminate()
+
+        if self.suite_state_service is not None:
+            self.suite_state_service.terminate()
+
+        if self.job_status_watcher is not None:
+            self.job_status_watcher.stop()
+
         if self.pool is not None:
             self.pool.warn_stop_orphans()
             try:
@@ -1825,6 +1924,9 @@ see `COPYING' in the Cylc source distribution.
             else:
                 self.run_event_handlers(self.EVENT_ABORTED, str(reason))
 
+        if self.main_loop_wakeup is not None:
+            self.main_loop_wakeup.close()
+
     def set_stop_clock(self, unix_time):
         """Set stop clock time."""
         LOG.info(
@@ -285,6 +285,8 @@ discovery_commands['check-versions'] = ['check-versions']
 task_commands = {}
 task_commands['submit'] = ['submit', 'single']
 task_commands['message'] = ['message', 'task-message']
+task_commands['message-relay'] = ['message-relay']
+task_commands['jobs-agent'] = ['jobs-agent']
 task_commands['jobs-kill'] = ['jobs-kill']
 task_commands['jobs-poll'] = ['jobs-poll']
 task_commands['jobs-submit'] = ['jobs-submit']
@@ -372,6 +374,8 @@ comsum['check-versions'] = 'Compare cylc versions on task host accounts'
 # task
 comsum['submit'] = 'Run a single task just as its parent suite would'
 comsum['message'] = 'Report task messages'
+comsum['message-relay'] = '(Internal) Relay task messages in batches'
+comsum['jobs-agent'] = '(Internal) Run task job commands'
 comsum['jobs-kill'] = '(Internal) Kill task jobs'
 comsum['jobs-poll'] = '(Internal) Retrieve status for task jobs'
 comsum['jobs-submit'] = '(Internal) Submit task jobs'
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""cylc [control] jobs-agent [--poll-cache-window=SECONDS]
+
+(This command is for internal use.) Run "cylc jobs-submit", "cylc jobs-poll"
+and "cylc jobs-kill" commands sent by the suite server program on STDIN, and
+write their results to STDOUT, until STDIN is closed.
+
+Batch system poll results can be reused by later "cylc jobs-poll" commands
+for a number of seconds, so that there is at most one batch system query for
+each batch system in this time.
+
+"""
+import os
+
+from cylc.flow.option_parsers import CylcOptionParser as COP
+from cylc.flow.remote import remrun
+from cylc.flow.terminal import cli_function
+
+
+def get_option_parser():
+    parser = COP(__doc__, argdoc=[])
+    parser.add_option(
+        "--poll-cache-window",
+        help="Reuse batch system poll results for this many seconds.",
+        metavar="SECONDS",
+        action="store",
+        type="float",
+        dest="poll_cache_window",
+        default=0.0,
+    )
+    return parser
+
+
+@cli_function(get_option_parser)
+def main(parser, options):
+    """CLI main."""
+    if not remrun():
+        from cylc.flow.batch_sys_manager import BatchSysManager
+
+        # Keep STDIN and STDOUT for messages only. Batch system commands get
+        # /dev/null and STDERR instead.
+        in_handle = os.fdopen(os.dup(0), 'rb')
+        out_handle = os.fdopen(os.dup(1), 'wb')
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        os.close(null_fd)
+        os.dup2(2, 1)
+        BatchSysManager(options.poll_cache_window).jobs_agent(
+            in_handle, out_handle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""cylc [task] message-relay [--window=SECONDS] [--pid=PID] -- REG TASK-JOB
+
+(This command is for internal use.) Start a task message relay for a task
+job, and print the path of its socket. The relay runs in the background, and
+sends the messages of "cylc message" commands of the job, which find it with
+the CYLC_TASK_MESSAGE_RELAY environment variable, to the suite server program
+in batches.
+
+Messages received within a window of seconds are sent together, over the same
+connection. The relay exits after sending a message that ends the job, or
+when the job process is gone.
+
+"""
+import os
+import shutil
+import sys
+
+import cylc.flow.flags
+from cylc.flow.option_parsers import CylcOptionParser as COP
+from cylc.flow.task_message_relay import TaskMessageRelay, open_relay_socket
+from cylc.flow.terminal import cli_function
+
+
+def get_option_parser():
+    parser = COP(
+        __doc__, comms=True,
+        argdoc=[
+            ('REG', 'Suite name'),
+            ('TASK-JOB', 'Task job identifier CYCLE/TASK_NAME/SUBMIT_NUM')])
+    parser.add_option(
+        "--window",
+        help="Send messages received within this many seconds together.",
+        metavar="SECONDS",
+        action="store",
+        type="float",
+        dest="window",
+        default=0.5,
+    )
+    parser.add_option(
+        "--pid",
+        help="Exit when the job process with this ID is gone.",
+        metavar="PID",
+        action="store",
+        type="int",
+        dest="pid",
+        default=None,
+    )
+    return parser
+
+
+@cli_function(get_option_parser)
+def main(parser, options, suite, task_job):
+    """CLI main."""
+    cylc.flow.flags.debug = os.getenv('CYLC_DEBUG') == 'true'
+    sock, path = open_relay_socket()
+    if os.fork():
+        # Parent: let the job know where the relay is.
+        print(path)
+        sys.stdout.flush()
+        os._exit(0)
+    # Child: release STDIN and STDOUT, e.g. for the caller's "$(...)".
+    null_fd = os.open(os.devnull, os.O_RDWR)
+    os.dup2(null_fd, 0)
+    os.dup2(null_fd, 1)
+    os.close(null_fd)
+    try:
+        TaskMessageRelay(
+            suite, task_job, options.window, sock, options.pid).run()
+    finally:
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@
 from collections import deque
 import json
 import os
-import select
+import selectors
 from signal import SIGKILL
 import sys
 from tempfile import SpooledTemporaryFile
@@ -29,6 +29,7 @@ from subprocess import DEVNULL  # nosec
 from cylc.flow import LOG
 from cylc.flow.cfgspec.glbl_cfg import glbl_cfg
 from cylc.flow.cylc_subproc import procopen
+from cylc.flow.timer_heap import TimerHeap
 from cylc.flow.wallclock import get_current_time_string
 
 _XTRIG_FUNCS = {}
@@ -106,6 +107,11 @@ class SubProcPool(object):
     SubProcContext object as they are read. STDIN can also be specified for the
     command. This is currently fed into the command using a temporary file.
 
+    Running commands are watched with a selector: STDOUT and STDERR are read
+    as data becomes available, and exits are detected via a process file
+    descriptor where the OS supports it (Linux "pidfd"), otherwise by polling
+    each running command. Commands are killed when they reach their timeout.
+
     Note: For a cylc command that uses
     `cylc.flow.option_parsers.CylcOptionParser`, the default logging handler
     writes to the STDERR via a StreamHandler. Therefore, log messages will
@@ -116,10 +122,9 @@ class SubProcPool(object):
 
     ERR_SUITE_STOPPING = 'suite stopping, command not run'
     JOBS_SUBMIT = 'jobs-submit'
-    POLLREAD = select.POLLIN | select.POLLPRI
     RET_CODE_SUITE_STOPPING = 999
 
-    def __init__(self):
+    def __init__(self, wakeup=None):
         self.size = glbl_cfg().get(['process pool size'])
         self.proc_pool_timeout = glbl_cfg().get(['process pool timeout'])
         self.closed = False  # Close queue
@@ -127,11 +132,19 @@ class SubProcPool(object):
         # .stopping may be set by an API command in a different thread
         self.stopping_lock = RLock()
         self.queuings = deque()
-        self.runnings = []
-        try:
-            self.pipepoller = select.poll()
-        except AttributeError:  # select.poll not implemented for this OS
-            self.pipepoller = None
+        # {proc: [proc, ctx, callback, callback_args], ...}
+        self.runnings = {}
+        # cylc.flow.wakeup.Wakeup to set when a command is queued
+        self.wakeup = wakeup
+        # Selector for STDOUT/STDERR and process file descriptors of running
+        # commands. Key data is (proc, "out" or "err" or None).
+        self.selector = selectors.DefaultSelector()
+        # Process file descriptors of running commands: {proc: pidfd, ...}
+        self.pidfds = {}
+        # Running commands without a process file descriptor, to poll.
+        self.polled_procs = set()
+        # Running commands by timeout: {proc: timeout, ...}
+        self.timeouts = TimerHeap()
 
     def close(self):
         """Close pool."""
@@ -156,8 +169,9 @@ class SubProcPool(object):
         with self.stopping_lock:
             return self.stopping
 
-    def _proc_exit(self, proc, err_xtra, ctx, callback, callback_args):
+    def _proc_exit(self, proc, err_xtra):
         """Get ret_code, out, err of exited command, and call its callback."""
+        ctx, callback, callback_args = self._remove_running(proc)
         ctx.ret_code = proc.wait()
         out, err = (f.decode() for f in proc.communicate())
         if out:
@@ -173,32 +187,23 @@ class SubProcPool(object):
     def process(self):
         """Process done child processes and submit more."""
         # Handle child processes that are done
-        runnings = []
-        for proc, ctx, callback, callback_args in self.runnings:
-            # Command completed/exited
-            if proc.poll() is not None:
-                self._proc_exit(proc, "", ctx, callback, callback_args)
-                continue
-            # Command timed out, kill it
-            if time() > ctx.timeout:
-                try:
-                    os.killpg(proc.pid, SIGKILL)  # kill process group
-                except OSError:
-                    # must have just exited, since poll.
-                    err_xtra = ""
-                else:
-                    err_xtra = "\nkilled on timeout (%s)" % (
-                        self.proc_pool_timeout)
-                self._proc_exit(proc, err_xtra, ctx, callback, callback_args)
-                continue
-            # Command still running, see if STDOUT/STDERR are readable or not
-            runnings.append([proc, ctx, callback, callback_args])
-            # Unblock proc's STDOUT/STDERR if necessary. Otherwise, a full
-            # STDOUT or STDERR may stop command from proceeding.
-            self._poll_proc_pipes(proc, ctx)
-
-        # Update list of running items
-        self.runnings[:] = runnings
+        exited_procs = self._select_procs()
+        exited_procs.update(
+            proc for proc in self.polled_procs if proc.poll() is not None)
+        for proc in exited_procs:
+            self._proc_exit(proc, "")
+        # Command timed out, kill it
+        for proc in self.timeouts.pop_due(time()):
+            try:
+                os.killpg(proc.pid, SIGKILL)  # kill process group
+            except OSError:
+                # must have just exited, since poll.
+                err_xtra = ""
+            else:
+                err_xtra = "\nkilled on timeout (%s)" % (
+                    self.proc_pool_timeout)
+            self._proc_exit(proc, err_xtra)
+
         # Create more child processes, if items in queue and space in pool
         stopping = self._is_stopping()
         while self.queuings and len(self.runnings) < self.size:
@@ -210,8 +215,7 @@ class SubProcPool(object):
             else:
                 proc = self._run_command_init(ctx, callback, callback_args)
                 if proc is not None:
-                    ctx.timeout = time() + self.proc_pool_timeout
-                    self.runnings.append([proc, ctx, callback, callback_args])
+                    self._add_running(proc, ctx, callback, callback_args)
 
     def put_command(self, ctx, callback=None, callback_args=None):
         """Queue a new shell command to execute.
@@ -233,6 +237,8 @@ class SubProcPool(object):
             self._run_command_exit(ctx, callback, callback_args)
         else:
             self.queuings.append([ctx, callback, callback_args])
+            if self.wakeup is not None:
+                self.wakeup.set()
 
     @classmethod
     def run_command(cls, ctx):
@@ -263,53 +269,88 @@ class SubProcPool(object):
             ctx.ret_code = self.RET_CODE_SUITE_STOPPING
             self._run_command_exit(ctx)
         # Kill remaining processes
-        for value in self.runnings:
-            proc = value[0]
-            if proc:
-                os.killpg(proc.pid, SIGKILL)
+        for proc in self.runnings:
+            os.killpg(proc.pid, SIGKILL)
         # Wait for child processes
         self.process()
 
-    def _poll_proc_pipes(self, proc, ctx):
-        """Poll STDOUT/ERR of proc and read some data if possible.
+    def _add_running(self, proc, ctx, callback, callback_args):
+        """Watch the pipes, exit and timeout of a newly launched command."""
+        ctx.timeout = time() + self.proc_pool_timeout
+        self.runnings[proc] = [proc, ctx, callback, callback_args]
+        self.timeouts.set(proc, ctx.timeout)
+        # Read STDOUT/STDERR as data arrives. Otherwise, a full STDOUT or
+        # STDERR may stop command from proceeding.
+        for handle, attr in [(proc.stdout, 'out'), (proc.stderr, 'err')]:
+            os.set_blocking(handle.fileno(), False)
+            self.selector.register(handle, selectors.EVENT_READ, (proc, attr))
+        try:
+            pidfd = os.pidfd_open(proc.pid)
+        except (AttributeError, OSError):
+            # Not supported by this Python/OS, poll the command instead
+            self.polled_procs.add(proc)
+        else:
+            self.pidfds[proc] = pidfd
+            self.selector.register(pidfd, selectors.EVENT_READ, (proc, None))
+
+    def _remove_running(self, proc):
+        """Stop watching a command, return its ctx, callback, callback_args.
 
-        This helps to unblock the command by unblocking its pipes.
+        Any remaining data in its STDOUT/STDERR is left for the caller.
         """
-        if self.pipepoller is None:
-            return  # select.poll not supported on this OS
         for handle in [proc.stdout, proc.stderr]:
-            if not handle.closed:
-                self.pipepoller.register(handle.fileno(), self.POLLREAD)
+            try:
+                self.selector.unregister(handle)
+            except KeyError:
+                pass  # already at EOF
+        pidfd = self.pidfds.pop(proc, None)
+        if pidfd is not None:
+            try:
+                self.selector.unregister(pidfd)
+            except KeyError:
+                pass  # already exited
+            os.close(pidfd)
+        self.polled_procs.discard(proc)
+        self.timeouts.remove(proc)
+        return self.runnings.pop(proc)[1:]
+
+    def _select_procs(self):
+        """Read available STDOUT/ERR data of running commands.
+
+        Return the set of commands known to have exited.
+        """
+        exited_procs = set()
         while True:
-            fileno_list = [
-                fileno
-                for fileno, event in self.pipepoller.poll(0.0)
-                if event & self.POLLREAD]
-            if not fileno_list:
+            events = self.selector.select(0.0)
+            if not events:
                 # Nothing readable
                 break
-            for fileno in fileno_list:
+            for key, _ in events:
+                proc, attr = key.data
+                if attr is None:
+                    # Process file descriptor readable, command has exited
+                    self.selector.unregister(key.fileobj)
+                    exited_procs.add(proc)
+                    continue
                 # If a file handle is readable, read something from it, add
                 # results into the command context object's `.out` or `.err`,
-                # whichever is relevant. To avoid blocking:
-                # 1. Use `os.read` here instead of `file.read` to avoid any
-                #    buffering that may cause the file handle to block.
-                # 2. Call os.read only once after a poll. Poll again before
-                #    another read - otherwise the os.read call may block.
+                # whichever is relevant. Use `os.read` on the non-blocking
+                # file descriptor, to avoid any buffering.
                 try:
-                    data = os.read(fileno, 65536).decode()  # 64K
+                    data = os.read(key.fd, 65536)  # 64K
+                except BlockingIOError:
+                    continue
                 except OSError:
+                    data = b''
+                if not data:
+                    # EOF or error, the rest is left to "_proc_exit"
+                    self.selector.unregister(key.fileobj)
                     continue
-                if fileno == proc.stdout.fileno():
-                    if ctx.out is None:
-                        ctx.out = ''
-                    ctx.out += data
-                elif fileno == proc.stderr.fileno():
-                    if ctx.err is None:
-                        ctx.err = ''
-                    ctx.err += data
-        self.pipepoller.unregister(proc.stdout.fileno())
-        self.pipepoller.unregister(proc.stderr.fileno())
+                ctx = self.runnings[proc][1]
+                if getattr(ctx, attr) is None:
+                    setattr(ctx, attr, '')
+                setattr(ctx, attr, getattr(ctx, attr) + data.decode())
+        return exited_procs
 
     @classmethod
     def _run_command_init(cls, ctx, callback=None, callback_args=None):
@@ -19,23 +19,237 @@ This module provides the logic to:
 * Create or initialise database file on start up.
 * Queue database operations.
 * Hide logic that is relevant for database operations.
+* Write the public database in a background thread.
 * Recover public run database file lock.
 * Manage existing run database files on restart.
+* Archive history older than a cycle point horizon.
 """
 
 import json
 import os
+from queue import Empty, Full, Queue
 from shutil import copy, rmtree
+import sqlite3
 from tempfile import mkstemp
+from threading import Condition, Event, Lock, Thread
+from time import time
 
 
 from cylc.flow import LOG
 from cylc.flow.broadcast_report import get_broadcast_change_iter
+from cylc.flow.cycling.iso8601 import point_parse
+from cylc.flow.cycling.loader import get_point, ISO8601_CYCLING_TYPE
+from cylc.flow.exceptions import PointParsingError
 from cylc.flow.rundb import CylcSuiteDAO
 from cylc.flow import __version__ as CYLC_VERSION
 from cylc.flow.wallclock import get_current_time_string, get_utc_mode
 
 
+class PublicDatabaseWriter(object):
+    """Write batches of queued items to the public database in a thread.
+
+    The public database does not need to be fully in sync with the private
+    database, so writing it in a background thread stops a slow file system
+    from holding up the main loop. Batches are put in a bounded queue. The
+    writer thread drains as many batches as it can (up to
+    MAX_BATCHES_PER_COMMIT) and commits them in a single transaction.
+
+    If the queue overflows, further batches are dropped and the writer is
+    flagged as needing recovery, i.e. the public database should be replaced
+    by a copy of the private database (see "self.recover").
+
+    Attributes:
+        .dao (CylcSuiteDAO):
+            Data access object of the public database.
+        .needs_recovery (bool):
+            True if batches have been dropped.
+        .metrics (dict):
+            Back-pressure metrics, see "self.get_metrics".
+    """
+
+    MAX_QUEUE_SIZE = 100
+    MAX_BATCHES_PER_COMMIT = 20
+    POLL_INTERVAL = 1.0
+    RETRY_DELAY = 1.0
+    STOP_TIMEOUT = 10.0
+
+    def __init__(self, dao, max_queue_size=None):
+        self.dao = dao
+        if max_queue_size is None:
+            max_queue_size = self.MAX_QUEUE_SIZE
+        self.queue = Queue(max_queue_size)
+        self.needs_recovery = False
+        self.metrics = {
+            'batches_queued': 0,
+            'batches_written': 0,
+            'batches_dropped': 0,
+            'commits': 0,
+            'failed_commits': 0,
+            'recoveries': 0,
+            'max_queue_depth': 0,
+            'write_time': 0.0}
+        # Lock held while writing or replacing the public database.
+        self._lock = Lock()
+        # Incremented on recovery, so the writer thread knows to discard any
+        # batches it has taken from the queue before the recovery.
+        self._generation = 0
+        # Batches taken from the queue, not yet committed.
+        self._pending = []
+        # Number of batches queued, not yet committed or discarded.
+        self._n_unwritten = 0
+        self._unwritten_cond = Condition()
+        self._stop_event = Event()
+        self._thread = None
+
+    def start(self):
+        """Start the writer thread."""
+        self._thread = Thread(
+            target=self._run, name='pub-db-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Write remaining batches and stop the writer thread.
+
+        Return True if the writer thread has stopped with all batches written.
+        """
+        if timeout is None:
+            timeout = self.STOP_TIMEOUT
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                LOG.warning(
+                    '%s: writer did not stop in %ss',
+                    self.dao.db_file_name, timeout)
+                return False
+            self._thread = None
+        return not self._n_unwritten and not self.needs_recovery
+
+    def put(self, items):
+        """Queue a batch of items (see "CylcSuiteDAO.pop_queued_items").
+
+        Never block. Drop the batch if the queue is full.
+        """
+        if not items:
+            return
+        if self.needs_recovery:
+            # Recovery will replace the database, no point queuing anything.
+            self.metrics['batches_dropped'] += 1
+            return
+        with self._unwritten_cond:
+            try:
+                self.queue.put_nowait(items)
+            except Full:
+                self.metrics['batches_dropped'] += 1
+                self.needs_recovery = True
+                LOG.warning(
+                    '%s: write queue full (%d batches), will recover',
+                    self.dao.db_file_name, self.queue.maxsize)
+                return
+            self._n_unwritten += 1
+        self.metrics['batches_queued'] += 1
+        self.metrics['max_queue_depth'] = max(
+            self.metrics['max_queue_depth'], self.queue.qsize())
+
+    def flush(self, timeout=None):
+        """Wait for queued batches to be written.
+
+        Return True if all batches have been written or discarded.
+        """
+        with self._unwritten_cond:
+            return self._unwritten_cond.wait_for(
+                lambda: not self._n_unwritten, timeout)
+
+    def get_metrics(self):
+        """Return a copy of the metrics, with the current queue depth."""
+        metrics = dict(self.metrics)
+        metrics['queue_depth'] = self.queue.qsize()
+        metrics['write_tries'] = self.dao.n_tries
+        return metrics
+
+    def recover(self, callback):
+        """Discard unwritten batches, call callback to replace the database.
+
+        Do not wait for the writer thread. Return False if it is busy, so
+        the caller can try again later. Otherwise return True.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._generation += 1
+            n_discarded = len(self._pending)
+            self._pending = []
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except Empty:
+                    break
+                n_discarded += 1
+            self._set_written(n_discarded)
+            self.needs_recovery = True
+            callback()
+            self.needs_recovery = False
+            self.dao.n_tries = 0
+            self.metrics['recoveries'] += 1
+        finally:
+            self._lock.release()
+        return True
+
+    def _get_batches(self, block):
+        """Return a list of batches from the queue."""
+        batches = []
+        try:
+            if block:
+                batches.append(self.queue.get(timeout=self.POLL_INTERVAL))
+            while len(batches) < self.MAX_BATCHES_PER_COMMIT:
+                batches.append(self.queue.get_nowait())
+        except Empty:
+            pass
+        return batches
+
+    def _run(self):
+        """Writer thread: write batches until stopped."""
+        while True:
+            is_stopping = self._stop_event.is_set()
+            generation = self._generation
+            batches = self._get_batches(block=not is_stopping)
+            with self._lock:
+                if generation != self._generation:
+                    # Database replaced while getting these batches.
+                    self._set_written(len(batches))
+                    batches = []
+                self._pending.extend(batches)
+                is_ok = not self._pending or self._write_pending()
+            if is_stopping and (not is_ok or self.queue.empty()):
+                return
+            if not is_ok:
+                self._stop_event.wait(self.RETRY_DELAY)
+
+    def _write_pending(self):
+        """Write pending batches in a single transaction.
+
+        Return True on success. On failure, keep the batches for retry.
+        """
+        time0 = time()
+        is_ok = self.dao.execute_items(
+            [item for batch in self._pending for item in batch])
+        self.metrics['write_time'] += time() - time0
+        if not is_ok:
+            self.metrics['failed_commits'] += 1
+            return False
+        self.metrics['commits'] += 1
+        self.metrics['batches_written'] += len(self._pending)
+        self._set_written(len(self._pending))
+        self._pending = []
+        return True
+
+    def _set_written(self, n_batches):
+        """Record n_batches as written or discarded."""
+        with self._unwritten_cond:
+            self._n_unwritten -= n_batches
+            self._unwritten_cond.notify_all()
+
+
 class SuiteDatabaseManager(object):
     """Manage the suite runtime private and public databases."""
 
@@ -69,15 +283,26 @@ class SuiteDatabaseManager(object):
     TABLE_TASK_TIMEOUT_TIMERS = CylcSuiteDAO.TABLE_TASK_TIMEOUT_TIMERS
     TABLE_XTRIGGERS = CylcSuiteDAO.TABLE_XTRIGGERS
 
-    def __init__(self, pri_d=None, pub_d=None):
+    # Each archive database holds the history of the cycle points of a year,
+    # or of this many integer cycle points.
+    ARCHIVE_INTEGER_PERIOD = 1000
+    # Maximum number of cycle points, or of checkpoints, archived on each
+    # call to "process_queued_ops", so archival does not hold up the main
+    # loop.
+    ARCHIVE_CHUNK_SIZE = 50
+
+    def __init__(self, pri_d=None, pub_d=None, is_persistent=False):
         self.pri_path = None
         if pri_d:
             self.pri_path = os.path.join(pri_d, CylcSuiteDAO.DB_FILE_BASE_NAME)
         self.pub_path = None
         if pub_d:
             self.pub_path = os.path.join(pub_d, CylcSuiteDAO.DB_FILE_BASE_NAME)
+        # Keep a persistent connection to the private database?
+        self.is_persistent = is_persistent
         self.pri_dao = None
         self.pub_dao = None
+        self.pub_writer = None
 
         self.db_deletes_map = {
             self.TABLE_BROADCAST_STATES: [],
@@ -101,6 +326,33 @@ class SuiteDatabaseManager(object):
             self.TABLE_XTRIGGERS: []}
         self.db_updates_map = {}
 
+        # Rows last put by self._put_changed_rows, so that only changed rows
+        # are written to the task pool and timer tables on each update.
+        # {rows_key: {primary key values tuple: row args dict, ...}, ...}
+        self._put_rows = {}
+        # Tables wiped by the first call to self._put_changed_rows.
+        self._wiped_tables = set()
+        # History of cycle points before the archive cutoff is archived.
+        self.archive_cutoff = None
+        self._archived_cutoff = None
+        # What is still to archive, [(period, cycles, ids), ...], and the
+        # numbers of cycle points and checkpoints archived for the cutoff.
+        self._archive_chunks = []
+        self._archive_counts = [0, 0]
+
+    def archive(self, cutoff):
+        """Archive the history of cycle points before cutoff.
+
+        Rows are moved to per-period archive databases beside the public
+        database, a chunk on each call to "process_queued_ops", see
+        "_plan_archive" and "_archive".
+        """
+        self.archive_cutoff = cutoff
+
+    def is_archived(self, point):
+        """Return True if the history of point is, or is to be, archived."""
+        return self.archive_cutoff is not None and point < self.archive_cutoff
+
     def checkpoint(self, name):
         """Checkpoint the task pool, etc."""
         return self.pri_dao.take_checkpoints(name, other_daos=[self.pub_dao])
@@ -120,10 +372,19 @@ class SuiteDatabaseManager(object):
             temp_pub_db_file_name = mkstemp(
                 prefix=self.pub_dao.DB_FILE_BASE_NAME,
                 dir=os.path.dirname(self.pub_dao.db_file_name))[1]
+            self.pri_dao.flush_wal()
             copy(self.pri_dao.db_file_name, temp_pub_db_file_name)
+            # The private database may use WAL journalling, which needs
+            # shared memory between its readers. Readers of the public
+            # database may be on other hosts, so switch it back.
+            conn = sqlite3.connect(temp_pub_db_file_name)
+            try:
+                conn.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                conn.close()
             os.rename(temp_pub_db_file_name, self.pub_dao.db_file_name)
             os.chmod(self.pub_dao.db_file_name, st_mode)
-        except (IOError, OSError):
+        except (IOError, OSError, sqlite3.Error):
             if temp_pub_db_file_name:
                 os.unlink(temp_pub_db_file_name)
             raise
@@ -151,7 +412,11 @@ class SuiteDatabaseManager(object):
 
     def get_pri_dao(self):
         """Return the primary DAO."""
-        return CylcSuiteDAO(self.pri_path)
+        return CylcSuiteDAO(
+            self.pri_path, is_persistent=self.is_persistent,
+            archive_d=os.path.join(
+                os.path.dirname(self.pub_path),
+                CylcSuiteDAO.ARCHIVE_DIR_BASE_NAME))
 
     @staticmethod
     def _namedtuple2json(obj):
@@ -185,9 +450,23 @@ class SuiteDatabaseManager(object):
         os.chmod(self.pri_path, 0o600)
         self.pub_dao = CylcSuiteDAO(self.pub_path, is_public=True)
         self.copy_pri_to_pub()
+        self.pub_writer = PublicDatabaseWriter(self.pub_dao)
+        self.pub_writer.start()
 
     def on_suite_shutdown(self):
         """Close data access objects."""
+        if self.pub_writer:
+            if not self.pub_writer.stop() and self.pri_dao:
+                # Public database behind, replace it if the writer is idle.
+                try:
+                    self.pub_writer.recover(self.copy_pri_to_pub)
+                except (IOError, OSError) as exc:
+                    LOG.warning(
+                        '%s: cannot recover: %s', self.pub_path, exc)
+            LOG.debug(
+                '%s: writer metrics: %s',
+                self.pub_path, self.pub_writer.get_metrics())
+            self.pub_writer = None
         if self.pri_dao:
             self.pri_dao.close()
             self.pri_dao = None
@@ -226,16 +505,165 @@ class SuiteDatabaseManager(object):
                     self.pub_dao.add_update_item(
                         table_name, set_args, where_args)
 
-        # Previously, we used a separate thread for database writes. This has
-        # now been removed. For the private database, there is no real
-        # advantage in using a separate thread as it needs to be always in sync
-        # with what is current. For the public database, which does not need to
-        # be fully in sync, there is some advantage of using a separate
-        # thread/process, if writing to it becomes a bottleneck. At the moment,
-        # there is no evidence that this is a bottleneck, so it is better to
-        # keep the logic simple.
+        # The private database needs to be always in sync with what is
+        # current, so write it now. The public database does not need to be
+        # fully in sync, so hand its items to the writer thread, so writing
+        # to it (e.g. on a slow file system) does not hold up the main loop.
         self.pri_dao.execute_queued_items()
-        self.pub_dao.execute_queued_items()
+        if (
+                self.archive_cutoff is not None and
+                self.archive_cutoff != self._archived_cutoff
+        ):
+            self._plan_archive()
+        if self._archive_chunks:
+            self._archive()
+        self.pub_writer.put(self.pub_dao.pop_queued_items())
+
+    def _plan_archive(self):
+        """Plan the archival of the history before the archive cutoff.
+
+        The rows of the history tables, and the checkpoints whose task pools
+        are entirely before the cutoff, are to be moved to archive databases,
+        one per period (see "ARCHIVE_INTEGER_PERIOD"), oldest period first.
+        The last checkpoint, and the checkpoints it depends on, are never
+        archived.
+        """
+        cutoff = self._archived_cutoff = self.archive_cutoff
+        self._archive_chunks = []
+        self._archive_counts = [0, 0]
+        # There may be years of cycle points to archive, and comparing
+        # date-time cycle points is slow, so compare each cycle point once,
+        # and only if its period is next to the period of the cutoff.
+        # {cycle: (period, is before cutoff) or None, ...}
+        cycle_infos = {}
+        cutoff_period = int(self._get_archive_period(cutoff))
+        if cutoff.TYPE == ISO8601_CYCLING_TYPE:
+            period_step = 1
+        else:
+            period_step = self.ARCHIVE_INTEGER_PERIOD
+
+        def get_cycle_info(cycle):
+            if cycle not in cycle_infos:
+                point = self._get_archive_point(cycle)
+                if point is None:
+                    cycle_infos[cycle] = None
+                    return None
+                period = self._get_archive_period(point)
+                delta = int(period) - cutoff_period
+                if abs(delta) <= period_step:
+                    cycle_infos[cycle] = (period, point < cutoff)
+                else:
+                    cycle_infos[cycle] = (period, delta < 0)
+            return cycle_infos[cycle]
+
+        cycles_by_period = {}
+        for cycle in self.pri_dao.select_archive_cycles():
+            info = get_cycle_info(cycle)
+            if info is not None and info[1]:
+                cycles_by_period.setdefault(info[0], []).append(cycle)
+        # The pool of a delta checkpoint has cycles of the rows of its chain
+        # of parent checkpoints; and a parent is kept while a kept checkpoint
+        # depends on it.
+        parents = self.pri_dao.select_checkpoint_parents()
+        # {id: (period of its last cycle point, is before cutoff), ...}
+        checkpoint_infos = {}
+        checkpoint_cycles = self.pri_dao.select_checkpoint_cycles()
+        for id_ in sorted(set(checkpoint_cycles) | set(parents)):
+            infos = [
+                get_cycle_info(cycle)
+                for cycle in checkpoint_cycles.get(id_, [])]
+            if id_ in parents:
+                infos.append(checkpoint_infos.get(parents[id_]))
+            if infos and None not in infos:
+                checkpoint_infos[id_] = (
+                    max((info[0] for info in infos), key=int),
+                    all(info[1] for info in infos))
+        # The last checkpoint is kept, so that new checkpoints, numbered
+        # from the last ID in the database, never reuse archived IDs.
+        last_id = max(set(checkpoint_cycles) | set(parents), default=None)
+        kept_parents = set()
+        for id_ in sorted(parents, reverse=True):
+            if (
+                id_ in kept_parents
+                or id_ == last_id
+                or not checkpoint_infos.get(id_, (None, False))[1]
+            ):
+                kept_parents.add(parents[id_])
+        ids_by_period = {}
+        for id_, (period, is_before) in checkpoint_infos.items():
+            if is_before and id_ != last_id and id_ not in kept_parents:
+                ids_by_period.setdefault(period, []).append(id_)
+        for period in sorted(
+                set(cycles_by_period) | set(ids_by_period), key=int):
+            self._archive_chunks.append((
+                period,
+                sorted(cycles_by_period.get(period, [])),
+                sorted(ids_by_period.get(period, []))))
+
+    def _archive(self):
+        """Archive the next chunk of what is planned by "_plan_archive".
+
+        Archive up to ARCHIVE_CHUNK_SIZE cycle points or checkpoints, oldest
+        first. Their rows are moved from the private database
+        to the archive databases of their periods, and the same rows are
+        deleted from the public database. Readers of the public database
+        read the archives as well.
+        """
+        size = self.ARCHIVE_CHUNK_SIZE
+        counts = [0, 0]
+        time0 = time()
+        while self._archive_chunks and size > 0:
+            period, cycles, ids = self._archive_chunks.pop(0)
+            if len(cycles) > size or len(ids) > size:
+                self._archive_chunks.insert(
+                    0, (period, cycles[size:], ids[size:]))
+                cycles, ids = cycles[:size], ids[:size]
+            size -= max(len(cycles), len(ids))
+            archive_path = os.path.join(self.pri_dao.archive_d, period)
+            try:
+                left_rows = self.pri_dao.archive(archive_path, cycles, ids)
+            except (OSError, sqlite3.Error) as exc:
+                LOG.warning('%s: cannot archive: %s', archive_path, exc)
+                self._archive_chunks = []
+                return
+            for table, column in CylcSuiteDAO.ARCHIVE_TABLES.items():
+                for cycle in cycles:
+                    self.pub_dao.add_delete_item(table, {column: cycle})
+                # Rows left in the private database, deletes go first.
+                for args in left_rows.get(table, []):
+                    self.pub_dao.add_insert_item(table, args)
+            for table in CylcSuiteDAO.ARCHIVE_CHECKPOINT_TABLES:
+                for id_ in ids:
+                    self.pub_dao.add_delete_item(table, {'id': id_})
+            counts[0] += len(cycles)
+            counts[1] += len(ids)
+        LOG.debug(
+            'archived %d cycle point(s) and %d checkpoint(s) (%.1fs)',
+            counts[0], counts[1], time() - time0)
+        self._archive_counts[0] += counts[0]
+        self._archive_counts[1] += counts[1]
+        if not self._archive_chunks:
+            LOG.info(
+                'archived %d cycle point(s) and %d checkpoint(s) before %s',
+                self._archive_counts[0], self._archive_counts[1],
+                self._archived_cutoff)
+
+    @staticmethod
+    def _get_archive_point(cycle):
+        """Return the cycle point of a cycle column value, or None."""
+        try:
+            return get_point(cycle).standardise()
+        except PointParsingError:
+            return None  # e.g. "*" of broadcasts to all cycle points
+
+    @classmethod
+    def _get_archive_period(cls, point):
+        """Return the archive period, the archive file name, of point."""
+        if point.TYPE == ISO8601_CYCLING_TYPE:
+            return '%04d' % point_parse(point.value).year
+        return '%d' % (
+            int(point) // cls.ARCHIVE_INTEGER_PERIOD *
+            cls.ARCHIVE_INTEGER_PERIOD)
 
     def put_broadcast(self, modified_settings, is_cancel=False):
         """Put or clear broadcasts in runtime database."""
@@ -355,19 +783,62 @@ class SuiteDatabaseManager(object):
 
     def put_task_event_timers(self, task_events_mgr):
         """Put statements to update the task_action_timers table."""
-        if task_events_mgr.event_timers:
-            self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
-            for key, timer in task_events_mgr.event_timers.items():
-                key1, point, name, submit_num = key
-                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                    "name": name,
-                    "cycle": point,
-                    "ctx_key": json.dumps((key1, submit_num,)),
-                    "ctx": self._namedtuple2json(timer.ctx),
-                    "delays": json.dumps(timer.delays),
-                    "num": timer.num,
-                    "delay": timer.delay,
-                    "timeout": timer.timeout})
+        rows = {}
+        for key, timer in task_events_mgr.event_timers.items():
+            key1, point, name, submit_num = key
+            rows.update(self._get_action_timer_row(
+                name, point, (key1, submit_num), timer))
+        self._put_changed_rows(
+            self.TABLE_TASK_ACTION_TIMERS, 'event_timers', rows)
+
+    def _get_action_timer_row(self, name, point, ctx_key, timer):
+        """Return {primary key values: args} for a task_action_timers row."""
+        ctx_key = json.dumps(ctx_key)
+        return {(point, name, ctx_key): {
+            "name": name,
+            "cycle": point,
+            "ctx_key": ctx_key,
+            "ctx": self._namedtuple2json(timer.ctx),
+            "delays": json.dumps(timer.delays),
+            "num": timer.num,
+            "delay": timer.delay,
+            "timeout": timer.timeout}}
+
+    def _put_changed_rows(self, table_name, rows_key, rows):
+        """Put statements to update rows changed since the last put.
+
+        Queue INSERT (or REPLACE) statements for new and changed rows, and
+        DELETE statements for rows that are no longer present. The first put
+        of a table wipes it, to clear out rows from a previous run.
+
+        Arguments:
+            table_name (str): name of the table.
+            rows_key (str): identify this set of rows, as several sets of
+                rows, e.g. from different sources, may go to one table.
+            rows (dict): {primary key values tuple: row args dict, ...}.
+
+        Return (int):
+            Number of queued statements.
+        """
+        old_rows = self._put_rows.get(rows_key, {})
+        n_stmts = 0
+        if table_name not in self._wiped_tables:
+            self._wiped_tables.add(table_name)
+            self.db_deletes_map[table_name].append({})
+            n_stmts += 1
+        for pkey, args in rows.items():
+            if old_rows.get(pkey) != args:
+                self.db_inserts_map[table_name].append(args)
+                n_stmts += 1
+        for pkey, args in old_rows.items():
+            if pkey not in rows:
+                self.db_deletes_map[table_name].append(dict(
+                    (column.name, args[column.name])
+                    for column in self.pri_dao.tables[table_name].columns
+                    if column.is_primary_key))
+                n_stmts += 1
+        self._put_rows[rows_key] = rows
+        return n_stmts
 
     def put_xtriggers(self, sat_xtrig):
         """Put statements to update external triggers table."""
@@ -380,49 +851,37 @@ class SuiteDatabaseManager(object):
     def put_task_pool(self, pool):
         """Put statements to update the task_pool table in runtime database.
 
-        Update the task_pool table and the task_action_timers table.
-        Queue delete (everything) statements to wipe the tables, and queue the
-        relevant insert statements for the current tasks in the pool.
+        Update the task_pool table, the task_timeout_timers table and the
+        task poll and retry timers in the task_action_timers table. Only rows
+        of tasks whose pool-relevant fields have changed since the last call
+        are inserted (or replaced), and rows of tasks that have left the pool
+        are deleted.
         """
-        self.db_deletes_map[self.TABLE_TASK_POOL].append({})
-        # No need to do:
-        # self.db_deletes_map[self.TABLE_TASK_ACTION_TIMERS].append({})
-        # Should already be done by self.put_task_event_timers above.
-        self.db_deletes_map[self.TABLE_TASK_TIMEOUT_TIMERS].append({})
+        pool_rows = {}
+        timeout_rows = {}
+        action_timer_rows = {}
         for itask in pool.get_all_tasks():
-            self.db_inserts_map[self.TABLE_TASK_POOL].append({
-                "name": itask.tdef.name,
-                "cycle": str(itask.point),
+            name = itask.tdef.name
+            point = str(itask.point)
+            pool_rows[(point, name)] = {
+                "name": name,
+                "cycle": point,
                 "spawned": int(itask.has_spawned),
                 "status": itask.state.status,
-                "is_held": itask.state.is_held})
+                "is_held": itask.state.is_held}
             if itask.timeout is not None:
-                self.db_inserts_map[self.TABLE_TASK_TIMEOUT_TIMERS].append({
-                    "name": itask.tdef.name,
-                    "cycle": str(itask.point),
-                    "timeout": itask.timeout})
+                timeout_rows[(point, name)] = {
+                    "name": name,
+                    "cycle": point,
+                    "timeout": itask.timeout}
             if itask.poll_timer is not None:
-                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                    "name": itask.tdef.name,
-                    "cycle": str(itask.point),
-                    "ctx_key": json.dumps("poll_timer"),
-                    "ctx": self._namedtuple2json(itask.poll_timer.ctx),
-                    "delays": json.dumps(itask.poll_timer.delays),
-                    "num": itask.poll_timer.num,
-                    "delay": itask.poll_timer.delay,
-                    "timeout": itask.poll_timer.timeout})
+                action_timer_rows.update(self._get_action_timer_row(
+                    name, point, "poll_timer", itask.poll_timer))
             for ctx_key_1, timer in itask.try_timers.items():
                 if timer is None:
                     continue
-                self.db_inserts_map[self.TABLE_TASK_ACTION_TIMERS].append({
-                    "name": itask.tdef.name,
-                    "cycle": str(itask.point),
-                    "ctx_key": json.dumps(("try_timers", ctx_key_1)),
-                    "ctx": self._namedtuple2json(timer.ctx),
-                    "delays": json.dumps(timer.delays),
-                    "num": timer.num,
-                    "delay": timer.delay,
-                    "timeout": timer.timeout})
+                action_timer_rows.update(self._get_action_timer_row(
+                    name, point, ("try_timers", ctx_key_1), timer))
             if itask.state.time_updated:
                 set_args = {
                     "time_updated": itask.state.time_updated,
@@ -437,6 +896,13 @@ class SuiteDatabaseManager(object):
                 self.db_updates_map[self.TABLE_TASK_STATES].append(
                     (set_args, where_args))
                 itask.state.time_updated = None
+        self._put_changed_rows(self.TABLE_TASK_POOL, 'task_pool', pool_rows)
+        self._put_changed_rows(
+            self.TABLE_TASK_TIMEOUT_TIMERS, 'task_timeout_timers',
+            timeout_rows)
+        self._put_changed_rows(
+            self.TABLE_TASK_ACTION_TIMERS, 'task_action_timers',
+            action_timer_rows)
 
         self.db_inserts_map[self.TABLE_CHECKPOINT_ID].append({
             # id = -1 for latest
@@ -501,14 +967,20 @@ class SuiteDatabaseManager(object):
         self.db_updates_map[table_name].append((set_args, where_args))
 
     def recover_pub_from_pri(self):
-        """Recover public database from private database."""
-        if self.pub_dao.n_tries >= self.pub_dao.MAX_TRIES:
-            self.copy_pri_to_pub()
+        """Recover public database from private database.
+
+        Recover if writes to the public database have failed too many times,
+        or if the public database writer has dropped batches. If the writer
+        is busy, try again on the next call.
+        """
+        if (
+                self.pub_dao.n_tries >= self.pub_dao.MAX_TRIES
+                or self.pub_writer.needs_recovery
+        ) and self.pub_writer.recover(self.copy_pri_to_pub):
             LOG.warning(
                 "%(pub_db_name)s: recovered from %(pri_db_name)s" % {
                     "pub_db_name": self.pub_dao.db_file_name,
                     "pri_db_name": self.pri_dao.db_file_name})
-            self.pub_dao.n_tries = 0
 
     def restart_upgrade(self):
         """Vacuum/upgrade runtime DB on restart."""
@@ -516,4 +988,7 @@ class SuiteDatabaseManager(object):
         pri_dao.vacuum()
         # compat: <8.0
         pri_dao.upgrade_is_held()
+        # after upgrades that may rebuild tables, and drop their indexes
+        pri_dao.create_indexes()
+        pri_dao.optimize()
         pri_dao.close()
@@ -0,0 +1,291 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Shared, cached lookups of other suites for "suite_state" xtriggers.
+
+Called as a function, each "suite_state" xtrigger signature opens the
+database of its target suite and queries one task, every call interval.
+The "SuiteStateService" answers the calls of the built-in "suite_state"
+function in a thread of the suite server program instead: all the calls
+queued since its last read are grouped by target database, each database is
+read once for all the cycles asked of it, and the states and outputs read are
+cached until the database is modified.
+"""
+
+import json
+import os
+import sqlite3
+from inspect import signature
+from queue import Empty, Queue
+from threading import Thread
+
+from cylc.flow import LOG
+from cylc.flow.cycling.util import add_offset
+from cylc.flow.dbstatecheck import CylcSuiteDBChecker
+from cylc.flow.subprocpool import SubProcPool
+from cylc.flow.wakeup import WakeupQueue
+from cylc.flow.wallclock import get_current_time_string
+from cylc.flow.xtriggers.suite_state import (
+    format_point, get_cylc_run_dir, suite_state)
+
+SUITE_STATE_SIGNATURE = signature(suite_state)
+
+
+class _SuiteStateCache(object):
+    """States and outputs read from a suite database, while not modified."""
+
+    def __init__(self, stamp, point_fmt):
+        self.stamp = stamp
+        self.point_fmt = point_fmt
+        # Cycles read, and their {(name, cycle): ...}
+        self.cycles = set()
+        self.states = {}
+        self.outputs = {}
+
+
+class SuiteStateService(object):
+    """Answer "suite_state" xtrigger calls with shared reads of databases.
+
+    It has the interface of "FuncWorkerPool" for the contexts of calls to the
+    built-in "suite_state" function: queue calls with "put_command", and call
+    "process" in the main loop to run the callbacks of the answered calls.
+
+    If a "cylc.flow.wakeup.Wakeup" is given, it is set when calls are
+    answered.
+    """
+
+    def __init__(self, wakeup=None):
+        self.closed = False
+        # Number of calls queued and not yet called back.
+        self.n_active = 0
+        # Calls: [kwargs, ctx, callback, callback_args] or None to stop
+        self._requests = Queue()
+        # Answered calls: [ctx, callback, callback_args]
+        if wakeup is None:
+            self._results = Queue()
+        else:
+            self._results = WakeupQueue(wakeup)
+        # {db_path: _SuiteStateCache, ...}, used by the thread only
+        self._caches = {}
+        self._thread = None
+
+    def close(self):
+        """Close the service to new calls."""
+        self.closed = True
+
+    def is_not_done(self):
+        """Return True if any call is not yet called back."""
+        return self.n_active > 0
+
+    def process(self):
+        """Run the callbacks of the answered calls."""
+        while True:
+            try:
+                ctx, callback, callback_args = self._results.get_nowait()
+            except Empty:
+                break
+            self.n_active -= 1
+            self._run_callback(ctx, callback, callback_args)
+
+    def put_command(self, ctx, callback=None, callback_args=None):
+        """Queue a new call of the "suite_state" function.
+
+        Arguments:
+            ctx (cylc.flow.subprocctx.SubFuncContext):
+                A context object of a call to "suite_state". On answer, its
+                output is the JSON of the function return value.
+            callback (callable):
+                Function to call back when the call is answered or on error.
+                Should have signature:
+                    callback(ctx, *callback_args) -> None
+            callback_args (list):
+                Extra arguments to the callback function.
+        """
+        if self.closed:
+            ctx.err = SubProcPool.ERR_SUITE_STOPPING
+            ctx.ret_code = SubProcPool.RET_CODE_SUITE_STOPPING
+            self._run_callback(ctx, callback, callback_args)
+            return
+        try:
+            kwargs = self._get_kwargs(ctx)
+        except Exception as exc:
+            # The function would fail in the same way.
+            ctx.ret_code = 1
+            ctx.err = str(exc)
+            self._run_callback(ctx, callback, callback_args)
+            return
+        if self._thread is None:
+            self._thread = Thread(
+                target=self._run, name='suite-state-service', daemon=True)
+            self._thread.start()
+        self.n_active += 1
+        self._requests.put([kwargs, ctx, callback, callback_args])
+
+    def terminate(self):
+        """Answer the queued calls, and stop the thread."""
+        self.close()
+        if self._thread is not None:
+            self._requests.put(None)
+            self._thread.join()
+            self._thread = None
+        self.process()
+
+    @staticmethod
+    def _get_kwargs(ctx):
+        """Return the keyword arguments of the "suite_state" call of ctx.
+
+        The run directory is expanded, and the offset is applied to the
+        point, as the function would.
+        """
+        arguments = SUITE_STATE_SIGNATURE.bind(
+            *ctx.func_args, **ctx.func_kwargs)
+        arguments.apply_defaults()
+        kwargs = dict(arguments.arguments)
+        kwargs['cylc_run_dir'] = get_cylc_run_dir(kwargs['cylc_run_dir'])
+        if kwargs['offset'] is not None:
+            kwargs['point'] = str(
+                add_offset(kwargs['point'], kwargs['offset']))
+        return kwargs
+
+    @staticmethod
+    def _get_stamp(db_path):
+        """Return the change stamp of the database at db_path.
+
+        Modification times can be too coarse, and updates in place do not
+        change the size of the database, so the stamp is made of:
+        * the file change counter in the database header, incremented on
+          each commit in rollback journal mode,
+        * the header of the write-ahead log, if any, and its size; in WAL
+          mode commits append to the log, or restart it with new salts.
+        The inode numbers of the files catch replaced files.
+
+        Raise OSError if the database does not exist.
+        """
+        stamp = []
+        for path, start, end in [
+                (db_path, 24, 28), (db_path + '-wal', 12, 24)]:
+            try:
+                with open(path, 'rb') as handle:
+                    header = handle.read(end)[start:]
+                    stat = os.fstat(handle.fileno())
+            except FileNotFoundError:
+                if path == db_path:
+                    raise
+                stamp.append(None)
+            else:
+                stamp.append((stat.st_ino, header, stat.st_size))
+        return tuple(stamp)
+
+    def _run(self):
+        """Answer queued calls, a batch at a time, until stopped."""
+        while True:
+            items = [self._requests.get()]
+            while True:
+                try:
+                    items.append(self._requests.get_nowait())
+                except Empty:
+                    break
+            items_by_db = {}
+            for item in items:
+                if item is not None:
+                    db_path = CylcSuiteDBChecker.get_db_path(
+                        item[0]['cylc_run_dir'], item[0]['suite'])
+                    items_by_db.setdefault(db_path, []).append(item)
+            for db_path, db_items in items_by_db.items():
+                self._answer(db_path, db_items)
+            if None in items:
+                break
+
+    def _answer(self, db_path, items):
+        """Answer the calls of items from one read of the database."""
+        try:
+            cache = self._read(db_path, items)
+        except (OSError, sqlite3.Error) as exc:
+            # Failed to read DB; target suite may not be started.
+            LOG.debug('%s: %s', db_path, exc)
+            self._caches.pop(db_path, None)
+            for _, ctx, callback, callback_args in items:
+                ctx.ret_code = 0
+                ctx.out = json.dumps([False, None])
+                self._results.put([ctx, callback, callback_args])
+            return
+        for kwargs, ctx, callback, callback_args in items:
+            try:
+                point = format_point(kwargs['point'], cache.point_fmt)
+            except Exception as exc:
+                # The function would fail in the same way.
+                ctx.ret_code = 1
+                ctx.err = str(exc)
+            else:
+                key = (kwargs['task'], point)
+                if kwargs['message'] is not None:
+                    satisfied = bool(kwargs['message']) and (
+                        kwargs['message'] in cache.outputs.get(key, ()))
+                else:
+                    satisfied = bool(kwargs['status']) and (
+                        cache.states.get(key) in
+                        CylcSuiteDBChecker.state_lookup(kwargs['status']))
+                results = dict(kwargs)
+                del results['debug']
+                results['point'] = point
+                ctx.ret_code = 0
+                ctx.out = json.dumps([satisfied, results])
+            self._results.put([ctx, callback, callback_args])
+
+    def _read(self, db_path, items):
+        """Return the cache of db_path, with the cycles of items.
+
+        Only read the database if it has been modified since it was cached,
+        or for cycles not yet cached.
+        """
+        kwargs = items[0][0]
+        checker = None
+        stamp = self._get_stamp(db_path)
+        cache = self._caches.get(db_path)
+        try:
+            if cache is None or cache.stamp != stamp:
+                checker = CylcSuiteDBChecker(
+                    kwargs['cylc_run_dir'], kwargs['suite'])
+                cache = _SuiteStateCache(
+                    stamp, checker.get_remote_point_format())
+            cycles = set()
+            for kwargs, _, _, _ in items:
+                try:
+                    cycles.add(format_point(kwargs['point'], cache.point_fmt))
+                except Exception:
+                    pass  # reported on answer
+            cycles -= cache.cycles
+            if cycles:
+                if checker is None:
+                    checker = CylcSuiteDBChecker(
+                        kwargs['cylc_run_dir'], kwargs['suite'])
+                states, outputs = checker.select_cycles(cycles)
+                cache.cycles.update(cycles)
+                cache.states.update(states)
+                cache.outputs.update(outputs)
+        finally:
+            if checker is not None:
+                checker.close()
+        self._caches[db_path] = cache
+        return cache
+
+    @staticmethod
+    def _run_callback(ctx, callback, callback_args):
+        """Process call completion."""
+        ctx.timestamp = get_current_time_string()
+        if callable(callback):
+            if not callback_args:
+                callback_args = []
+            callback(ctx, *callback_args)
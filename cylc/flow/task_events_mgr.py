@@ -55,6 +55,7 @@ from cylc.flow.task_state import (
 from cylc.flow.task_outputs import (
     TASK_OUTPUT_SUBMITTED, TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED,
     TASK_OUTPUT_FAILED, TASK_OUTPUT_SUBMIT_FAILED, TASK_OUTPUT_EXPIRED)
+from cylc.flow.timer_heap import TimerHeap
 from cylc.flow.wallclock import (
     get_current_time_string, get_seconds_as_interval_string as intvl_as_str)
 
@@ -147,12 +148,17 @@ class TaskEventsManager():
         self.mail_footer = None
         self.next_mail_time = None
         self.event_timers = {}
+        # Next action times of event timers: {id_key: seconds since epoch}
+        self._event_timer_heap = TimerHeap()
         # Set pflag = True to stimulate task dependency negotiation whenever a
         # task changes state in such a way that others could be affected. The
         # flag should only be turned off again after use in
         # Scheduler.process_tasks, to ensure that dependency negotiation occurs
         # when required.
         self.pflag = False
+        # Data store and DB updates deferred to the end of a message batch,
+        # see process_messages: ({job_d: [msg, ...], ...}, {itask, ...})
+        self._batch = None
 
     @staticmethod
     def check_poll_time(itask, now=None):
@@ -220,6 +226,22 @@ class TaskEventsManager():
                 pass
         return default
 
+    def add_event_timer(self, id_key, timer):
+        """Add an event timer, to be processed by "process_events"."""
+        self.event_timers[id_key] = timer
+        self._schedule_event_timer(id_key)
+
+    def _schedule_event_timer(self, id_key):
+        """Schedule the next action of an event timer."""
+        timer = self.event_timers[id_key]
+        if timer.is_waiting:
+            self._event_timer_heap.remove(id_key)
+        elif timer.timeout is None:
+            # Timer to be set on the next call to "process_events"
+            self._event_timer_heap.set(id_key, 0.0)
+        else:
+            self._event_timer_heap.set(id_key, timer.timeout)
+
     def process_events(self, schd_ctx):
         """Process task events that were created by "setup_event_handlers".
 
@@ -227,7 +249,11 @@ class TaskEventsManager():
         """
         ctx_groups = {}
         now = time()
-        for id_key, timer in self.event_timers.copy().items():
+        for id_key in self._event_timer_heap.pop_due(now):
+            try:
+                timer = self.event_timers[id_key]
+            except KeyError:
+                continue
             key1, point, name, submit_num = id_key
             if timer.is_waiting:
                 continue
@@ -249,7 +275,10 @@ class TaskEventsManager():
                         point, name, submit_num, key1,
                         timer.delay_timeout_as_str()))
             # Ready to run?
-            if not timer.is_delay_done() or (
+            if not timer.is_delay_done():
+                self._event_timer_heap.set(id_key, timer.timeout)
+                continue
+            if (
                 # Avoid flooding user's mail box with mail notification.
                 # Group together as many notifications as possible within a
                 # given interval.
@@ -258,6 +287,8 @@ class TaskEventsManager():
                 self.next_mail_time is not None and
                 self.next_mail_time > now
             ):
+                # Check again on the next call, in case of a stop.
+                self._event_timer_heap.set(id_key, now)
                 continue
 
             timer.set_waiting()
@@ -350,9 +381,11 @@ class TaskEventsManager():
         else:
             new_msg = message
         itask.set_summary_message(new_msg)
-        self.job_pool.add_job_msg(
-            get_task_job_id(itask.point, itask.tdef.name, submit_num),
-            new_msg)
+        job_d = get_task_job_id(itask.point, itask.tdef.name, submit_num)
+        if self._batch is None:
+            self.job_pool.add_job_msg(job_d, new_msg)
+        else:
+            self._batch[0].setdefault(job_d, []).append(new_msg)
 
         # Satisfy my output, if possible, and record the result.
         completed_trigger = itask.state.outputs.set_msg_trg_completion(
@@ -432,7 +465,10 @@ class TaskEventsManager():
             # Message of an as-yet unreported custom task output.
             # No state change.
             self.pflag = True
-            self.suite_db_mgr.put_update_task_outputs(itask)
+            if self._batch is None:
+                self.suite_db_mgr.put_update_task_outputs(itask)
+            else:
+                self._batch[1].add(itask)
             self.setup_event_handlers(itask, completed_trigger, message)
         else:
             # Unhandled messages. These include:
@@ -454,6 +490,43 @@ class TaskEventsManager():
             self.setup_event_handlers(itask, lseverity, message)
         return None
 
+    def process_messages(self, items, flag=FLAG_INTERNAL):
+        """Process a batch of task messages, see process_message.
+
+        Messages of a job are added to the data store in one update, and the
+        custom outputs of a task are written to the DB in one update, at the
+        end of the batch.
+
+        Arguments:
+            items (list):
+                [(itask, submit_num, event_time, severity, message), ...]
+            flag (str):
+                See process_message.
+
+        Return:
+            list: tasks that need polling to confirm a reversal of status.
+
+        """
+        to_poll_tasks = []
+        self._batch = ({}, set())
+        try:
+            for itask, submit_num, event_time, severity, message in items:
+                if (
+                    self.process_message(
+                        itask, severity, message, event_time, flag,
+                        submit_num)
+                    and itask not in to_poll_tasks
+                ):
+                    to_poll_tasks.append(itask)
+        finally:
+            job_msgs, output_itasks = self._batch
+            self._batch = None
+            for job_d, msgs in job_msgs.items():
+                self.job_pool.add_job_msgs(job_d, msgs)
+            for itask in output_itasks:
+                self.suite_db_mgr.put_update_task_outputs(itask)
+        return to_poll_tasks
+
     def _process_message_check(
         self,
         itask,
@@ -511,6 +584,7 @@ class TaskEventsManager():
             del self.event_timers[id_key]
         else:
             self.event_timers[id_key].unset_waiting()
+            self._schedule_event_timer(id_key)
 
     def _db_events_insert(self, itask, event="", message=""):
         """Record an event to the DB."""
@@ -585,6 +659,7 @@ class TaskEventsManager():
                         log_ctx, schd_ctx.suite, point, name, submit_num)
                 else:
                     self.event_timers[id_key].unset_waiting()
+                    self._schedule_event_timer(id_key)
             except KeyError as exc:
                 LOG.exception(exc)
 
@@ -670,6 +745,7 @@ class TaskEventsManager():
                         if not exist_ok:
                             log_ctx.err += " %s" % fname
                     self.event_timers[id_key].unset_waiting()
+                    self._schedule_event_timer(id_key)
                 log_task_job_activity(
                     log_ctx, schd_ctx.suite, point, name, submit_num)
             except KeyError as exc:
@@ -862,14 +938,14 @@ class TaskEventsManager():
             itask, "retrieve job logs retry delays")
         if not retry_delays:
             retry_delays = [0]
-        self.event_timers[id_key] = TaskActionTimer(
+        self.add_event_timer(id_key, TaskActionTimer(
             TaskJobLogsRetrieveContext(
                 self.HANDLER_JOB_LOGS_RETRIEVE,  # key
                 self.HANDLER_JOB_LOGS_RETRIEVE,  # ctx_type
                 user_at_host,
                 self.get_host_conf(itask, "retrieve job logs max size"),
             ),
-            retry_delays)
+            retry_delays))
 
     def _setup_event_mail(self, itask, event):
         """Set up task event notification, by email."""
@@ -886,7 +962,7 @@ class TaskEventsManager():
         retry_delays = self._get_events_conf(itask, "mail retry delays")
         if not retry_delays:
             retry_delays = [0]
-        self.event_timers[id_key] = TaskActionTimer(
+        self.add_event_timer(id_key, TaskActionTimer(
             TaskEventMailContext(
                 self.HANDLER_MAIL,  # key
                 self.HANDLER_MAIL,  # ctx_type
@@ -898,7 +974,7 @@ class TaskEventsManager():
                 self._get_events_conf(itask, "mail to", get_user()),  # mail_to
                 self._get_events_conf(itask, "mail smtp"),  # mail_smtp
             ),
-            retry_delays)
+            retry_delays))
 
     def _setup_custom_event_handlers(self, itask, event, message):
         """Set up custom task event handlers."""
@@ -985,7 +1061,8 @@ class TaskEventsManager():
                 cmd = "%s '%s' '%s' '%s' '%s'" % (
                     handler, event, self.suite, itask.identity, message)
             LOG.debug("[%s] -Queueing %s handler: %s", itask, event, cmd)
-            self.event_timers[id_key] = (
+            self.add_event_timer(
+                id_key,
                 TaskActionTimer(
                     CustomTaskEventHandlerContext(
                         key1,
@@ -35,7 +35,9 @@ from copy import deepcopy
 from cylc.flow.parsec.util import pdeepcopy, poverride
 
 from cylc.flow import LOG
+import cylc.flow.flags
 from cylc.flow.batch_sys_manager import JobPollContext
+from cylc.flow.cfgspec.glbl_cfg import glbl_cfg
 from cylc.flow.hostuserutil import get_host, is_remote_host, is_remote_user
 from cylc.flow.job_file import JobFileWriter
 from cylc.flow.pathutil import get_remote_suite_run_job_dir
@@ -45,7 +47,7 @@ from cylc.flow.task_action_timer import TaskActionTimer
 from cylc.flow.task_events_mgr import TaskEventsManager, log_task_job_activity
 from cylc.flow.task_message import FAIL_MESSAGE_PREFIX
 from cylc.flow.task_job_logs import (
-    JOB_LOG_JOB, get_task_job_log, get_task_job_job_log,
+    JOB_LOG_JOB, JOB_LOG_STATUS, get_task_job_log, get_task_job_job_log,
     get_task_job_activity_log, get_task_job_id, NN)
 from cylc.flow.task_outputs import (
     TASK_OUTPUT_SUBMITTED, TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED,
@@ -81,9 +83,12 @@ class TaskJobManager(object):
     KEY_EXECUTE_TIME_LIMIT = TaskEventsManager.KEY_EXECUTE_TIME_LIMIT
 
     def __init__(self, suite, proc_pool, suite_db_mgr,
-                 task_events_mgr, job_pool):
+                 task_events_mgr, job_pool, job_agent_pool=None,
+                 job_status_watcher=None):
         self.suite = suite
         self.proc_pool = proc_pool
+        self.job_agent_pool = job_agent_pool
+        self.job_status_watcher = job_status_watcher
         self.suite_db_mgr = suite_db_mgr
         self.task_events_mgr = task_events_mgr
         self.job_pool = job_pool
@@ -98,7 +103,7 @@ class TaskJobManager(object):
         """
         now = time()
         poll_tasks = set()
-        for itask in task_pool.get_tasks():
+        for itask in task_pool.get_active_tasks():
             if self.task_events_mgr.check_job_time(itask, now):
                 poll_tasks.add(itask)
                 if itask.poll_timer.delay is not None:
@@ -164,17 +169,37 @@ class TaskJobManager(object):
         select command to complete. Bad host select command or error writing to
         a job file will cause a bad task - leading to submission failure.
 
+        Job files are written in a batch, so that their syntax can be checked
+        together.
+
         Return [list, list]: list of good tasks, list of bad tasks
         """
         prepared_tasks = []
         bad_tasks = []
+        # [(itask, local_job_file_path, job_conf, template_key), ...]
+        job_files = []
         for itask in itasks:
-            prep_task = self._prep_submit_task_job(suite, itask, dry_run,
-                                                   check_syntax=check_syntax)
+            prep_task = self._prep_submit_task_job(
+                suite, itask, dry_run, job_files)
             if prep_task:
                 prepared_tasks.append(itask)
             elif prep_task is False:
                 bad_tasks.append(itask)
+        if job_files:
+            excs = self.job_file_writer.write_batch(
+                [item[1:] for item in job_files],
+                check_syntax=check_syntax)
+            for (itask, local_job_file_path, job_conf, _), exc in zip(
+                    job_files, excs):
+                if exc is None:
+                    self._prep_submit_task_job_done(
+                        suite, itask, dry_run, local_job_file_path, job_conf)
+                else:
+                    # Could be an IOError, a syntax error, etc
+                    self._prep_submit_task_job_error(
+                        suite, itask, dry_run, '(prepare job file)', exc)
+                    prepared_tasks.remove(itask)
+                    bad_tasks.append(itask)
         return [prepared_tasks, bad_tasks]
 
     def submit_task_jobs(self, suite, itasks, is_simulation=False):
@@ -316,7 +341,8 @@ class TaskJobManager(object):
                     itask.state.reset(TASK_STATUS_READY)
                     if itask.state.outputs.has_custom_triggers():
                         self.suite_db_mgr.put_update_task_outputs(itask)
-                self.proc_pool.put_command(
+                self._put_job_cmd(
+                    host, owner,
                     SubProcContext(
                         self.JOBS_SUBMIT,
                         cmd + job_log_dirs,
@@ -666,9 +692,23 @@ class TaskJobManager(object):
                 job_log_dirs.append(get_task_job_id(
                     itask.point, itask.tdef.name, itask.submit_num))
             cmd += job_log_dirs
-            self.proc_pool.put_command(
+            self._put_job_cmd(
+                host, owner,
                 SubProcContext(cmd_key, cmd), callback, [suite, itasks])
 
+    def _put_job_cmd(self, host, owner, ctx, callback, callback_args):
+        """Put a job command to the job agent pool or the process pool.
+
+        The job agent pool is used if configured for the job host.
+        """
+        if (
+            self.job_agent_pool is not None and
+            glbl_cfg().get_host_item('use job agent', host, owner)
+        ):
+            self.job_agent_pool.put_command(ctx, callback, callback_args)
+        else:
+            self.proc_pool.put_command(ctx, callback, callback_args)
+
     @staticmethod
     def _set_retry_timers(itask, rtconfig=None):
         """Set try number and retry delays."""
@@ -744,15 +784,33 @@ class TaskJobManager(object):
         if itask.summary['submit_method_id'] and ctx.ret_code == 0:
             self.task_events_mgr.process_message(
                 itask, INFO, TASK_OUTPUT_SUBMITTED, ctx.timestamp)
+            if (
+                self.job_status_watcher is not None and
+                glbl_cfg().get_host_item(
+                    'watch job status file', itask.task_host,
+                    itask.task_owner)
+            ):
+                self.job_status_watcher.watch(job_d, os.path.join(
+                    get_task_job_log(
+                        suite, itask.point, itask.tdef.name,
+                        itask.submit_num),
+                    JOB_LOG_STATUS))
         else:
             self.task_events_mgr.process_message(
                 itask, CRITICAL, self.task_events_mgr.EVENT_SUBMIT_FAILED,
                 ctx.timestamp)
 
-    def _prep_submit_task_job(self, suite, itask, dry_run, check_syntax=True):
+    def _prep_submit_task_job(self, suite, itask, dry_run, job_files):
         """Prepare a task job submission.
 
-        Return itask on a good preparation.
+        Return itask on a good preparation. If a job file is needed, append
+        (itask, local_job_file_path, job_conf, template_key) to job_files,
+        for the caller to write.
+
+        Jobs of the same task definition with the same host, owner and
+        broadcast settings share a job script template, so template_key is
+        made of these. The template is dropped on reload, as the task
+        definition is replaced.
 
         """
         if itask.local_job_file_path and not dry_run:
@@ -793,15 +851,29 @@ class TaskJobManager(object):
 
         try:
             job_conf = self._prep_submit_task_job_impl(suite, itask, rtconfig)
-            local_job_file_path = get_task_job_job_log(
-                suite, itask.point, itask.tdef.name, itask.submit_num)
-            self.job_file_writer.write(local_job_file_path, job_conf,
-                                       check_syntax=check_syntax)
         except Exception as exc:
-            # Could be a bad command template, IOError, etc
+            # Could be a bad command template, etc
             self._prep_submit_task_job_error(
                 suite, itask, dry_run, '(prepare job file)', exc)
             return False
+        local_job_file_path = get_task_job_job_log(
+            suite, itask.point, itask.tdef.name, itask.submit_num)
+        if itask.tdef.suite_polling_cfg:
+            # Script contains the cycle point
+            template_key = None
+        else:
+            template_key = (
+                itask.tdef, itask.task_host, itask.task_owner,
+                repr(overrides) if overrides else None,
+                cylc.flow.flags.debug)
+        job_files.append(
+            (itask, local_job_file_path, job_conf, template_key))
+        # Return value used by "cylc submit" and "cylc jobscript":
+        return itask
+
+    def _prep_submit_task_job_done(
+            self, suite, itask, dry_run, local_job_file_path, job_conf):
+        """Helper for self.prep_submit_task_jobs. On job file written."""
         itask.local_job_file_path = local_job_file_path
 
         job_config = deepcopy(job_conf)
@@ -816,9 +888,6 @@ class TaskJobManager(object):
             self.job_pool.add_job_msg(job_config['job_d'], self.DRY_RUN_MSG)
             LOG.debug(f'[{itask}] -{self.DRY_RUN_MSG}')
 
-        # Return value used by "cylc submit" and "cylc jobscript":
-        return itask
-
     def _prep_submit_task_job_error(self, suite, itask, dry_run, action, exc):
         """Helper for self._prep_submit_task_job. On error."""
         LOG.debug("submit_num %s" % itask.submit_num)
@@ -18,11 +18,15 @@
 Send task job messages to:
 - The stdout/stderr.
 - The job status file, if there is one.
-- The suite server program, if communication is possible.
+- The suite server program, if communication is possible. Via the task
+  message relay of the job, if there is one (see
+  "cylc.flow.task_message_relay").
 """
 
+import json
 from logging import getLevelName, WARNING, ERROR, CRITICAL
 import os
+import socket
 import sys
 
 
@@ -43,6 +47,11 @@ ABORT_MESSAGE_PREFIX = "aborted/"
 FAIL_MESSAGE_PREFIX = "failed/"
 VACATION_MESSAGE_PREFIX = "vacated/"
 
+# Environment variable for the socket path of the task message relay
+CYLC_TASK_MESSAGE_RELAY = "CYLC_TASK_MESSAGE_RELAY"
+RELAY_ACK = b"ok\n"
+RELAY_TIMEOUT = 30.0
+
 STDERR_LEVELS = (getLevelName(level) for level in (WARNING, ERROR, CRITICAL))
 
 
@@ -72,6 +81,9 @@ def record_messages(suite, task_job, messages):
     # Write to job.status
     _append_job_status_file(suite, task_job, event_time, messages)
     # Send messages
+    relay_path = os.getenv(CYLC_TASK_MESSAGE_RELAY)
+    if relay_path and _relay_messages(relay_path, event_time, messages):
+        return
     try:
         pclient = SuiteRuntimeClient(suite)
     except Exception:
@@ -87,6 +99,40 @@ def record_messages(suite, task_job, messages):
         )
 
 
+def _relay_messages(relay_path, event_time, messages):
+    """Pass messages to the task message relay listening on relay_path.
+
+    Return True if the relay has the messages, or may have them, in which
+    case they must not be sent again. Return False if the messages have not
+    reached the relay, e.g. it is not running.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(RELAY_TIMEOUT)
+        try:
+            sock.connect(relay_path)
+            sock.sendall(json.dumps(
+                {'event_time': event_time, 'messages': messages}
+            ).encode() + b'\n')
+        except OSError:
+            return False
+        # Messages that end the job are acknowledged when sent.
+        ack = b''
+        try:
+            while not ack.endswith(b'\n'):
+                data = sock.recv(len(RELAY_ACK))
+                if not data:
+                    break
+                ack += data
+        except OSError:
+            pass
+        if ack != RELAY_ACK and cylc.flow.flags.debug:
+            sys.stderr.write('%s: no relay acknowledgement\n' % relay_path)
+        return True
+    finally:
+        sock.close()
+
+
 def _append_job_status_file(suite, task_job, event_time, messages):
     """Write messages to job status file."""
     job_log_name = os.getenv('CYLC_TASK_LOG_ROOT')
@@ -0,0 +1,227 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Relay task job messages to the suite server program in batches.
+
+A task message relay is a "cylc message-relay" process, started by a task job
+in the background. It listens on a UNIX socket for the messages of
+"cylc message" commands of the job (see "cylc.flow.task_message"), and sends
+the messages received in each time window to the suite server program in as
+few "put_messages" requests as possible, over the same connection.
+
+"cylc message" writes its messages to the job status file before passing
+them to the relay, so the messages are not lost if the relay fails. Messages
+that end the job are sent without waiting for the rest of the window, before
+"cylc message" returns, and the relay exits after that, or when the job
+process is gone.
+"""
+
+from itertools import groupby
+import json
+import os
+import selectors
+import socket
+import sys
+from tempfile import mkdtemp
+from time import time
+
+import cylc.flow.flags
+from cylc.flow.network.client import SuiteRuntimeClient
+from cylc.flow.task_message import (
+    ABORT_MESSAGE_PREFIX, FAIL_MESSAGE_PREFIX, RELAY_ACK,
+    VACATION_MESSAGE_PREFIX)
+from cylc.flow.task_outputs import TASK_OUTPUT_SUCCEEDED
+
+
+def open_relay_socket():
+    """Listen on a UNIX socket in a new temporary directory.
+
+    Return (socket, path). The temporary directory keeps the path short.
+    """
+    path = os.path.join(mkdtemp(prefix='cylc-message-relay-'), 'sock')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(TaskMessageRelay.LISTEN_BACKLOG)
+    return sock, path
+
+
+class TaskMessageRelay(object):
+    """Relay the messages of a task job to the suite server program.
+
+    Each request is a line of JSON {"event_time": ..., "messages": ...}, as
+    the arguments of "put_messages". It is acknowledged with RELAY_ACK when
+    its messages are queued, or when they are sent if they end the job.
+    Queued messages are sent, in order of event time, window seconds after
+    the first of them is received.
+
+    """
+
+    CHECK_INTERVAL = 1.0
+    LISTEN_BACKLOG = 64
+    READ_SIZE = 65536
+
+    def __init__(self, suite, task_job, window, sock, job_pid=None):
+        self.suite = suite
+        self.task_job = task_job
+        self.window = window
+        self.sock = sock
+        self.job_pid = job_pid
+        # Queued messages: [(event_time, severity, message), ...]
+        self.queue = []
+        # Time to send queued messages
+        self.send_time = None
+        # Connections that wait to be acknowledged after the next send
+        self.ack_conns = []
+        self.client = None
+        self.selector = selectors.DefaultSelector()
+        self.done = False
+
+    def run(self):
+        """Relay messages until the job ends."""
+        self.sock.setblocking(False)
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        next_check_time = time() + self.CHECK_INTERVAL
+        while not self.done:
+            now = time()
+            timeout = next_check_time - now
+            if self.send_time is not None:
+                timeout = min(timeout, self.send_time - now)
+            for key, _ in self.selector.select(max(timeout, 0.0)):
+                if key.fileobj is self.sock:
+                    self._accept()
+                else:
+                    self._read(key.fileobj, key.data)
+            now = time()
+            if self.send_time is not None and now >= self.send_time:
+                self.send()
+            if now >= next_check_time:
+                next_check_time = now + self.CHECK_INTERVAL
+                if not self._is_job_alive():
+                    self.done = True
+        self.send()
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self.selector.close()
+
+    def send(self):
+        """Send queued messages, and acknowledge connections waiting."""
+        self.send_time = None
+        # Stable sort, so messages of the same event time keep their order.
+        self.queue.sort(key=lambda item: item[0])
+        for event_time, items in groupby(self.queue, lambda item: item[0]):
+            self._put_messages(
+                event_time,
+                [[severity, message] for _, severity, message in items])
+        self.queue.clear()
+        for conn in self.ack_conns:
+            self._ack(conn)
+        self.ack_conns.clear()
+
+    def _accept(self):
+        """Accept a new connection."""
+        try:
+            conn = self.sock.accept()[0]
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self.selector.register(conn, selectors.EVENT_READ, bytearray())
+
+    @staticmethod
+    def _ack(conn):
+        """Acknowledge a request, ignore connections already gone."""
+        try:
+            conn.sendall(RELAY_ACK)
+        except OSError:
+            pass
+
+    def _close(self, conn):
+        """Stop listening to a connection."""
+        self.selector.unregister(conn)
+        if conn in self.ack_conns:
+            self.ack_conns.remove(conn)
+        conn.close()
+
+    def _is_job_alive(self):
+        """Return True if the job process is still there."""
+        if self.job_pid is None:
+            return True
+        try:
+            os.kill(self.job_pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _put_messages(self, event_time, messages):
+        """Send messages to the suite server program, reusing the client.
+
+        On failure, the messages are left for the suite server program to
+        pick up from the job status file.
+        """
+        try:
+            if self.client is None:
+                self.client = SuiteRuntimeClient(self.suite)
+            self.client(
+                'put_messages',
+                {'task_job': self.task_job, 'event_time': event_time,
+                 'messages': messages})
+        except Exception as exc:
+            sys.stderr.write('%s: %s\n' % (type(exc).__name__, exc))
+            if cylc.flow.flags.debug:
+                import traceback
+                traceback.print_exc()
+            self.client = None
+
+    def _read(self, conn, buf):
+        """Read from a connection, queue messages of complete requests."""
+        try:
+            data = conn.recv(self.READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self._close(conn)
+            return
+        buf.extend(data)
+        if not buf.endswith(b'\n'):
+            return
+        try:
+            request = json.loads(buf.decode())
+            event_time = request['event_time']
+            messages = request['messages']
+        except (KeyError, TypeError, ValueError) as exc:
+            sys.stderr.write('bad request: %s\n' % exc)
+            self._close(conn)
+            return
+        buf.clear()
+        for severity, message in messages:
+            self.queue.append((event_time, severity, message))
+            if (
+                message == TASK_OUTPUT_SUCCEEDED or
+                message.startswith((
+                    ABORT_MESSAGE_PREFIX, FAIL_MESSAGE_PREFIX,
+                    VACATION_MESSAGE_PREFIX))
+            ):
+                self.done = True
+        if self.done:
+            self.ack_conns.append(conn)
+            self.send()
+        else:
+            self._ack(conn)
+            if self.send_time is None:
+                self.send_time = time() + self.window
@@ -50,14 +50,19 @@ class TaskOutputs(object):
                 trigger1 = message 1
 
     Can search item by message string or by trigger string.
+
+    If `on_change` is set, it is called (with no arguments) whenever the
+    completion status of any output changes. The task pool uses this to
+    match dependencies only against tasks whose outputs have changed.
     """
 
     # Memory optimization - constrain possible attributes to this list.
-    __slots__ = ["_by_message", "_by_trigger"]
+    __slots__ = ["_by_message", "_by_trigger", "on_change"]
 
     def __init__(self, tdef):
         self._by_message = {}
         self._by_trigger = {}
+        self.on_change = None
         # Add standard outputs.
         for output in _SORT_ORDERS:
             self.add(output)
@@ -137,18 +142,16 @@ class TaskOutputs(object):
 
     def set_all_completed(self):
         """Set all outputs to complete."""
-        for value in self._by_message.values():
-            value[_IS_COMPLETED] = True
+        self._set_all(True)
 
     def set_all_incomplete(self):
         """Set all outputs to incomplete."""
-        for value in self._by_message.values():
-            value[_IS_COMPLETED] = False
+        self._set_all(False)
 
     def set_completion(self, message, is_completed):
         """Set output message completion status to is_completed (bool)."""
         if message in self._by_message:
-            self._by_message[message][_IS_COMPLETED] = is_completed
+            self._set_item(self._by_message[message], is_completed)
 
     def set_msg_trg_completion(self, message=None, trigger=None,
                                is_completed=True):
@@ -162,15 +165,36 @@ class TaskOutputs(object):
         """
         try:
             item = self._get_item(message, trigger)
-            old_is_completed = item[_IS_COMPLETED]
-            item[_IS_COMPLETED] = is_completed
         except KeyError:
             return None
+        if self._set_item(item, is_completed):
+            return item[_TRIGGER]
         else:
-            if bool(old_is_completed) == bool(is_completed):
-                return False
-            else:
-                return item[_TRIGGER]
+            return False
+
+    def _set_all(self, is_completed):
+        """Set all outputs to is_completed, notify on change."""
+        changed = False
+        for value in self._by_message.values():
+            if bool(value[_IS_COMPLETED]) != bool(is_completed):
+                changed = True
+            value[_IS_COMPLETED] = is_completed
+        if changed and self.on_change is not None:
+            self.on_change()
+
+    def _set_item(self, item, is_completed):
+        """Set completion of an output item, notify on change.
+
+        Return True if the completion status is changed.
+
+        """
+        old_is_completed = item[_IS_COMPLETED]
+        item[_IS_COMPLETED] = is_completed
+        if bool(old_is_completed) == bool(is_completed):
+            return False
+        if self.on_change is not None:
+            self.on_change()
+        return True
 
     def _get_item(self, message, trigger):
         """Return self._by_trigger[trigger] or self._by_message[message].
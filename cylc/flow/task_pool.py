@@ -28,7 +28,9 @@ tasks against the new stop cycle.
 
 """
 
+from bisect import bisect_left, bisect_right, insort
 from fnmatch import fnmatchcase
+from functools import partial
 import json
 from time import time
 
@@ -41,7 +43,7 @@ from cylc.flow.suite_status import StopMode
 from cylc.flow.task_action_timer import TaskActionTimer
 from cylc.flow.task_events_mgr import (
     CustomTaskEventHandlerContext, TaskEventMailContext,
-    TaskJobLogsRetrieveContext)
+    TaskJobLogsRetrieveContext, TaskEventsManager)
 from cylc.flow.task_id import TaskID
 from cylc.flow.task_job_logs import get_task_job_id
 from cylc.flow.task_proxy import TaskProxy
@@ -52,6 +54,7 @@ from cylc.flow.task_state import (
     TASK_STATUS_SUBMIT_FAILED, TASK_STATUS_SUBMIT_RETRYING,
     TASK_STATUS_RUNNING, TASK_STATUS_SUCCEEDED, TASK_STATUS_FAILED,
     TASK_STATUS_RETRYING)
+from cylc.flow.timer_heap import TimerHeap
 from cylc.flow.wallclock import get_current_time_string
 
 
@@ -60,6 +63,9 @@ class TaskPool(object):
 
     ERR_PREFIX_TASKID_MATCH = "No matching tasks found: "
     ERR_PREFIX_TASK_NOT_ON_SEQUENCE = "Invalid cycle point for task: "
+    # Tasks in these states do not hold back the runahead limit.
+    RUNAHEAD_FINISHED_STATUSES = (
+        TASK_STATUS_FAILED, TASK_STATUS_SUCCEEDED, TASK_STATUS_EXPIRED)
 
     def __init__(self, config, suite_db_mgr, task_events_mgr, job_pool):
         self.config = config
@@ -88,6 +94,41 @@ class TaskPool(object):
         self.rhpool_changed = False
         self.pool_changes = []
 
+        # Dependency matching indexes, for tasks in the main pool only.
+        # {(name, point_str, output): {task_id: itask, ...}, ...}
+        self.output_dependents = {}
+        # {(name, point_str, output), ...}
+        self.completed_outputs = set()
+        # {task_id: {(name, point_str, output), ...}, ...}
+        self._task_completed_outputs = {}
+        # Tasks with changed outputs or reset prerequisites since the last
+        # call to self.match_dependencies: {task_id: itask, ...}
+        self._dep_changed_tasks = {}
+
+        # Runahead release indexes, for tasks in both pools.
+        # Sorted cycle points with tasks: [point, ...]
+        self._points = []
+        # {point: number of tasks, ...}
+        self._point_n_tasks = {}
+        # Sorted cycle points with unfinished tasks: [point, ...]
+        self._unfinished_points = []
+        # {point: number of unfinished tasks, ...}
+        self._point_n_unfinished = {}
+        # Sorted cycle points of the runahead pool: [point, ...]
+        self._rh_points = []
+        # Finished tasks in the runahead pool: {task_id: itask, ...}
+        self._rh_finished_tasks = {}
+
+        # Clock trigger, expiry and retry times of tasks in the main pool.
+        # {itask: seconds since epoch, ...}
+        self._task_deadlines = TimerHeap()
+        # Active tasks in the main pool: {task_id: itask, ...}
+        self._active_tasks = {}
+        # Tasks in the main pool: {task_id: itask, ...}
+        self._pool_tasks = {}
+        # Tasks in the runahead pool: {task_id: itask, ...}
+        self._rh_tasks = {}
+
         self.is_held = False
         self.hold_point = None
         self.held_future_tasks = []
@@ -159,6 +200,12 @@ class TaskPool(object):
                 taskdef, point, stop_point=stop_point, submit_num=submit_num))
             if itask:
                 LOG.info("[%s] -submit-num=%02d, inserted", itask, submit_num)
+                if submit_num and self.suite_db_mgr.is_archived(point):
+                    # Its task_states row is archived, add a new one.
+                    self.suite_db_mgr.put_insert_task_states(itask, {
+                        "time_created": get_current_time_string(),
+                        "time_updated": get_current_time_string(),
+                        "status": itask.state.status})
         return n_warnings
 
     def add_to_runahead_pool(self, itask, is_new=True):
@@ -209,9 +256,13 @@ class TaskPool(object):
             itask.state.reset(is_held=True)
 
         # add to the runahead pool
-        self.runahead_pool.setdefault(itask.point, OrderedDict())
+        if itask.point not in self.runahead_pool:
+            self.runahead_pool[itask.point] = OrderedDict()
+            insort(self._rh_points, itask.point)
         self.runahead_pool[itask.point][itask.identity] = itask
+        self._rh_tasks[itask.identity] = itask
         self.rhpool_changed = True
+        self._add_to_point_index(itask)
 
         # add row to "task_states" table
         if is_new and itask.submit_num == 0:
@@ -234,40 +285,17 @@ class TaskPool(object):
 
         # Any finished tasks can be released immediately (this can happen at
         # restart when all tasks are initially loaded into the runahead pool).
-        for itask_id_maps in self.runahead_pool.copy().values():
-            for itask in itask_id_maps.copy().values():
-                if itask.state(
-                    TASK_STATUS_FAILED,
-                    TASK_STATUS_SUCCEEDED,
-                    TASK_STATUS_EXPIRED
-                ):
-                    self.release_runahead_task(itask)
-                    released = True
-
-        limit = self.max_num_active_cycle_points
-
-        points = []
-        for point, itasks in sorted(
-                self.get_tasks_by_point(incl_runahead=True).items()):
-            has_unfinished_itasks = False
-            for itask in itasks:
-                if not itask.state(
-                    TASK_STATUS_FAILED,
-                    TASK_STATUS_SUCCEEDED,
-                    TASK_STATUS_EXPIRED
-                ):
-                    has_unfinished_itasks = True
-                    break
-            if not points and not has_unfinished_itasks:
-                # We need to begin with an unfinished cycle point.
-                continue
-            points.append(point)
+        for itask in list(self._rh_finished_tasks.values()):
+            self.release_runahead_task(itask)
+            released = True
 
-        if not points:
+        if not self._unfinished_points:
             return False
 
+        limit = self.max_num_active_cycle_points
+
         # Get the earliest point with unfinished tasks.
-        runahead_base_point = min(points)
+        runahead_base_point = self._unfinished_points[0]
 
         # Get all cycling points possible after the runahead base point.
         if (self._prev_runahead_base_point is not None and
@@ -287,11 +315,12 @@ class TaskPool(object):
             self._prev_runahead_sequence_points = sequence_points
             self._prev_runahead_base_point = runahead_base_point
 
-        points = set(points).union(sequence_points)
-
         if self.custom_runahead_limit is None:
             # Calculate which tasks to release based on a maximum number of
             # active cycle points (active meaning non-finished tasks).
+            index = bisect_left(self._points, runahead_base_point)
+            points = set(self._points[index:index + limit])
+            points.update(sequence_points)
             latest_allowed_point = sorted(points)[:limit][-1]
             if self.max_future_offset is not None:
                 # For the first N points, release their future trigger tasks.
@@ -316,11 +345,11 @@ class TaskPool(object):
         if self.stop_point and latest_allowed_point > self.stop_point:
             latest_allowed_point = self.stop_point
 
-        for point, itask_id_map in self.runahead_pool.copy().items():
-            if point <= latest_allowed_point:
-                for itask in itask_id_map.copy().values():
-                    self.release_runahead_task(itask)
-                    released = True
+        for point in self._rh_points[
+                :bisect_right(self._rh_points, latest_allowed_point)]:
+            for itask in list(self.runahead_pool[point].values()):
+                self.release_runahead_task(itask)
+                released = True
         return released
 
     def load_db_task_pool_for_restart(self, row_idx, row):
@@ -477,8 +506,8 @@ class TaskPool(object):
             if isinstance(key1, list):
                 key1 = tuple(key1)
             key = (key1, cycle, name, submit_num)
-            self.task_events_mgr.event_timers[key] = TaskActionTimer(
-                ctx, delays, num, delay, timeout)
+            self.task_events_mgr.add_event_timer(key, TaskActionTimer(
+                ctx, delays, num, delay, timeout))
         else:
             LOG.exception(
                 "%(id)s: skip action timer %(ctx_key)s" %
@@ -496,16 +525,88 @@ class TaskPool(object):
         self.queues[queue][itask.identity] = itask
         self.pool.setdefault(itask.point, {})
         self.pool[itask.point][itask.identity] = itask
+        self._pool_tasks[itask.identity] = itask
         self.pool_changed = True
         self.pool_changes.append(itask)
+        self._add_to_dependency_index(itask)
         LOG.debug("[%s] -released to the task pool", itask)
         del self.runahead_pool[itask.point][itask.identity]
         if not self.runahead_pool[itask.point]:
             del self.runahead_pool[itask.point]
+            del self._rh_points[bisect_left(self._rh_points, itask.point)]
+        del self._rh_tasks[itask.identity]
+        self._rh_finished_tasks.pop(itask.identity, None)
         self.rhpool_changed = True
+        self._set_task_deadline(itask)
+        if itask.state(*TASK_STATUSES_ACTIVE):
+            self._active_tasks[itask.identity] = itask
         if itask.tdef.max_future_prereq_offset is not None:
             self.set_max_future_offset()
 
+    def _add_to_point_index(self, itask):
+        """Index a task entering the runahead pool by its cycle point."""
+        point = itask.point
+        n_tasks = self._point_n_tasks.get(point, 0)
+        if not n_tasks:
+            insort(self._points, point)
+        self._point_n_tasks[point] = n_tasks + 1
+        if itask.state(*self.RUNAHEAD_FINISHED_STATUSES):
+            self._rh_finished_tasks[itask.identity] = itask
+        else:
+            self._add_unfinished(point)
+        itask.state.set_on_status_change(
+            partial(self._set_status_changed, itask))
+
+    def _remove_from_point_index(self, itask):
+        """Remove a task leaving the pools from the cycle point index."""
+        itask.state.set_on_status_change(None)
+        point = itask.point
+        self._point_n_tasks[point] -= 1
+        if not self._point_n_tasks[point]:
+            del self._point_n_tasks[point]
+            del self._points[bisect_left(self._points, point)]
+        if self._rh_finished_tasks.pop(itask.identity, None) is None:
+            if not itask.state(*self.RUNAHEAD_FINISHED_STATUSES):
+                self._remove_unfinished(point)
+
+    def _add_unfinished(self, point):
+        """Count an unfinished task at point."""
+        n_unfinished = self._point_n_unfinished.get(point, 0)
+        if not n_unfinished:
+            insort(self._unfinished_points, point)
+        self._point_n_unfinished[point] = n_unfinished + 1
+
+    def _remove_unfinished(self, point):
+        """Uncount an unfinished task at point."""
+        self._point_n_unfinished[point] -= 1
+        if not self._point_n_unfinished[point]:
+            del self._point_n_unfinished[point]
+            del self._unfinished_points[
+                bisect_left(self._unfinished_points, point)]
+
+    def _set_status_changed(self, itask, prev_status):
+        """Update the task indexes on a task status or held state change."""
+        is_rh_task = itask.identity in self.runahead_pool.get(
+            itask.point, ())
+        if not is_rh_task:
+            self._set_task_deadline(itask)
+            if itask.state(*TASK_STATUSES_ACTIVE):
+                self._active_tasks[itask.identity] = itask
+            elif self._active_tasks.pop(itask.identity, None) is not None:
+                # Reset poll timer and job timeout, task no longer active
+                TaskEventsManager.check_poll_time(itask)
+        was_finished = prev_status in self.RUNAHEAD_FINISHED_STATUSES
+        is_finished = itask.state(*self.RUNAHEAD_FINISHED_STATUSES)
+        if was_finished == is_finished:
+            return
+        if is_finished:
+            self._remove_unfinished(itask.point)
+            if is_rh_task:
+                self._rh_finished_tasks[itask.identity] = itask
+        else:
+            self._add_unfinished(itask.point)
+            self._rh_finished_tasks.pop(itask.identity, None)
+
     def remove(self, itask, reason=None):
         """Remove a task proxy from the pool."""
         try:
@@ -515,7 +616,11 @@ class TaskPool(object):
         else:
             if not self.runahead_pool[itask.point]:
                 del self.runahead_pool[itask.point]
+                del self._rh_points[
+                    bisect_left(self._rh_points, itask.point)]
+            del self._rh_tasks[itask.identity]
             self.rhpool_changed = True
+            self._remove_from_point_index(itask)
             return
 
         # remove from queue
@@ -524,7 +629,12 @@ class TaskPool(object):
         del self.pool[itask.point][itask.identity]
         if not self.pool[itask.point]:
             del self.pool[itask.point]
+        del self._pool_tasks[itask.identity]
         self.pool_changed = True
+        self._remove_from_dependency_index(itask)
+        self._remove_from_point_index(itask)
+        self._task_deadlines.remove(itask)
+        self._active_tasks.pop(itask.identity, None)
         msg = "task proxy removed"
         if reason:
             msg += " (%s)" % reason
@@ -537,6 +647,17 @@ class TaskPool(object):
         """Return a list of all task proxies."""
         return self.get_rh_tasks() + self.get_tasks()
 
+    def get_active_tasks(self):
+        """Return a list of active task proxies in the main pool."""
+        return list(self._active_tasks.values())
+
+    def get_next_task_deadline(self):
+        """Return the next clock trigger, expiry or retry time of a task.
+
+        Return None if no task in the main pool has any of these.
+        """
+        return self._task_deadlines.get_next_deadline()
+
     def get_tasks(self):
         """Return a list of task proxies in the main task pool."""
         if self.pool_changed:
@@ -575,18 +696,19 @@ class TaskPool(object):
             point_itasks[point].extend(list(itask_id_map.values()))
         return point_itasks
 
+    def get_pool_task(self, id_):
+        """Return task by ID if it is in the main pool, else None."""
+        return self._pool_tasks.get(id_)
+
     def get_task_by_id(self, id_):
         """Return task by ID is in the runahead_pool or pool.
 
         Return None if task does not exist.
         """
-        for itask_ids in (
-                list(self.queues.values())
-                + list(self.runahead_pool.values())):
-            try:
-                return itask_ids[id_]
-            except KeyError:
-                pass
+        itask = self._pool_tasks.get(id_)
+        if itask is None:
+            itask = self._rh_tasks.get(id_)
+        return itask
 
     def get_ready_tasks(self):
         """
@@ -978,19 +1100,81 @@ class TaskPool(object):
         """Run time dependency negotiation.
 
         Tasks attempt to get their prerequisites satisfied by other tasks'
-        outputs. Brokered negotiation is O(n) in number of tasks.
+        outputs. Only outputs that have changed since the last call are
+        matched, against the prerequisites that subscribe to them, so the
+        cost follows the number of changed outputs rather than pool size.
+
+        Tasks that are new to the pool, or whose prerequisites have been
+        reset, are matched against all completed outputs in the pool.
 
         """
-        all_task_outputs = set()
-        for itask in self.get_tasks():
-            for output in itask.state.outputs.get_completed():
-                all_task_outputs.add((itask.tdef.name,
-                                      str(itask.point),
-                                      output))
-        for itask in self.get_tasks():
-            # Try to satisfy itask if not already satisfied.
+        changed_tasks = self._dep_changed_tasks
+        if not changed_tasks:
+            return
+        self._dep_changed_tasks = {}
+
+        # Update the completed outputs index, collecting new outputs.
+        new_outputs = set()
+        for itask in changed_tasks.values():
+            name = itask.tdef.name
+            point_str = str(itask.point)
+            completed = set(
+                (name, point_str, output)
+                for output in itask.state.outputs.get_completed())
+            prev_completed = self._task_completed_outputs.get(
+                itask.identity, set())
+            self.completed_outputs -= prev_completed - completed
+            new_outputs |= completed - prev_completed
+            self.completed_outputs |= completed
+            self._task_completed_outputs[itask.identity] = completed
+
+        # Find the dependents of the new outputs.
+        dependents = {}
+        for message in new_outputs:
+            for id_, itask in self.output_dependents.get(message, {}).items():
+                dependents.setdefault(id_, (itask, set()))[1].add(message)
+
+        for id_, itask in changed_tasks.items():
             if itask.state.prerequisites_are_not_all_satisfied():
-                itask.state.satisfy_me(all_task_outputs)
+                itask.state.satisfy_me(self.completed_outputs)
+            dependents.pop(id_, None)
+        for itask, messages in dependents.values():
+            if itask.state.prerequisites_are_not_all_satisfied():
+                itask.state.satisfy_me(messages)
+
+    def _add_to_dependency_index(self, itask):
+        """Index the prerequisites of a task entering the main pool."""
+        for prereqs in (
+                itask.state.prerequisites,
+                itask.state.suicide_prerequisites):
+            for prereq in prereqs:
+                for message in prereq.satisfied:
+                    self.output_dependents.setdefault(
+                        message, {})[itask.identity] = itask
+        itask.state.set_on_change(partial(self._set_dep_changed, itask))
+        self._set_dep_changed(itask)
+
+    def _remove_from_dependency_index(self, itask):
+        """Remove a task leaving the main pool from the dependency index."""
+        itask.state.set_on_change(None)
+        self._dep_changed_tasks.pop(itask.identity, None)
+        self.completed_outputs -= self._task_completed_outputs.pop(
+            itask.identity, set())
+        for prereqs in (
+                itask.state.prerequisites,
+                itask.state.suicide_prerequisites):
+            for prereq in prereqs:
+                for message in prereq.satisfied:
+                    try:
+                        del self.output_dependents[message][itask.identity]
+                    except KeyError:
+                        continue
+                    if not self.output_dependents[message]:
+                        del self.output_dependents[message]
+
+    def _set_dep_changed(self, itask):
+        """Flag task for dependency matching on the next pass."""
+        self._dep_changed_tasks[itask.identity] = itask
 
     def force_spawn(self, itask):
         """Spawn successor of itask."""
@@ -1248,19 +1432,10 @@ class TaskPool(object):
 
         Return True if task has expired.
         """
-        if (
-                not itask.state(
-                    TASK_STATUS_WAITING,
-                    is_held=False
-                )
-                or itask.tdef.expiration_offset is None
-        ):
+        if not itask.state(TASK_STATUS_WAITING, is_held=False):
             return False
-        if itask.expire_time is None:
-            itask.expire_time = (
-                itask.get_point_as_seconds() +
-                itask.get_offset_as_seconds(itask.tdef.expiration_offset))
-        if now > itask.expire_time:
+        expire_time = itask.get_expire_time()
+        if expire_time is not None and now > expire_time:
             msg = 'Task expired (skipping job).'
             LOG.warning('[%s] -%s', itask, msg)
             self.task_events_mgr.setup_event_handlers(itask, "expired", msg)
@@ -1268,6 +1443,40 @@ class TaskPool(object):
             return True
         return False
 
+    def process_task_deadlines(self, now):
+        """Expire or check readiness of tasks with deadlines at or before now.
+
+        Tasks with a clock trigger, expiry or retry time are indexed by their
+        next such time, so only tasks due are checked on each call.
+        Return True if any task has expired or is ready to run.
+        """
+        process = False
+        for itask in self._task_deadlines.pop_due(now):
+            if self.set_expired_task(itask, now) or itask.is_ready(now):
+                process = True
+            self._set_task_deadline(itask, now)
+        return process
+
+    def _set_task_deadline(self, itask, now=None):
+        """Index task by its next clock trigger, expiry or retry time.
+
+        If now is set, ignore times before now.
+        """
+        if itask.state.status in itask.try_timers:
+            deadlines = [itask.try_timers[itask.state.status].timeout]
+        elif itask.state(TASK_STATUS_WAITING, is_held=False):
+            deadlines = [
+                itask.get_clock_trigger_time(), itask.get_expire_time()]
+        else:
+            deadlines = []
+        deadlines = [
+            deadline for deadline in deadlines
+            if deadline is not None and (now is None or deadline >= now)]
+        if deadlines:
+            self._task_deadlines.set(itask, min(deadlines))
+        else:
+            self._task_deadlines.remove(itask)
+
     def task_succeeded(self, id_):
         """Return True if task with id_ is in the succeeded state."""
         for itask in self.get_tasks():
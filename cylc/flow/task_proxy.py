@@ -412,13 +412,34 @@ class TaskProxy(object):
 
         Return True if there is no clock trigger or when clock trigger is done.
         """
+        clock_trigger_time = self.get_clock_trigger_time()
+        return clock_trigger_time is None or now >= clock_trigger_time
+
+    def get_clock_trigger_time(self):
+        """Compute and store clock trigger time as seconds since epoch.
+
+        Return None if there is no clock trigger.
+        """
         if self.tdef.clocktrigger_offset is None:
-            return True
+            return None
         if self.clock_trigger_time is None:
             self.clock_trigger_time = (
                 self.get_point_as_seconds() +
                 self.get_offset_as_seconds(self.tdef.clocktrigger_offset))
-        return now >= self.clock_trigger_time
+        return self.clock_trigger_time
+
+    def get_expire_time(self):
+        """Compute and store expire time as seconds since epoch.
+
+        Return None if the task does not expire.
+        """
+        if self.tdef.expiration_offset is None:
+            return None
+        if self.expire_time is None:
+            self.expire_time = (
+                self.get_point_as_seconds() +
+                self.get_offset_as_seconds(self.tdef.expiration_offset))
+        return self.expire_time
 
     def is_waiting_prereqs_done(self):
         """Is this task waiting for its prerequisites?"""
@@ -196,6 +196,11 @@ class TaskState(object):
             Are prerequisites satisfied?
         ._suicide_is_satisfied (boolean):
             Are prerequisites to trigger suicide satisfied?
+        ._on_change (callable):
+            Called when outputs change or prerequisites are reset.
+        ._on_status_change (callable):
+            Called with the previous status when the status or the held
+            state changes.
     """
 
     # Memory optimization - constrain possible attributes to this list.
@@ -213,6 +218,8 @@ class TaskState(object):
         "xtriggers",
         "_is_satisfied",
         "_suicide_is_satisfied",
+        "_on_change",
+        "_on_status_change",
     ]
 
     def __init__(self, tdef, point, status, is_held):
@@ -224,6 +231,8 @@ class TaskState(object):
 
         self._is_satisfied = None
         self._suicide_is_satisfied = None
+        self._on_change = None
+        self._on_status_change = None
 
         # Prerequisites.
         self.prerequisites = []
@@ -282,6 +291,26 @@ class TaskState(object):
             )
         )
 
+    def set_on_change(self, callback):
+        """Register a callback for changes relevant to dependency matching.
+
+        `callback` is called with no arguments whenever the completion
+        status of an output changes or the prerequisites are reset. Use
+        `None` to unset it.
+
+        """
+        self._on_change = callback
+        self.outputs.on_change = callback
+
+    def set_on_status_change(self, callback):
+        """Register a callback for status and held state changes.
+
+        `callback` is called with the previous status whenever the status or
+        the held state changes. Use `None` to unset it.
+
+        """
+        self._on_status_change = callback
+
     def satisfy_me(self, all_task_outputs):
         """Attempt to get my prerequisites satisfied."""
         for prereqs in [self.prerequisites, self.suicide_prerequisites]:
@@ -336,6 +365,8 @@ class TaskState(object):
         for prereq in self.prerequisites:
             prereq.set_not_satisfied()
         self._is_satisfied = None
+        if self._on_change is not None:
+            self._on_change()
 
     def prerequisites_dump(self, list_prereqs=False):
         """Dump prerequisites."""
@@ -395,9 +426,12 @@ class TaskState(object):
             return False
 
         prev_message = str(self)
+        prev_status = self.status
 
         # perform the actual state change
         self.status, self.is_held = requested_status
+        if self._on_status_change is not None:
+            self._on_status_change(prev_status)
 
         self.time_updated = get_current_time_string()
         self.is_updated = True
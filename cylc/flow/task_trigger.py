@@ -16,7 +16,7 @@
 
 from cylc.flow.cycling.loader import get_point_relative
 from cylc.flow.exceptions import TriggerExpressionError
-from cylc.flow.prerequisite import Prerequisite
+from cylc.flow.prerequisite import Prerequisite, TriggerExpression
 from cylc.flow.task_outputs import (
     TASK_OUTPUT_EXPIRED, TASK_OUTPUT_SUBMITTED, TASK_OUTPUT_SUBMIT_FAILED,
     TASK_OUTPUT_STARTED, TASK_OUTPUT_SUCCEEDED, TASK_OUTPUT_FAILED)
@@ -113,14 +113,23 @@ class Dependency(object):
             expression (exp).
         suicide (bool): True if this is a suicide trigger else False.
 
+    Conditional expressions are compiled once, into a TriggerExpression
+    shared by all of the Prerequisite objects generated from this dependency.
+
     """
 
-    __slots__ = ['_exp', 'task_triggers', 'suicide']
+    __slots__ = ['_exp', 'task_triggers', 'suicide', '_trigger_expression']
 
     def __init__(self, exp, task_triggers, suicide):
         self._exp = exp
         self.task_triggers = tuple(task_triggers)  # More memory efficient.
         self.suicide = suicide
+        self._trigger_expression = None
+        if self._is_conditional(exp):
+            # Leaves are indices into self.task_triggers, which is the order
+            # in which messages are added to each Prerequisite.
+            self._trigger_expression = TriggerExpression(
+                exp, self.task_triggers.index)
 
     def get_prerequisite(self, point, tdef):
         """Generate a Prerequisite object from this dependency.
@@ -165,7 +174,12 @@ class Dependency(object):
                 cpre.add(task_trigger.task_name,
                          task_trigger.get_point(point),
                          task_trigger.output)
-        cpre.set_condition(self.get_expression(point))
+        if self._trigger_expression is None:
+            # The expression string is only used if conditional.
+            cpre.set_condition('')
+        else:
+            cpre.set_condition(
+                self.get_expression(point), self._trigger_expression)
         return cpre
 
     def get_expression(self, point):
@@ -193,6 +207,17 @@ class Dependency(object):
                 ret.append('( %s )' % str(item))
         return ' '.join(ret)
 
+    @classmethod
+    def _is_conditional(cls, nested_expr):
+        """Return True if a nested expression contains a "|"."""
+        for item in nested_expr:
+            if isinstance(item, list):
+                if cls._is_conditional(item):
+                    return True
+            elif item == TriggerExpression.OR:
+                return True
+        return False
+
     @classmethod
     def _stringify_list(cls, nested_expr, point):
         """Stringify a nested list of TaskTrigger objects."""
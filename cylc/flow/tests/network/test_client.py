@@ -15,13 +15,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """Test the client module components."""
 
+import getpass
 from threading import Barrier
 from time import sleep
 from unittest import main
+from unittest.mock import patch
 
 import zmq
 
 from cylc.flow.cfgspec.glbl_cfg import glbl_cfg
+from cylc.flow.exceptions import ClientError
+from cylc.flow.network import (
+    ACCEPT_ENCODING, decode_, decode_frames, encode_)
 from cylc.flow.network.server import SuiteRuntimeServer, PB_METHOD_MAP
 from cylc.flow.network.client import SuiteRuntimeClient
 from cylc.flow.suite_files import create_auth_files
@@ -106,6 +111,12 @@ class TestSuiteRuntimeClient(CylcWorkflowTestCase):
         self.server.stop()
         self.client.stop()
 
+    def _raw_request(self, msg):
+        """Send msg with the client socket, return the response frames."""
+        self.client.socket.send_string(encode_(msg))
+        return self.client.loop.run_until_complete(
+            self.client.socket.recv_multipart())
+
     def test_constructor(self):
         self.assertFalse(self.client.socket.closed)
 
@@ -128,6 +139,64 @@ query {{
         pb_data.ParseFromString(pb_msg)
         self.assertEqual(pb_data.workflow.id, self.workflow_id)
 
+    def test_serial_request_compressed(self):
+        """Test large responses are compressed, and decompressed."""
+        with patch('cylc.flow.network.COMPRESS_THRESHOLD', 10):
+            header, payload = self._raw_request({
+                'command': 'pb_entire_workflow', 'args': {},
+                ACCEPT_ENCODING: ['zlib']})
+            self.assertEqual(header, b'{"encoding": "zlib"}')
+            workflow = self.scheduler.ws_data_mgr.get_entire_workflow()
+            self.assertEqual(
+                decode_frames([header, payload]),
+                workflow.SerializeToString())
+            pb_msg = self.client.serial_request('pb_entire_workflow')
+        pb_data = PB_METHOD_MAP['pb_entire_workflow']()
+        pb_data.ParseFromString(pb_msg)
+        self.assertEqual(pb_data.workflow.id, self.workflow_id)
+
+    def test_unframed_request(self):
+        """Test clients that do not accept framed responses still work."""
+        response = self._raw_request({'command': 'ping_suite', 'args': {}})
+        self.assertEqual(len(response), 1)
+        self.assertEqual(decode_(response[0].decode()), {
+            'data': True, 'user': getpass.getuser()})
+
+    def test_concurrent_requests(self):
+        """Test requests from several clients are served by workers."""
+        clients = [
+            SuiteRuntimeClient(
+                self.scheduler.suite,
+                host=self.scheduler.host,
+                port=self.server.port)
+            for _ in range(3)]
+        try:
+            for client in clients:
+                self.assertTrue(client.serial_request('ping_suite'))
+        finally:
+            for client in clients:
+                client.stop()
+        metrics = self.client.serial_request('get_server_metrics')
+        self.assertEqual(metrics['ping_suite']['count'], 3)
+
+    def test_encode_error(self):
+        """Test a response that fails to encode is returned as an error."""
+        calls = []
+
+        def bad_encode_(message):
+            calls.append(message)
+            if len(calls) == 1:
+                raise ValueError('bad message')
+            return encode_(message)
+
+        with patch('cylc.flow.network.server.encode_', bad_encode_):
+            with self.assertRaisesRegex(
+                    ClientError, 'failed to encode response'):
+                self.client.serial_request('ping_suite')
+        # The worker is still serving requests.
+        for _ in range(self.server.n_workers):
+            self.assertTrue(self.client.serial_request('ping_suite'))
+
 
 if __name__ == '__main__':
     main()
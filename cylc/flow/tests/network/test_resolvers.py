@@ -139,6 +139,24 @@ class TestResolvers(CylcWorkflowTestCase):
     def test_constructor(self):
         self.assertIsNotNone(self.resolvers.schd)
 
+    def test_snapshot(self):
+        """Test resolvers of a query keep the data at the time of the call."""
+        resolvers = self.resolvers.snapshot()
+        self.assertIs(resolvers.schd, self.scheduler)
+        self.scheduler.ws_data_mgr.clear_deltas()
+        self.scheduler.ws_data_mgr.prune_points(
+            [node.cycle_point for node in self.data[TASK_PROXIES].values()])
+        self.scheduler.ws_data_mgr.apply_deltas()
+        args = deepcopy(NODE_ARGS)
+        args['ghosts'] = True
+        self.assertEqual(
+            len(self.node_ids),
+            len(_run_coroutine(resolvers.get_nodes_all(TASK_PROXIES, args))))
+        self.assertEqual(
+            0,
+            len(_run_coroutine(
+                self.resolvers.get_nodes_all(TASK_PROXIES, args))))
+
     def test_get_workflows(self):
         """Test method returning workflow messages satisfying filter args."""
         args = deepcopy(FLOW_ARGS)
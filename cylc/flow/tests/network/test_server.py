@@ -145,6 +145,49 @@ query {{
         with self.assertRaises(ValueError):
             self.server._listener()
 
+    def test_dispatch(self):
+        """Test requests are passed to workers by lane."""
+        sent = []
+
+        class RecordingBackend(object):
+            def send_multipart(self, frames):
+                sent.append(frames)
+
+        server = SuiteRuntimeServer(self.scheduler, n_workers=2)
+        server.backend = RecordingBackend()
+        for client_id, command in [
+                (b'c1', 'graphql'), (b'c2', 'pb_entire_workflow'),
+                (b'c3', 'ping_suite'), (b'c4', 'put_messages')]:
+            server.requests.append((
+                server.LANES.get(command, server.LANE_DEFAULT),
+                next(server.request_seq), client_id, 0.0, command.encode()))
+        server.requests.sort()
+        server.idle_workers = [b'w1', b'w2']
+        server._dispatch()
+        self.assertEqual(
+            [frames[2] for frames in sent], [b'c4', b'c3'])
+        # Only one of the two workers may serve bulk requests.
+        server.idle_workers = [b'w1']
+        server.busy_workers = {}
+        server._dispatch()
+        server.idle_workers = [b'w2']
+        server._dispatch()
+        self.assertEqual(
+            [frames[2] for frames in sent], [b'c4', b'c3', b'c1'])
+        self.assertEqual(server.busy_workers, {b'w1': server.LANE_BULK})
+        self.assertEqual(server.idle_workers, [b'w2'])
+
+    def test_get_server_metrics(self):
+        """Test latencies are returned by endpoint."""
+        self.server._add_metric('ping_suite', 1.0, 2.0)
+        self.server._add_metric('ping_suite', 3.0, 0.0)
+        self.server._add_metric('foobar', 1.0, 1.0)
+        metrics = self.server.get_server_metrics()
+        self.assertEqual(metrics['ping_suite'], {
+            'count': 2, 'wait_mean': 2.0, 'wait_max': 3.0,
+            'service_mean': 1.0, 'service_max': 2.0})
+        self.assertEqual(metrics[None]['count'], 1)
+
     def test_receiver(self):
         """Test receiver."""
         msg_in = {'not_command': 'foobar', 'args': {}}
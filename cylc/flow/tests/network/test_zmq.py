@@ -25,7 +25,8 @@ import zmq
 
 from cylc.flow.exceptions import ClientError, CylcError
 from cylc.flow.cfgspec.glbl_cfg import glbl_cfg
-from cylc.flow.network import ZMQSocketBase
+from cylc.flow.network import (
+    ZMQSocketBase, decode_frames, encode_frames)
 from cylc.flow.suite_files import create_auth_files
 
 
@@ -124,6 +125,26 @@ def test_stop():
     assert not publisher.thread.is_alive()
 
 
+def test_encode_frames():
+    """Test large payloads are compressed if the encoding is accepted."""
+    payload = b'x' * 100
+    assert encode_frames(payload, ['zlib'], threshold=200) == [
+        b'{"encoding": "identity"}', payload]
+    assert encode_frames(payload, ['lz4'], threshold=50) == [
+        b'{"encoding": "identity"}', payload]
+    header, compressed = encode_frames(payload, ['lz4', 'zlib'], threshold=50)
+    assert header == b'{"encoding": "zlib"}'
+    assert len(compressed) < len(payload)
+    assert decode_frames([header, compressed]) == payload
+
+
+def test_decode_frames():
+    """Test unframed responses, and unknown encodings."""
+    assert decode_frames([b'payload']) == b'payload'
+    with pytest.raises(ClientError):
+        decode_frames([b'{"encoding": "lz4"}', b'payload'])
+
+
 def test_client_server_connection_requires_consistent_keys():
     """Client-server connection must be blocked without consistent keys.
 
@@ -0,0 +1,69 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from cylc.flow.batch_sys_manager import BatchSysManager
+from cylc.flow.cylc_subproc import procopen
+
+
+# A batch system with all jobs except "2"
+HANDLER = SimpleNamespace(
+    get_poll_many_cmd=lambda ids: (
+        ['printf', r'JOBID\n%s\n'] + [id_ for id_ in ids if id_ != '2']))
+
+# A batch system that cannot be contacted
+HANDLER_DOWN = SimpleNamespace(
+    POLL_CANT_CONNECT_ERR='Connection refused',
+    get_poll_many_cmd=lambda ids: [
+        'sh', '-c', 'echo "Connection refused" >&2; exit 1'])
+
+
+def query(batch_sys_mgr, handler, ids):
+    """Query handler for ids, return (result, poll command calls)."""
+    with mock.patch.object(
+            batch_sys_mgr, '_get_sys', return_value=handler), \
+            mock.patch(
+                'cylc.flow.batch_sys_manager.procopen',
+                wraps=procopen) as mock_procopen, \
+            mock.patch('sys.stderr'):
+        ids = batch_sys_mgr._jobs_poll_batch_sys_query('foo', ids, [])
+    return ids, [call[0][0][2:] for call in mock_procopen.call_args_list]
+
+
+@pytest.mark.parametrize('window', [0.0, 60.0])
+def test_jobs_poll_batch_sys_query(window):
+    """Test batch system poll results are reused in the cache window."""
+    batch_sys_mgr = BatchSysManager(window)
+    assert query(batch_sys_mgr, HANDLER, ['1', '2']) == ({'1'}, [['1']])
+    ids, calls = query(batch_sys_mgr, HANDLER, ['2', '1', '3'])
+    assert ids == {'1', '3'}
+    if window:
+        # Only job 3 is not in the cache
+        assert calls == [['3']]
+    else:
+        assert calls == [['1', '3']]
+
+
+def test_jobs_poll_batch_sys_query_cant_connect():
+    """Test batch system poll results are not cached on connect failure."""
+    batch_sys_mgr = BatchSysManager(60.0)
+    assert query(batch_sys_mgr, HANDLER_DOWN, ['1'])[0] is None
+    assert not batch_sys_mgr.poll_cache
+    assert query(batch_sys_mgr, HANDLER, ['1', '2']) == ({'1'}, [['1']])
@@ -19,6 +19,7 @@ import pytest
 from tempfile import TemporaryDirectory, NamedTemporaryFile
 from pathlib import Path
 from cylc.flow.config import SuiteConfig
+from cylc.flow.exceptions import SuiteConfigError
 
 
 def get_test_inheritance_quotes():
@@ -211,3 +212,39 @@ class TestSuiteConfig(object):
                         ['MAINFAM_major1_minor10'])
                 assert 'goodbye_0_major1_minor10' in \
                        config.runtime['descendants']['SOMEFAM']
+
+    def test_archive_horizon(self):
+        """Test the database archive horizon is an interval, or None."""
+        for horizon, expected in [
+                ('', None), ('P10D', 'P10D'), ('P0D', 'P0Y')]:
+            with NamedTemporaryFile() as tf:
+                tf.write(b'''
+[cylc]
+    [[database]]
+        archive horizon = %s
+[scheduling]
+    initial cycle point = 2018-01-01
+    [[graph]]
+        P1D = foo
+''' % horizon.encode())
+                tf.flush()
+                config = SuiteConfig('test', tf.name)
+                assert str(config.get_archive_horizon()) == str(expected)
+        for horizon, message in [
+                ('forever', 'Illegal'), ('-P10D', 'Negative')]:
+            with NamedTemporaryFile() as tf:
+                tf.write(b'''
+[cylc]
+    [[database]]
+        archive horizon = %s
+[scheduling]
+    initial cycle point = 2018-01-01
+    [[graph]]
+        P1D = foo
+''' % horizon.encode())
+                tf.flush()
+                with pytest.raises(SuiteConfigError) as excinfo:
+                    SuiteConfig('test', tf.name)
+                assert (
+                    "%s [cylc][database]archive horizon" % message
+                    in str(excinfo.value))
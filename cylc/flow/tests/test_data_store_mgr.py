@@ -73,7 +73,11 @@ class TestDataStoreMgr(CylcWorkflowTestCase):
             )
             assert 0 == warnings
         self.task_pool.release_runahead_tasks()
-        self.data = self.ws_data_mgr.data[self.ws_data_mgr.workflow_id]
+
+    @property
+    def data(self):
+        """The current snapshot of the data-store."""
+        return self.ws_data_mgr.data[self.ws_data_mgr.workflow_id]
 
     def test_constructor(self):
         self.assertEqual(
@@ -96,12 +100,11 @@ class TestDataStoreMgr(CylcWorkflowTestCase):
         self.ws_data_mgr.generate_definition_elements()
         self.ws_data_mgr.apply_deltas()
         self.ws_data_mgr.pool_points = set(list(self.scheduler.pool.pool))
-        tasks_proxies_generated = self.data[TASK_PROXIES]
-        self.assertEqual(0, len(tasks_proxies_generated))
+        self.assertEqual(0, len(self.data[TASK_PROXIES]))
         self.ws_data_mgr.clear_deltas()
         self.ws_data_mgr.generate_graph_elements()
         self.ws_data_mgr.apply_deltas()
-        self.assertEqual(3, len(tasks_proxies_generated))
+        self.assertEqual(3, len(self.data[TASK_PROXIES]))
 
     def test_get_data_elements(self):
         """Test method that returns data elements by specified type."""
@@ -146,6 +149,34 @@ class TestDataStoreMgr(CylcWorkflowTestCase):
         self.ws_data_mgr.initiate_data_model(reloaded=True)
         self.assertEqual(3, len(self.data[WORKFLOW].task_proxies))
 
+    def test_apply_deltas_snapshot(self):
+        """Test snapshots published before are not changed by deltas."""
+        self.ws_data_mgr.initiate_data_model()
+        old_data = self.data
+        old_tasks = dict(old_data[TASK_PROXIES])
+        old_states = {
+            tp_id: tproxy.state for tp_id, tproxy in old_tasks.items()}
+        update_tasks = self.task_pool.get_all_tasks()
+        self.ws_data_mgr.clear_deltas()
+        self.ws_data_mgr.update_task_proxies(update_tasks)
+        self.ws_data_mgr.apply_deltas()
+        self.assertIsNot(old_data, self.data)
+        self.assertEqual(old_tasks, old_data[TASK_PROXIES])
+        self.assertEqual(
+            old_states,
+            {tp_id: tproxy.state for tp_id, tproxy in old_tasks.items()})
+        self.assertTrue(self._collect_states(TASK_PROXIES))
+        # Pruning leaves the snapshot as it was too.
+        old_data = self.data
+        old_proxies = list(old_data[WORKFLOW].task_proxies)
+        self.ws_data_mgr.clear_deltas()
+        self.ws_data_mgr.prune_points(
+            [tproxy.cycle_point for tproxy in old_tasks.values()])
+        self.ws_data_mgr.apply_deltas()
+        self.assertFalse(self.data[TASK_PROXIES])
+        self.assertEqual(old_proxies, old_data[WORKFLOW].task_proxies)
+        self.assertEqual(len(old_tasks), len(old_data[TASK_PROXIES]))
+
     def test_prune_points(self):
         """Test method that removes data elements by cycle point."""
         self.ws_data_mgr.initiate_data_model()
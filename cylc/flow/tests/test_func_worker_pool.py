@@ -0,0 +1,125 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+from time import sleep, time
+
+import pytest
+
+from cylc.flow.func_worker_pool import FuncWorkerPool
+from cylc.flow.subprocctx import SubFuncContext
+
+
+FUNCS = '''
+import os
+import time
+
+def the_answer(offset=0):
+    print('thinking')
+    return True, {'answer': 42 + offset}
+
+def the_crash():
+    os._exit(3)
+
+def the_error():
+    raise ValueError('no answer')
+
+def the_wait():
+    time.sleep(10)
+'''
+
+
+@pytest.fixture
+def src_dir(tmp_path):
+    python_dir = tmp_path / 'lib' / 'python'
+    python_dir.mkdir(parents=True)
+    for name in ('the_answer', 'the_crash', 'the_error', 'the_wait'):
+        (python_dir / ('%s.py' % name)).write_text(FUNCS)
+    return str(tmp_path)
+
+
+@pytest.fixture
+def func_pool():
+    func_pool = FuncWorkerPool(2, 10.0)
+    yield func_pool
+    func_pool.terminate()
+
+
+def run_funcs(func_pool, src_dir, *funcs):
+    """Run funcs in func_pool until done, return their contexts by name."""
+    ctxs = {}
+    for func_name, func_kwargs in funcs:
+        ctx = SubFuncContext(func_name, func_name, [], func_kwargs)
+        ctx.update_command(src_dir)
+        func_pool.put_command(
+            ctx, lambda ctx: ctxs.setdefault(ctx.label, []).append(ctx))
+    timeout = time() + 60
+    while func_pool.is_not_done() and time() < timeout:
+        func_pool.process()
+        sleep(0.01)
+    assert not func_pool.is_not_done()
+    return ctxs
+
+
+def test_process(func_pool, src_dir):
+    """Test function calls are served by long-lived workers."""
+    ctxs = run_funcs(
+        func_pool, src_dir,
+        *([('the_answer', {'offset': 1})] * 3 + [('the_error', {})]))
+    for ctx in ctxs['the_answer']:
+        assert ctx.ret_code == 0
+        assert json.loads(ctx.out) == [True, {'answer': 43}]
+        assert ctx.err == 'thinking\n'
+    ctx, = ctxs['the_error']
+    assert ctx.ret_code == 1
+    assert 'ValueError: no answer' in ctx.err
+    assert len(func_pool.workers) == 2
+    assert len(func_pool.idles) == 2
+
+
+def test_process_worker_died(func_pool, src_dir):
+    """Test a worker that dies is replaced."""
+    ctxs = run_funcs(
+        func_pool, src_dir, ('the_crash', {}), ('the_answer', {}))
+    ctx, = ctxs['the_crash']
+    assert ctx.ret_code == 3
+    assert 'worker process died' in ctx.err
+    assert len(func_pool.workers) == 1
+    ctxs = run_funcs(func_pool, src_dir, ('the_answer', {}))
+    assert ctxs['the_answer'][0].ret_code == 0
+
+
+def test_process_timeout(func_pool, src_dir):
+    """Test a worker is killed on timeout."""
+    func_pool.timeout = 0.5
+    ctxs = run_funcs(func_pool, src_dir, ('the_wait', {}))
+    ctx, = ctxs['the_wait']
+    assert ctx.ret_code == -9
+    assert 'killed on timeout' in ctx.err
+    assert not func_pool.workers
+
+
+def test_terminate(func_pool, src_dir):
+    """Test queued calls are not run after terminate."""
+    ctxs = []
+    ctx = SubFuncContext('the_answer', 'the_answer', [], {})
+    ctx.update_command(src_dir)
+    func_pool.put_command(ctx, ctxs.append)
+    func_pool.terminate()
+    assert ctxs == [ctx]
+    assert ctx.ret_code == 999
+    func_pool.put_command(ctx, ctxs.append)
+    assert len(ctxs) == 2
@@ -0,0 +1,130 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from io import BytesIO
+import sys
+from time import sleep, time
+
+import pytest
+
+from cylc.flow.batch_sys_manager import BatchSysManager
+from cylc.flow.job_agent import (
+    JobAgentPool, decode_frames, encode_frame)
+from cylc.flow.subprocctx import SubProcContext
+
+
+@pytest.fixture
+def agent_pool():
+    agent_pool = JobAgentPool(10.0)
+    agent_pool.CMD = [
+        sys.executable, '-m', 'cylc.flow.scripts.cylc_jobs_agent']
+    yield agent_pool
+    agent_pool.terminate()
+
+
+def run_cmds(agent_pool, *cmds):
+    """Run job commands in agent_pool until done, return their contexts."""
+    ctxs = []
+    for cmd in cmds:
+        agent_pool.put_command(SubProcContext(cmd[1], cmd), ctxs.append)
+    timeout = time() + 60
+    while agent_pool.is_not_done() and time() < timeout:
+        agent_pool.process()
+        sleep(0.01)
+    assert not agent_pool.is_not_done()
+    return ctxs
+
+
+def test_jobs_agent(tmp_path):
+    """Test job commands are run from request frames."""
+    in_handle = BytesIO(
+        encode_frame({'id': 1, 'args': ['ping'], 'stdin': None}) +
+        encode_frame({
+            'id': 2,
+            'args': ['jobs-kill', '--', str(tmp_path), '1/foo/01'],
+            'stdin': None}) +
+        encode_frame({
+            'id': 3, 'args': ['jobs-foo', '--', 'x'], 'stdin': None}))
+    out_handle = BytesIO()
+    BatchSysManager().jobs_agent(in_handle, out_handle)
+    pong, kill, bad = decode_frames(bytearray(out_handle.getvalue()))
+    assert pong == {'id': 1, 'ret_code': 0, 'out': '', 'err': ''}
+    assert kill['ret_code'] == 0
+    assert kill['out'].startswith(BatchSysManager.OUT_PREFIX_SUMMARY)
+    assert kill['out'].splitlines()[0].endswith('|1/foo/01|1')
+    assert bad['ret_code'] == 1
+    assert 'jobs-foo: unknown job command' in bad['err']
+
+
+def test_process(agent_pool, tmp_path):
+    """Test job commands are run in one long-lived agent."""
+    cmd = ['cylc', 'jobs-kill', '--', str(tmp_path), '1/foo/01']
+    ctxs = run_cmds(agent_pool, cmd, cmd)
+    assert [ctx.ret_code for ctx in ctxs] == [0, 0]
+    assert '|1/foo/01|1' in ctxs[0].out
+    agent, = agent_pool.agents.values()
+    ctxs = run_cmds(agent_pool, cmd)
+    assert ctxs[0].ret_code == 0
+    assert agent_pool.agents[()] is agent
+
+
+def test_process_ping(agent_pool, tmp_path):
+    """Test an idle agent is pinged."""
+    agent_pool.PING_INTERVAL = 0.0
+    run_cmds(agent_pool, ['cylc', 'jobs-poll', '--', str(tmp_path)])
+    agent, = agent_pool.agents.values()
+    agent_pool.process()
+    assert agent.ping_id is not None
+    assert not agent_pool.is_not_done()
+    timeout = time() + 60
+    while agent.ping_id is not None and time() < timeout:
+        agent_pool.process()
+        sleep(0.01)
+    assert agent.ping_id is None
+    assert agent_pool.agents[()] is agent
+
+
+def test_process_agent_died(agent_pool, tmp_path):
+    """Test commands fail if their agent dies, and a new agent is started."""
+    cmd = ['cylc', 'jobs-kill', '--', str(tmp_path), '1/foo/01']
+    run_cmds(agent_pool, cmd)
+    agent, = agent_pool.agents.values()
+    agent.proc.kill()
+    ctxs = run_cmds(agent_pool, cmd)
+    assert ctxs[0].ret_code
+    assert 'job agent died' in ctxs[0].err
+    assert not agent_pool.agents
+    ctxs = run_cmds(agent_pool, cmd)
+    assert ctxs[0].ret_code == 0
+    assert agent_pool.agents[()] is not agent
+
+
+def test_process_timeout(agent_pool, tmp_path):
+    """Test an agent is killed on timeout."""
+    agent_pool.CMD = [sys.executable, '-c', 'import time; time.sleep(60)']
+    agent_pool.timeout = 0.5
+    ctxs = run_cmds(agent_pool, ['cylc', 'jobs-poll', '--', str(tmp_path)])
+    assert ctxs[0].ret_code
+    assert 'killed on timeout' in ctxs[0].err
+    assert not agent_pool.agents
+
+
+def test_put_command_closed(agent_pool):
+    """Test commands are not run after close."""
+    agent_pool.close()
+    ctxs = run_cmds(agent_pool, ['cylc', 'jobs-poll', '--', 'x'])
+    assert ctxs[0].ret_code == 999
+    assert not agent_pool.agents
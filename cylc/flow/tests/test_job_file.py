@@ -14,8 +14,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import os
 import unittest
-from tempfile import TemporaryFile
+from subprocess import Popen
+from tempfile import TemporaryDirectory, TemporaryFile
 from unittest import mock
 
 from cylc.flow.job_file import JobFileWriter
@@ -30,6 +32,39 @@ TILDE_IN_OUT = [('~foo/bar bar', '~foo/"bar bar"'),
                 ('~a', '~a')]
 
 
+def get_job_conf(task_id, try_num):
+    """Return a job_conf for a job of task_id."""
+    name, point = task_id.split('.')
+    return {
+        'batch_system_name': 'background',
+        'batch_submit_command_template': None,
+        'dependencies': ['prep.%s' % point],
+        'directives': {},
+        'env-script': '',
+        'environment': {'FOO': '$CYLC_TASK_CYCLE_POINT'},
+        'err-script': '',
+        'execution_time_limit': None,
+        'exit-script': '',
+        'host': 'localhost',
+        'init-script': 'echo init',
+        'job_d': '%s/%s/01' % (point, name),
+        'namespace_hierarchy': ['root', name],
+        'owner': None,
+        'param_env_tmpl': {},
+        'param_var': {},
+        'post-script': '',
+        'pre-script': '',
+        'remote_suite_d': None,
+        'script': 'echo "$FOO"',
+        'submit_num': 1,
+        'suite_name': 'suite',
+        'task_id': task_id,
+        'try_num': try_num,
+        'uuid_str': 'uuid',
+        'work_d': None,
+    }
+
+
 class TestJobFile(unittest.TestCase):
     def test_get_variable_value_definition(self):
         """Test the value for single/tilde variables are correctly quoted"""
@@ -52,6 +87,77 @@ class TestJobFile(unittest.TestCase):
                 JobFileWriter()._write_prelude(handle, job_conf)
         self.assertIn("bad cylc executable", str(ex.exception))
 
+    def test_check_syntax(self):
+        """Test job files are checked in a batch, with user sections cached.
+        """
+        header = (False, '#!/bin/bash -l\nCYLC_FAIL_SIGNALS="EXIT"')
+        script = (True, '\n\ncylc__job__inst__script() {\nsleep 1\n}')
+        bad_script = (True, '\n\ncylc__job__inst__script() {\nfi\n}')
+        bad_env = (False, '\nexport CYLC_TASK_NAME="foo')
+        with TemporaryDirectory() as tmp_d:
+            tmp_items = []
+            for i, sections in enumerate([
+                    [header, script],
+                    [header, script],
+                    [header, bad_script],
+                    [header, script, bad_env]]):
+                tmp_name = os.path.join(tmp_d, 'job%d.tmp' % i)
+                with open(tmp_name, 'w') as handle:
+                    handle.write(''.join(text for _, text in sections))
+                tmp_items.append((tmp_name, sections))
+            writer = JobFileWriter()
+            with mock.patch(
+                    'cylc.flow.job_file.Popen', wraps=Popen) as mock_popen:
+                results = writer._check_syntax(tmp_items[:2])
+            self.assertEqual([None, None], results)
+            # One check for the script, one for the batch
+            self.assertEqual(2, mock_popen.call_count)
+            self.assertEqual(1, len(writer.syntax_ok_cache))
+
+            with mock.patch(
+                    'cylc.flow.job_file.Popen', wraps=Popen) as mock_popen:
+                results = writer._check_syntax(tmp_items)
+            self.assertEqual([None, None], results[:2])
+            for result, tmp_item in zip(results[2:], tmp_items[2:]):
+                self.assertIsInstance(result, RuntimeError)
+                self.assertIn(tmp_item[0], str(result))
+            # bad_script, bad_script job file, batch, each job file in batch
+            self.assertEqual(6, mock_popen.call_count)
+
+    @mock.patch.dict(os.environ, {'CYLC_SUITE_DEF_PATH': '/suite'})
+    @mock.patch('cylc.flow.job_file.get_remote_suite_work_dir')
+    @mock.patch('cylc.flow.job_file.get_remote_suite_run_dir')
+    @mock.patch('cylc.flow.job_file.glbl_cfg')
+    def test_write_tmp_template(
+            self, mocked_glbl_cfg, mocked_run_dir, mocked_work_dir):
+        """Test job files from a template match those written in full."""
+        mocked_glbl_cfg.return_value.get_host_item.side_effect = (
+            lambda key, *_: {
+                'copyable environment variables': [],
+                'task message relay window': None}.get(key, 'cylc'))
+        mocked_run_dir.return_value = '/run'
+        mocked_work_dir.return_value = '/run/work'
+        writer = JobFileWriter()
+        with TemporaryDirectory() as tmp_d:
+            for i, task_id in enumerate(['foo.1', 'foo.2', 'foo.3']):
+                job_conf = get_job_conf(task_id, i + 1)
+                path = os.path.join(tmp_d, task_id)
+                texts = []
+                for template_key in (None, 'foo'):
+                    tmp_name, sections = writer._write_tmp(
+                        path, job_conf, template_key)
+                    with open(tmp_name) as handle:
+                        texts.append((handle.read(), sections))
+                self.assertEqual(texts[0], texts[1])
+                self.assertIn(
+                    'export CYLC_TASK_DEPENDENCIES="prep.%d"' % (i + 1),
+                    texts[1][0])
+                self.assertIn(
+                    'export CYLC_TASK_TRY_NUMBER=%d' % (i + 1), texts[1][0])
+        self.assertEqual(['foo'], list(writer.templates))
+        writer.set_suite_env({})
+        self.assertEqual({}, writer.templates)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from queue import Empty, Queue
+
+import pytest
+
+from cylc.flow.job_status_watcher import JobStatusWatcher
+
+
+@pytest.fixture(params=[True, False], ids=['inotify', 'stat'])
+def watcher(request, monkeypatch):
+    if not request.param:
+        def no_inotify():
+            raise OSError('no inotify')
+        monkeypatch.setattr(
+            'cylc.flow.job_status_watcher._Inotify', no_inotify)
+    watcher = JobStatusWatcher(Queue())
+    watcher.POLL_INTERVAL = 0.1
+    yield watcher
+    watcher.stop()
+
+
+def get_items(watcher, num, timeout=10.0):
+    """Return up to num items from the message queue of watcher."""
+    items = []
+    try:
+        while len(items) < num:
+            items.append(watcher.message_queue.get(timeout=timeout))
+    except Empty:
+        pass
+    return items
+
+
+def append(path, text):
+    with open(path, 'a') as handle:
+        handle.write(text)
+
+
+def test_watch(watcher, tmp_path):
+    """Test messages are queued from appended job status file lines."""
+    path = tmp_path / 'job.status'
+    append(path, 'CYLC_BATCH_SYS_NAME=background\nCYLC_JOB_PID=1\n')
+    append(path, 'CYLC_JOB_INIT_TIME=t1\n')
+    watcher.watch('1/foo/01', str(path))
+    assert get_items(watcher, 1) == [('1/foo/01', 't1', 'INFO', 'started')]
+    append(path, 'CYLC_MESSAGE=t2|WARNING|hello|world\nCYLC_JOB_EXIT=ERR')
+    assert get_items(watcher, 1) == [
+        ('1/foo/01', 't2', 'WARNING', 'hello|world')]
+    append(path, '\nCYLC_JOB_EXIT_TIME=t3\n')
+    assert get_items(watcher, 1) == [
+        ('1/foo/01', 't3', 'CRITICAL', 'failed/ERR')]
+    assert not watcher._files
+    append(path, 'CYLC_MESSAGE=t4|INFO|ignored\n')
+    assert get_items(watcher, 1, timeout=0.5) == []
+
+
+def test_watch_new_job(watcher, tmp_path):
+    """Test the job file of a new job of a task replaces the old one."""
+    path1 = tmp_path / '01.status'
+    path2 = tmp_path / '02.status'
+    path1.touch()
+    path2.touch()
+    watcher.watch('1/foo/01', str(path1))
+    watcher.watch('1/foo/02', str(path2))
+    append(path1, 'CYLC_JOB_INIT_TIME=t1\n')
+    append(path2, 'CYLC_JOB_EXIT=SUCCEEDED\nCYLC_JOB_EXIT_TIME=t2\n')
+    assert get_items(watcher, 1) == [
+        ('1/foo/02', 't2', 'INFO', 'succeeded')]
+    assert get_items(watcher, 1, timeout=0.5) == []
+
+
+def test_is_new_message(watcher, tmp_path):
+    """Test messages of watched jobs are only new once."""
+    path = tmp_path / 'job.status'
+    path.touch()
+    watcher.watch('1/foo/01', str(path))
+    assert watcher.is_new_message('1/foo/01', 't1', 'started')
+    assert not watcher.is_new_message('1/foo/01', 't1', 'started')
+    assert watcher.is_new_message('1/foo/01', 't2', 'started')
+    assert watcher.is_new_message('1/bar/01', 't1', 'started')
+    assert watcher.is_new_message('1/bar/01', 't1', 'started')
@@ -0,0 +1,104 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import pytest
+
+from cylc.flow.cycling.loader import INTEGER_CYCLING_TYPE, get_point
+from cylc.flow.exceptions import TriggerExpressionError
+from cylc.flow.prerequisite import Prerequisite, TriggerExpression
+from cylc.flow.task_trigger import Dependency, TaskTrigger
+
+
+def int_point(value):
+    return get_point(value, cycling_type=INTEGER_CYCLING_TYPE)
+
+
+def make_prereq(expr, messages):
+    prereq = Prerequisite(int_point('2001'))
+    for name, point, pre_initial in messages:
+        prereq.add(name, point, 'succeeded', pre_initial)
+    prereq.set_condition(expr)
+    return prereq
+
+
+def test_conditional():
+    """Test a conditional expression compiled from a string."""
+    prereq = make_prereq(
+        'a.2001 succeeded | b.2001 succeeded & c.2001 succeeded',
+        [('a', '2001', False), ('b', '2001', False), ('c', '2001', False)])
+    assert not prereq.is_satisfied()
+    prereq.satisfy_me({('b', '2001', 'succeeded')})
+    assert not prereq.is_satisfied()
+    prereq.satisfy_me({('c', '2001', 'succeeded')})
+    assert prereq.is_satisfied()
+    prereq.set_not_satisfied()
+    assert not prereq.is_satisfied()
+    prereq.satisfy_me({('a', '2001', 'succeeded')})
+    assert prereq.is_satisfied()
+    prereq.set_not_satisfied()
+    prereq.set_satisfied()
+    assert prereq.is_satisfied()
+    assert prereq.get_raw_conditional_expression() == (
+        'a.2001 succeeded | b.2001 succeeded & c.2001 succeeded')
+
+
+def test_conditional_pre_initial():
+    """Test dropping pre-initial messages from a conditional expression."""
+    prereq = make_prereq(
+        '(a.2000 succeeded & b.2000 succeeded) | c.2001 succeeded',
+        [('a', '2000', True), ('b', '2000', True), ('c', '2001', False)])
+    assert list(prereq.satisfied) == [('c', '2001', 'succeeded')]
+    assert not prereq.is_satisfied()
+    prereq.satisfy_me({('c', '2001', 'succeeded')})
+    assert prereq.is_satisfied()
+
+
+def test_conditional_bad_expression():
+    """Test that unknown terms are reported on evaluation."""
+    prereq = make_prereq(
+        '@wall_clock | a.2001 succeeded', [('a', '2001', False)])
+    with pytest.raises(TriggerExpressionError) as excinfo:
+        prereq.is_satisfied()
+    assert '@wall_clock' in str(excinfo.value)
+
+
+def test_dependency_shares_expression():
+    """Test that prerequisites of a dependency share its expression."""
+    foo = TaskTrigger('foo', None, None, 'succeeded')
+    bar = TaskTrigger('bar', None, None, 'failed')
+    dependency = Dependency([foo, '|', bar], {foo, bar}, False)
+
+    class _TaskDef(object):
+        start_point = None
+        max_future_prereq_offset = None
+
+    prereqs = [
+        dependency.get_prerequisite(int_point(point), _TaskDef)
+        for point in ('2001', '2002')]
+    assert (
+        prereqs[0]._trigger_expression is prereqs[1]._trigger_expression)
+    assert prereqs[0]._trigger_expression is not None
+    prereqs[1].satisfy_me({('bar', '2002', 'failed')})
+    assert not prereqs[0].is_satisfied()
+    assert prereqs[1].is_satisfied()
+
+
+def test_trigger_expression_nested():
+    """Test nested expressions and precedence."""
+    expr = TriggerExpression([[0, '|', 1], '&', 2])
+    assert not expr.evaluate(0b001, 0b111)
+    assert expr.evaluate(0b101, 0b111)
+    assert expr.evaluate(0b110, 0b111)
@@ -22,6 +22,8 @@ import unittest
 from tempfile import mktemp
 from unittest import mock
 
+import pytest
+
 from cylc.flow.rundb import CylcSuiteDAO
 from cylc.flow.tests.util import set_up_globalrc
 
@@ -267,5 +269,136 @@ def test_upgrade_to_platforms(set_up_globalrc):
         assert not dao.upgrade_to_platforms()
 
 
+def test_persistent_connection(tmp_path):
+    """Test a persistent connection is kept open, using WAL journalling."""
+    db_file_name = str(tmp_path / 'db')
+    dao = CylcSuiteDAO(db_file_name, is_persistent=True)
+    conn = dao.connect()
+    assert [row for row in conn.execute('PRAGMA journal_mode')] == [('wal',)]
+    dao.add_insert_item(CylcSuiteDAO.TABLE_SUITE_PARAMS, ['foo', 'bar'])
+    dao.execute_queued_items()
+    assert dao.conn is conn
+    dao.flush_wal()
+    assert not os.path.getsize(db_file_name + '-wal')
+    dao.close()
+
+    # Non-persistent connections are closed after each write.
+    dao = CylcSuiteDAO(db_file_name)
+    dao.add_insert_item(CylcSuiteDAO.TABLE_SUITE_PARAMS, ['baz', 'qux'])
+    dao.execute_queued_items()
+    assert dao.conn is None
+
+
+def test_persistent_connection_db_file_removed(tmp_path):
+    """Test a persistent connection detects removal of the database."""
+    run_dir = tmp_path / 'run'
+    run_dir.mkdir()
+    db_file_name = str(run_dir / 'db')
+    dao = CylcSuiteDAO(db_file_name, is_persistent=True)
+    conn = dao.connect()
+    for path in run_dir.iterdir():
+        path.unlink()
+    run_dir.rmdir()
+    dao.add_insert_item(CylcSuiteDAO.TABLE_SUITE_PARAMS, ['foo', 'bar'])
+    with pytest.raises(sqlite3.OperationalError):
+        dao.execute_queued_items()
+    assert dao.conn is not conn
+
+
+def test_create_indexes(tmp_path):
+    """Test secondary indexes are created, and migrated by version."""
+    db_file_name = str(tmp_path / 'db')
+    dao = CylcSuiteDAO(db_file_name)
+    conn = dao.connect()
+
+    def get_index_names():
+        return set(name for name, in conn.execute(
+            'SELECT name FROM sqlite_master'
+            ' WHERE type=="index" AND sql IS NOT NULL'))
+
+    assert get_index_names() == set(CylcSuiteDAO.INDEXES)
+    assert not dao.create_indexes()
+    plan = ' '.join(row[-1] for row in conn.execute(
+        'EXPLAIN QUERY PLAN SELECT name FROM task_states WHERE cycle==?',
+        ['1']))
+    assert 'task_states_cycle_status_idx' in plan
+    # An index of an older version is dropped, a missing one is created.
+    conn.execute('DROP INDEX task_outputs_name_idx')
+    conn.execute('CREATE INDEX old_idx ON task_states(time_updated)')
+    conn.execute('PRAGMA user_version=0')
+    conn.commit()
+    assert dao.create_indexes()
+    assert get_index_names() == set(CylcSuiteDAO.INDEXES)
+    assert [row for row in conn.execute('PRAGMA user_version')] == [
+        (CylcSuiteDAO.INDEXES_VERSION,)]
+    dao.close()
+
+
+def test_take_checkpoints_deltas(tmp_path, monkeypatch):
+    """Test checkpoints store task pool changes, and are reconstructed."""
+    monkeypatch.setattr(CylcSuiteDAO, 'CHECKPOINT_MAX_DELTAS', 2)
+    dao = CylcSuiteDAO(str(tmp_path / 'db'), is_persistent=True)
+    pub_dao = CylcSuiteDAO(str(tmp_path / 'pub-db'))
+    conn = dao.connect()
+    pools = [
+        [('1', 'foo', 0, 'running', 0), ('1', 'bar', 0, 'waiting', 0)],
+        [('1', 'foo', 1, 'succeeded', 0), ('1', 'bar', 0, 'waiting', 0),
+         ('2', 'foo', 0, 'waiting', 0)],
+        [('2', 'foo', 0, 'waiting', 1)],
+        [('2', 'foo', 0, 'waiting', 1), ('2', 'bar', 0, 'waiting', 0)],
+    ]
+    for pool in pools:
+        conn.execute('DELETE FROM task_pool')
+        conn.executemany('INSERT INTO task_pool VALUES (?,?,?,?,?)', pool)
+        conn.commit()
+        dao.take_checkpoints('test', other_daos=[pub_dao])
+        dao.execute_queued_items()
+        pub_dao.execute_queued_items()
+    for a_dao in [dao, pub_dao]:
+        # Checkpoint 4 is full again, after 2 deltas.
+        assert a_dao.select_checkpoint_parents() == {2: 1, 3: 2}
+        assert list(a_dao.connect().execute(
+            'SELECT cycle,name,status FROM task_pool_checkpoints'
+            ' WHERE id==3 ORDER BY cycle,name')) == [
+                ('1', 'bar', None),
+                ('1', 'foo', None),
+                ('2', 'foo', 'waiting')]
+        for id_, pool in enumerate(pools, 1):
+            rows = []
+            a_dao.select_task_pool(
+                lambda row_idx, row: rows.append(tuple(row)), id_)
+            assert sorted(rows) == sorted(pool)
+    # Restart from a delta checkpoint.
+    conn.executemany(
+        'INSERT INTO task_states (name,cycle,submit_num,status)'
+        ' VALUES (?,?,?,?)',
+        [('foo', '1', 1, 'succeeded'), ('bar', '1', 0, 'waiting'),
+         ('foo', '2', 0, 'waiting')])
+    conn.commit()
+    rows = []
+    dao.select_task_pool_for_restart(
+        lambda row_idx, row: rows.append(tuple(row[0:6])), 2)
+    assert sorted(rows) == [
+        ('1', 'bar', 0, None, 'waiting', 0),
+        ('1', 'foo', 1, None, 'succeeded', 0),
+        ('2', 'foo', 0, None, 'waiting', 0)]
+    # A new DAO continues from the last checkpoint in the database.
+    new_dao = CylcSuiteDAO(str(tmp_path / 'db'))
+    new_dao.take_checkpoints('restart')
+    new_dao.execute_queued_items()
+    assert new_dao.select_checkpoint_parents() == {2: 1, 3: 2, 5: 4}
+    assert not list(conn.execute(
+        'SELECT * FROM task_pool_checkpoints WHERE id==5'))
+    # A missing parent starts a full checkpoint.
+    new_dao.last_checkpoint = (99, 0, {})
+    new_dao.take_checkpoints('test')
+    new_dao.execute_queued_items()
+    assert new_dao.select_checkpoint_parents() == {2: 1, 3: 2, 5: 4}
+    assert len(list(conn.execute(
+        'SELECT * FROM task_pool_checkpoints WHERE id==6'))) == 2
+    for a_dao in [dao, pub_dao, new_dao]:
+        a_dao.close()
+
+
 if __name__ == '__main__':
     unittest.main()
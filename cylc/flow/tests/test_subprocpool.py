@@ -16,7 +16,9 @@
 
 from tempfile import NamedTemporaryFile, SpooledTemporaryFile, TemporaryFile,\
     TemporaryDirectory
+from time import sleep, time
 import unittest
+from unittest.mock import patch
 
 from pathlib import Path
 
@@ -137,6 +139,53 @@ class TestSubProcPool(unittest.TestCase):
         for handle in handles:
             handle.close()
 
+    def run_pool(self, pool, *cmds):
+        """Run commands in pool until done, return their contexts."""
+        ctxs = []
+        for cmd in cmds:
+            pool.put_command(
+                SubProcContext('cmd', cmd), lambda ctx: ctxs.append(ctx))
+        timeout = time() + 10
+        while pool.is_not_done() and time() < timeout:
+            pool.process()
+            sleep(0.01)
+        self.assertFalse(pool.is_not_done())
+        return ctxs
+
+    def test_process(self):
+        """Test commands run in the pool, with large outputs."""
+        pool = SubProcPool()
+        ctxs = self.run_pool(
+            pool,
+            ['bash', '-c', 'head -c 200000 /dev/zero | tr "\\0" x'],
+            ['bash', '-c', 'echo pirate errrr >&2; exit 3'])
+        results = {len(ctx.out or ''): ctx for ctx in ctxs}
+        self.assertEqual(0, results[200000].ret_code)
+        self.assertEqual('pirate errrr\n', results[0].err)
+        self.assertEqual(3, results[0].ret_code)
+        self.assertFalse(pool.selector.get_map())
+        self.assertFalse(pool.pidfds)
+
+    def test_process_polled(self):
+        """Test commands run in the pool, without process file descriptors."""
+        pool = SubProcPool()
+        with patch('cylc.flow.subprocpool.os.pidfd_open', side_effect=OSError,
+                   create=True):
+            ctxs = self.run_pool(pool, ['echo', 'pirate'], ['false'])
+        self.assertEqual(
+            [(0, 'pirate\n'), (1, None)],
+            sorted(((ctx.ret_code, ctx.out) for ctx in ctxs),
+                   key=lambda item: item[0]))
+        self.assertFalse(pool.polled_procs)
+
+    def test_process_timeout(self):
+        """Test commands are killed on timeout."""
+        pool = SubProcPool()
+        pool.proc_pool_timeout = 0.1
+        ctx, = self.run_pool(pool, ['sleep', '10'])
+        self.assertEqual(-9, ctx.ret_code)
+        self.assertIn('killed on timeout', ctx.err)
+
     def test_xfunction(self):
         """Test xtrigger function import."""
         with TemporaryDirectory() as temp_dir:
@@ -0,0 +1,330 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from cylc.flow.cycling.loader import INTEGER_CYCLING_TYPE, get_point
+from cylc.flow.rundb import CylcSuiteDAO
+from cylc.flow.suite_db_mgr import PublicDatabaseWriter, SuiteDatabaseManager
+
+
+def int_point(value):
+    return get_point(value, cycling_type=INTEGER_CYCLING_TYPE)
+
+
+def make_itask(name, point, status='waiting'):
+    """Return a minimal task proxy for putting to the task pool tables."""
+    return SimpleNamespace(
+        tdef=SimpleNamespace(name=name),
+        point=point,
+        has_spawned=False,
+        state=SimpleNamespace(
+            status=status, is_held=False, time_updated=None),
+        timeout=None,
+        poll_timer=None,
+        try_timers={},
+        submit_num=0,
+        get_try_num=lambda: 1)
+
+
+@pytest.fixture(params=[False, True], ids=['reconnect', 'persistent'])
+def suite_db_mgr(request, tmp_path):
+    pri_d = tmp_path / 'pri'
+    pub_d = tmp_path / 'pub'
+    pri_d.mkdir()
+    pub_d.mkdir()
+    mgr = SuiteDatabaseManager(
+        pri_d=str(pri_d), pub_d=str(pub_d), is_persistent=request.param)
+    mgr.on_suite_start(is_restart=False)
+    yield mgr
+    mgr.on_suite_shutdown()
+
+
+def select_task_pool(dao):
+    rows = []
+    dao.select_task_pool(lambda row_idx, row: rows.append(tuple(row)))
+    dao.close()
+    return sorted(rows)
+
+
+def test_put_task_pool_changes_only(suite_db_mgr):
+    """Test that only changed task pool rows are written."""
+    itasks = [make_itask('foo', '1'), make_itask('bar', '1')]
+    pool = SimpleNamespace(get_all_tasks=lambda: itasks)
+    table = suite_db_mgr.TABLE_TASK_POOL
+
+    suite_db_mgr.put_task_pool(pool)
+    assert suite_db_mgr.db_deletes_map[table] == [{}]
+    assert len(suite_db_mgr.db_inserts_map[table]) == 2
+    suite_db_mgr.process_queued_ops()
+
+    # No change, nothing to write.
+    suite_db_mgr.put_task_pool(pool)
+    assert suite_db_mgr.db_deletes_map[table] == []
+    assert suite_db_mgr.db_inserts_map[table] == []
+
+    # One task changed, one removed, one added.
+    itasks[0].state.status = 'succeeded'
+    del itasks[1]
+    itasks.append(make_itask('baz', '1'))
+    suite_db_mgr.put_task_pool(pool)
+    assert suite_db_mgr.db_deletes_map[table] == [
+        {'cycle': '1', 'name': 'bar'}]
+    assert len(suite_db_mgr.db_inserts_map[table]) == 2
+    suite_db_mgr.process_queued_ops()
+    assert select_task_pool(suite_db_mgr.pri_dao) == [
+        ('1', 'baz', 0, 'waiting', 0),
+        ('1', 'foo', 0, 'succeeded', 0)]
+
+
+def test_put_task_event_timers(suite_db_mgr):
+    """Test that removed event timers are deleted."""
+    timer = SimpleNamespace(ctx=None, delays=[], num=0, delay=None,
+                            timeout=None)
+    task_events_mgr = SimpleNamespace(
+        event_timers={('key', '1', 'foo', 1): timer})
+    table = suite_db_mgr.TABLE_TASK_ACTION_TIMERS
+    suite_db_mgr.put_task_event_timers(task_events_mgr)
+    assert len(suite_db_mgr.db_inserts_map[table]) == 1
+    suite_db_mgr.process_queued_ops()
+    task_events_mgr.event_timers.clear()
+    suite_db_mgr.put_task_event_timers(task_events_mgr)
+    assert suite_db_mgr.db_deletes_map[table] == [
+        {'cycle': '1', 'name': 'foo', 'ctx_key': '["key", 1]'}]
+
+
+def test_pub_writer(suite_db_mgr):
+    """Test that the public database is written by the writer thread."""
+    itasks = [make_itask('foo', '1')]
+    pool = SimpleNamespace(get_all_tasks=lambda: itasks)
+    suite_db_mgr.put_task_pool(pool)
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+    pub_dao = CylcSuiteDAO(suite_db_mgr.pub_path, is_public=True)
+    assert select_task_pool(pub_dao) == [('1', 'foo', 0, 'waiting', 0)]
+    # The public database does not use WAL journalling.
+    assert [
+        row for row in pub_dao.connect().execute('PRAGMA journal_mode')
+    ] == [('delete',)]
+    pub_dao.close()
+    metrics = suite_db_mgr.pub_writer.get_metrics()
+    assert metrics['batches_written'] == metrics['batches_queued'] == 1
+    assert metrics['batches_dropped'] == 0
+    assert metrics['queue_depth'] == 0
+
+
+def test_pub_writer_overflow(tmp_path):
+    """Test that batches are dropped when the queue is full."""
+    writer = PublicDatabaseWriter(
+        CylcSuiteDAO(str(tmp_path / 'db'), is_public=True), max_queue_size=1)
+    writer.put([('stmt', [])])
+    assert not writer.needs_recovery
+    writer.put([('stmt', [])])
+    assert writer.needs_recovery
+    writer.put([('stmt', [])])
+    assert writer.get_metrics()['batches_dropped'] == 2
+    assert not writer.flush(0)
+    callback_args = []
+    assert writer.recover(lambda: callback_args.append(None))
+    assert callback_args == [None]
+    assert not writer.needs_recovery
+    assert writer.flush(0)
+    assert writer.queue.empty()
+
+
+def test_recover_pub_from_pri(suite_db_mgr):
+    """Test that the public database is recovered after dropped batches."""
+    itasks = [make_itask('foo', '1')]
+    pool = SimpleNamespace(get_all_tasks=lambda: itasks)
+    suite_db_mgr.pub_writer.needs_recovery = True
+    suite_db_mgr.put_task_pool(pool)
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.get_metrics()['batches_dropped'] == 1
+    suite_db_mgr.recover_pub_from_pri()
+    assert not suite_db_mgr.pub_writer.needs_recovery
+    pub_dao = CylcSuiteDAO(suite_db_mgr.pub_path, is_public=True)
+    assert select_task_pool(pub_dao) == [('1', 'foo', 0, 'waiting', 0)]
+
+
+def test_archive(suite_db_mgr, monkeypatch):
+    """Test history before the cutoff is moved to per-period archives."""
+    monkeypatch.setattr(
+        'cylc.flow.cycling.loader.DefaultCycler.TYPE', INTEGER_CYCLING_TYPE)
+    monkeypatch.setattr(SuiteDatabaseManager, 'ARCHIVE_INTEGER_PERIOD', 10)
+    monkeypatch.setattr(CylcSuiteDAO, 'CHECKPOINT_MAX_DELTAS', 0)
+    for cycle in ['1', '9', '10', '15', '20']:
+        itask = make_itask('foo', cycle)
+        suite_db_mgr.put_insert_task_states(itask, {'status': 'succeeded'})
+        suite_db_mgr.put_insert_task_jobs(itask, {'run_status': 0})
+    suite_db_mgr.db_inserts_map[suite_db_mgr.TABLE_BROADCAST_EVENTS].append(
+        {'point': '*', 'namespace': 'root', 'key': 'x', 'value': '1'})
+    # Checkpoints of pools of cycle points 1 and 1, 20.
+    for cycles in [['1'], ['1', '20']]:
+        itasks = [make_itask('foo', cycle) for cycle in cycles]
+        suite_db_mgr.put_task_pool(
+            SimpleNamespace(get_all_tasks=lambda: itasks))
+        suite_db_mgr.process_queued_ops()
+        suite_db_mgr.checkpoint('test')
+    suite_db_mgr.archive(int_point('15'))
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+
+    stmt = 'SELECT cycle FROM task_states ORDER BY cycle'
+    archive_d = os.path.join(
+        os.path.dirname(suite_db_mgr.pub_path),
+        CylcSuiteDAO.ARCHIVE_DIR_BASE_NAME)
+    assert CylcSuiteDAO.get_archive_paths(suite_db_mgr.pub_path) == [
+        os.path.join(archive_d, '0'), os.path.join(archive_d, '10')]
+    for path in [suite_db_mgr.pri_path, suite_db_mgr.pub_path]:
+        dao = CylcSuiteDAO(path, is_public=True)
+        assert list(dao.connect().execute(stmt)) == [('15',), ('20',)]
+        assert list(dao.connect().execute(
+            'SELECT point FROM broadcast_events')) == [('*',)]
+        assert list(dao.connect().execute(
+            'SELECT id FROM checkpoint_id ORDER BY id')) == [(0,), (2,)]
+        dao.close()
+    archive_dao = CylcSuiteDAO(os.path.join(archive_d, '0'), is_public=True)
+    assert list(archive_dao.connect().execute(stmt)) == [('1',), ('9',)]
+    assert list(archive_dao.connect().execute(
+        'SELECT id FROM task_pool_checkpoints')) == [(1,)]
+    archive_dao.close()
+    # Readers of the public database read the archives too.
+    pub_dao = CylcSuiteDAO(suite_db_mgr.pub_path, is_public=True)
+    assert sorted(row[1] for row in pub_dao.select_task_times()[1]) == [
+        '1', '10', '15', '20', '9']
+    pub_dao.close()
+
+    # No new cutoff, nothing to do.
+    suite_db_mgr.put_insert_task_states(
+        make_itask('bar', '1'), {'status': 'waiting'})
+    suite_db_mgr.archive(int_point('15'))
+    suite_db_mgr.process_queued_ops()
+    assert ('1',) in suite_db_mgr.pri_dao.connect().execute(stmt)
+
+
+def test_archive_chunks(suite_db_mgr, monkeypatch):
+    """Test archival is done in chunks, over calls to process_queued_ops."""
+    monkeypatch.setattr(
+        'cylc.flow.cycling.loader.DefaultCycler.TYPE', INTEGER_CYCLING_TYPE)
+    monkeypatch.setattr(SuiteDatabaseManager, 'ARCHIVE_INTEGER_PERIOD', 10)
+    monkeypatch.setattr(SuiteDatabaseManager, 'ARCHIVE_CHUNK_SIZE', 2)
+    for cycle in ['1', '2', '3', '11', '12', '20']:
+        suite_db_mgr.put_insert_task_states(
+            make_itask('foo', cycle), {'status': 'succeeded'})
+    suite_db_mgr.process_queued_ops()
+    stmt = 'SELECT cycle FROM task_states ORDER BY cycle'
+
+    def select_cycles():
+        return [
+            cycle for cycle, in suite_db_mgr.pri_dao.connect().execute(stmt)]
+
+    suite_db_mgr.archive(int_point('15'))
+    suite_db_mgr.process_queued_ops()
+    assert select_cycles() == ['11', '12', '20', '3']
+    suite_db_mgr.process_queued_ops()
+    assert select_cycles() == ['12', '20']
+    # A new cutoff, the rest is planned again.
+    suite_db_mgr.archive(int_point('25'))
+    suite_db_mgr.process_queued_ops()
+    assert select_cycles() == []
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+    pub_dao = CylcSuiteDAO(suite_db_mgr.pub_path, is_public=True)
+    assert list(pub_dao.connect().execute(stmt)) == []
+    pub_dao.close()
+    archived = []
+    for path in CylcSuiteDAO.get_archive_paths(suite_db_mgr.pub_path):
+        archive_dao = CylcSuiteDAO(path, is_public=True)
+        archived.extend(
+            cycle for cycle, in archive_dao.connect().execute(stmt))
+        archive_dao.close()
+    assert archived == ['1', '2', '3', '11', '12', '20']
+
+
+def test_archive_checkpoint_deltas(suite_db_mgr, monkeypatch):
+    """Test checkpoints are only archived with their delta checkpoints."""
+    monkeypatch.setattr(
+        'cylc.flow.cycling.loader.DefaultCycler.TYPE', INTEGER_CYCLING_TYPE)
+    monkeypatch.setattr(CylcSuiteDAO, 'CHECKPOINT_MAX_DELTAS', 2)
+    # Checkpoints of pools of cycle points 1; 1, 20 (delta); 20 (delta);
+    # 20 (full, the chain of deltas is at its maximum length).
+    for cycles in [['1'], ['1', '20'], ['20'], ['20']]:
+        itasks = [make_itask('foo', cycle) for cycle in cycles]
+        suite_db_mgr.put_task_pool(
+            SimpleNamespace(get_all_tasks=lambda: itasks))
+        suite_db_mgr.process_queued_ops()
+        suite_db_mgr.checkpoint('test')
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pri_dao.select_checkpoint_parents() == {2: 1, 3: 2}
+    # Checkpoint 1 is before the cutoff, but checkpoints 2 and 3 need it.
+    suite_db_mgr.archive(int_point('15'))
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+    stmt = 'SELECT id FROM checkpoint_id ORDER BY id'
+    for path in [suite_db_mgr.pri_path, suite_db_mgr.pub_path]:
+        dao = CylcSuiteDAO(path, is_public=True)
+        assert list(dao.connect().execute(stmt)) == [
+            (0,), (1,), (2,), (3,), (4,)]
+        rows = []
+        dao.select_task_pool(lambda row_idx, row: rows.append(row[0]), 3)
+        assert rows == ['20']
+        dao.close()
+    # The whole chain is archived together, the last checkpoint is kept.
+    suite_db_mgr.archive(int_point('25'))
+    suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+    for path in [suite_db_mgr.pri_path, suite_db_mgr.pub_path]:
+        dao = CylcSuiteDAO(path, is_public=True)
+        assert list(dao.connect().execute(stmt)) == [(0,), (4,)]
+        assert dao.select_checkpoint_parents() == {}
+        dao.close()
+
+
+def test_archive_all_checkpoints(suite_db_mgr, monkeypatch):
+    """Test checkpoints after an archival of all checkpoints.
+
+    The last checkpoint is kept, so new checkpoints get new IDs.
+    """
+    monkeypatch.setattr(
+        'cylc.flow.cycling.loader.DefaultCycler.TYPE', INTEGER_CYCLING_TYPE)
+    monkeypatch.setattr(CylcSuiteDAO, 'CHECKPOINT_MAX_DELTAS', 0)
+    itasks = [make_itask('foo', '1')]
+    suite_db_mgr.put_task_pool(SimpleNamespace(get_all_tasks=lambda: itasks))
+    suite_db_mgr.process_queued_ops()
+    for cutoff, event in [('50', 'old'), ('51', 'old'), ('52', 'new')]:
+        suite_db_mgr.checkpoint(event)
+        suite_db_mgr.process_queued_ops()
+        suite_db_mgr.archive(int_point(cutoff))
+        suite_db_mgr.process_queued_ops()
+    assert suite_db_mgr.pub_writer.flush(10)
+    stmt = 'SELECT id, event FROM checkpoint_id ORDER BY id'
+    for path in [suite_db_mgr.pri_path, suite_db_mgr.pub_path]:
+        dao = CylcSuiteDAO(path, is_public=True)
+        assert list(dao.connect().execute(stmt)) == [
+            (0, 'latest'), (3, 'new')]
+        dao.close()
+    archive_dao = CylcSuiteDAO(
+        CylcSuiteDAO.get_archive_paths(suite_db_mgr.pub_path)[0],
+        is_public=True)
+    assert list(archive_dao.connect().execute(stmt)) == [
+        (1, 'old'), (2, 'old')]
+    assert list(archive_dao.connect().execute(
+        'SELECT id, cycle, name FROM task_pool_checkpoints ORDER BY id')) == [
+        (1, '1', 'foo'), (2, '1', 'foo')]
+    archive_dao.close()
@@ -0,0 +1,196 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import json
+import os
+from time import sleep, time
+from unittest.mock import patch
+
+import pytest
+
+from cylc.flow.dbstatecheck import CylcSuiteDBChecker
+from cylc.flow.rundb import CylcSuiteDAO
+from cylc.flow.subprocctx import SubFuncContext
+from cylc.flow.subprocpool import SubProcPool
+from cylc.flow.suite_state_service import SuiteStateService
+
+
+@pytest.fixture
+def service():
+    service = SuiteStateService()
+    yield service
+    service.terminate()
+
+
+@pytest.fixture
+def other(tmp_path):
+    """Return the run directory and DAO of the public DB of suite "other"."""
+    log_d = tmp_path / 'other' / 'log'
+    log_d.mkdir(parents=True)
+    dao = CylcSuiteDAO(str(log_d / CylcSuiteDAO.DB_FILE_BASE_NAME))
+    dao.add_insert_item(
+        CylcSuiteDAO.TABLE_SUITE_PARAMS,
+        {'key': 'cycle_point_format', 'value': 'CCYYMMDDThhZ'})
+    for name, cycle, status, outputs in [
+            ('foo', '20200101T00Z', 'succeeded', {'x': 'hello'}),
+            ('bar', '20200101T00Z', 'running', {}),
+            ('foo', '20200102T00Z', 'failed', {})]:
+        dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {'name': name, 'cycle': cycle, 'status': status})
+        dao.add_insert_item(
+            CylcSuiteDAO.TABLE_TASK_OUTPUTS,
+            {'name': name, 'cycle': cycle, 'outputs': json.dumps(outputs)})
+    dao.execute_queued_items()
+    yield str(tmp_path), dao
+    dao.close()
+
+
+def call(service, *args_list):
+    """Put calls of suite_state(*args, **kwargs) to the service.
+
+    Return the contexts of the calls, once all are called back.
+    """
+    ctxs = []
+    done = []
+    for args, kwargs in args_list:
+        ctx = SubFuncContext('label', 'suite_state', args, kwargs)
+        ctxs.append(ctx)
+        service.put_command(ctx, done.append)
+    timeout = time() + 10.0
+    while len(done) < len(ctxs) and time() < timeout:
+        service.process()
+        sleep(0.01)
+    assert sorted(map(id, done)) == sorted(map(id, ctxs))
+    assert not service.is_not_done()
+    return ctxs
+
+
+def test_suite_state(service, other):
+    """Test calls are answered as by the suite_state function."""
+    rund = other[0]
+    foo, bar, succeed, message, offset, no_task, no_suite, bad = call(
+        service,
+        (['other', 'foo', '20200101T0000Z'], {'cylc_run_dir': rund}),
+        (['other', 'bar', '20200101T0000Z'], {'cylc_run_dir': rund}),
+        (['other', 'bar', '20200101T0000Z'],
+         {'cylc_run_dir': rund, 'status': 'start'}),
+        (['other', 'foo', '20200101T0000Z'],
+         {'cylc_run_dir': rund, 'message': 'hello'}),
+        (['other', 'foo', '20200101T0000Z'],
+         {'cylc_run_dir': rund, 'offset': 'P1D', 'status': 'fail'}),
+        (['other', 'baz', '20200101T0000Z'], {'cylc_run_dir': rund}),
+        (['nothing', 'foo', '20200101T0000Z'], {'cylc_run_dir': rund}),
+        (['other'], {'cylc_run_dir': rund}))
+    assert json.loads(foo.out) == [True, {
+        'suite': 'other',
+        'task': 'foo',
+        'point': '20200101T00Z',
+        'offset': None,
+        'status': 'succeeded',
+        'message': None,
+        'cylc_run_dir': rund}]
+    assert json.loads(bar.out)[0] is False
+    assert json.loads(succeed.out)[0] is True
+    assert json.loads(message.out)[0] is True
+    assert json.loads(offset.out)[0] is True
+    assert json.loads(offset.out)[1]['point'] == '20200102T00Z'
+    assert json.loads(no_task.out)[0] is False
+    assert json.loads(no_suite.out) == [False, None]
+    assert bad.ret_code == 1
+    assert bad.out is None
+
+
+def test_suite_state_cached(service, other):
+    """Test the DB is only read again if modified, or for new cycles."""
+    rund, dao = other
+    with patch(
+        'cylc.flow.suite_state_service.CylcSuiteDBChecker.select_cycles',
+        autospec=True, side_effect=CylcSuiteDBChecker.select_cycles,
+    ) as select_cycles:
+        ctx, = call(service, (['other', 'bar', '20200101T00Z'], {
+            'cylc_run_dir': rund, 'status': 'succeeded'}))
+        assert json.loads(ctx.out)[0] is False
+        ctx, = call(service, (['other', 'foo', '20200101T00Z'], {
+            'cylc_run_dir': rund}))
+        assert json.loads(ctx.out)[0] is True
+        assert select_cycles.call_count == 1
+        call(service, (['other', 'foo', '20200102T00Z'], {
+            'cylc_run_dir': rund}))
+        assert select_cycles.call_count == 2
+        # An update in place, in the same modification time tick.
+        stat = os.stat(dao.db_file_name)
+        dao.add_update_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {'status': 'succeeded'},
+            {'name': 'bar', 'cycle': '20200101T00Z'})
+        dao.execute_queued_items()
+        os.utime(dao.db_file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(dao.db_file_name).st_size == stat.st_size
+        ctx, = call(service, (['other', 'bar', '20200101T00Z'], {
+            'cylc_run_dir': rund, 'status': 'succeeded'}))
+        assert json.loads(ctx.out)[0] is True
+        assert select_cycles.call_count == 3
+
+
+def test_get_stamp_wal(tmp_path):
+    """Test the stamp of a database in WAL mode changes on each commit."""
+    dao = CylcSuiteDAO(
+        str(tmp_path / CylcSuiteDAO.DB_FILE_BASE_NAME), is_persistent=True)
+    dao.add_insert_item(
+        CylcSuiteDAO.TABLE_TASK_STATES,
+        {'name': 'foo', 'cycle': '1', 'status': 'waiting'})
+    dao.execute_queued_items()
+    stamps = [SuiteStateService._get_stamp(dao.db_file_name)]
+    for status in ['running', 'succeeded']:
+        dao.add_update_item(
+            CylcSuiteDAO.TABLE_TASK_STATES,
+            {'status': status}, {'name': 'foo', 'cycle': '1'})
+        dao.execute_queued_items()
+        stamps.append(SuiteStateService._get_stamp(dao.db_file_name))
+    assert stamps[0][1] is not None
+    assert len(set(stamps)) == 3
+    dao.close()
+
+
+def test_suite_state_archived(service, other):
+    """Test calls are answered from the archives of the DB too."""
+    rund, dao = other
+    dao.archive(
+        os.path.join(rund, 'other', 'log', dao.ARCHIVE_DIR_BASE_NAME, '2020'),
+        ['20200101T00Z'])
+    foo, message = call(
+        service,
+        (['other', 'foo', '20200101T00Z'], {'cylc_run_dir': rund}),
+        (['other', 'foo', '20200101T00Z'],
+         {'cylc_run_dir': rund, 'message': 'hello'}))
+    assert json.loads(foo.out)[0] is True
+    assert json.loads(message.out)[0] is True
+    checker = CylcSuiteDBChecker(rund, 'other')
+    assert checker.task_state_met('foo', '20200101T00Z', 'succeeded')
+    assert not list(checker.conn.execute(
+        'SELECT * FROM task_outputs WHERE cycle=="20200101T00Z"'))
+    checker.close()
+
+
+def test_terminate(service, other):
+    """Test calls after terminate are answered as suite stopping."""
+    service.terminate()
+    ctx = SubFuncContext('label', 'suite_state', ['other', 'foo', '1'], {})
+    done = []
+    service.put_command(ctx, done.append)
+    assert done == [ctx]
+    assert ctx.ret_code == SubProcPool.RET_CODE_SUITE_STOPPING
@@ -52,6 +52,26 @@ class TestTaskEventsManager(unittest.TestCase):
         self.assertEqual(1, cylc_log.debug.call_count)
         self.assertTrue(cylc_log.debug.call_args.contains("ls /tmp/123"))
 
+    @mock.patch("cylc.flow.task_events_mgr.LOG")
+    def test_process_messages(self, _):
+        """Test custom outputs and data store messages are batched."""
+        suite_db_mgr = mock.Mock()
+        job_pool = mock.Mock()
+        task_events_manager = TaskEventsManager(
+            None, None, suite_db_mgr, None, job_pool)
+        itask = mock.MagicMock(submit_num=1, point='1')
+        itask.tdef.name = 'foo'
+        itask.tdef.run_mode = 'simulation'
+        itask.state.status = 'running'
+        itask.state.outputs.set_msg_trg_completion.side_effect = (
+            lambda message, **_: message)
+        self.assertEqual([], task_events_manager.process_messages(
+            [(itask, 1, 't1', 'INFO', 'x'), (itask, 1, 't2', 'INFO', 'y')],
+            TaskEventsManager.FLAG_RECEIVED))
+        job_pool.add_job_msgs.assert_called_once_with('1/foo/01', ['x', 'y'])
+        job_pool.add_job_msg.assert_not_called()
+        suite_db_mgr.put_update_task_outputs.assert_called_once_with(itask)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,100 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+from threading import Thread
+
+import pytest
+
+from cylc.flow.task_message import (
+    CYLC_TASK_MESSAGE_RELAY, _relay_messages, record_messages)
+from cylc.flow.task_message_relay import TaskMessageRelay, open_relay_socket
+
+
+class RecordingClient(object):
+    """Record requests, in place of a suite runtime client."""
+
+    instances = []
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.requests = []
+        self.instances.append(self)
+
+    def __call__(self, command, args):
+        self.requests.append((command, args))
+
+
+@pytest.fixture
+def relay(monkeypatch):
+    RecordingClient.instances.clear()
+    monkeypatch.setattr(
+        'cylc.flow.task_message_relay.SuiteRuntimeClient', RecordingClient)
+    sock, path = open_relay_socket()
+    relay = TaskMessageRelay('suite', '1/foo/01', 60.0, sock)
+    thread = Thread(target=relay.run, daemon=True)
+    thread.start()
+    yield relay, path
+    relay.done = True
+    thread.join()
+    shutil.rmtree(os.path.dirname(path))
+
+
+def test_relay_messages(relay):
+    """Test messages are batched until a message that ends the job."""
+    relay, path = relay
+    assert _relay_messages(path, 't2', [['INFO', 'b'], ['INFO', 'c']])
+    assert _relay_messages(path, 't1', [['WARNING', 'a']])
+    assert not RecordingClient.instances
+    assert relay.send_time is not None
+    assert _relay_messages(path, 't3', [['INFO', 'succeeded']])
+    client, = RecordingClient.instances
+    assert client.suite == 'suite'
+    assert client.requests == [
+        ('put_messages', {
+            'task_job': '1/foo/01', 'event_time': 't1',
+            'messages': [['WARNING', 'a']]}),
+        ('put_messages', {
+            'task_job': '1/foo/01', 'event_time': 't2',
+            'messages': [['INFO', 'b'], ['INFO', 'c']]}),
+        ('put_messages', {
+            'task_job': '1/foo/01', 'event_time': 't3',
+            'messages': [['INFO', 'succeeded']]}),
+    ]
+    assert relay.done
+
+
+def test_relay_messages_no_relay(tmp_path):
+    """Test messages are not relayed without a relay."""
+    assert not _relay_messages(str(tmp_path / 'sock'), 't1', [['INFO', 'a']])
+
+
+def test_record_messages_relay(relay, monkeypatch, tmp_path):
+    """Test record_messages writes job status file, and uses the relay."""
+    relay, path = relay
+    monkeypatch.setenv('CYLC_TASK_LOG_ROOT', str(tmp_path / 'job'))
+    monkeypatch.setenv(CYLC_TASK_MESSAGE_RELAY, path)
+    record_messages('suite', '1/foo/01', [['INFO', 'hello']])
+    record_messages('suite', '1/foo/01', [['CRITICAL', 'failed/ERR']])
+    lines = (tmp_path / 'job.status').read_text().splitlines()
+    assert lines[0].endswith('|INFO|hello')
+    assert lines[1] == 'CYLC_JOB_EXIT=ERR'
+    client, = RecordingClient.instances
+    messages = [
+        message
+        for _, args in client.requests for message in args['messages']]
+    assert messages == [['INFO', 'hello'], ['CRITICAL', 'failed/ERR']]
@@ -0,0 +1,325 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from time import time
+from unittest import main
+from unittest.mock import MagicMock
+
+from cylc.flow.cycling.loader import INTEGER_CYCLING_TYPE, get_point
+from cylc.flow.rundb import CylcSuiteDAO
+from cylc.flow.tests.util import CylcWorkflowTestCase
+from cylc.flow.task_state import (
+    TASK_STATUS_EXPIRED, TASK_STATUS_RUNNING, TASK_STATUS_SUCCEEDED,
+    TASK_STATUS_WAITING)
+
+
+def int_point(value):
+    return get_point(value, cycling_type=INTEGER_CYCLING_TYPE)
+
+
+class TestTaskPoolDependencies(CylcWorkflowTestCase):
+
+    suite_name = "deps"
+    suiterc = """
+[scheduling]
+    cycling mode = integer
+    initial cycle point = 1
+    final cycle point = 1
+    [[graph]]
+        R1 = "foo => bar & baz"
+    """
+
+    def setUp(self) -> None:
+        super(TestTaskPoolDependencies, self).setUp()
+        warnings = self.task_pool.insert_tasks(
+            items=['1/foo', '1/bar', '1/baz'], stopcp=None)
+        assert 0 == warnings
+        self.task_pool.release_runahead_tasks()
+        self.itasks = {
+            itask.tdef.name: itask for itask in self.task_pool.get_tasks()}
+
+    def test_index(self):
+        """Test that the main pool prerequisites are indexed."""
+        self.assertEqual(
+            {('foo', '1', TASK_STATUS_SUCCEEDED)},
+            set(self.task_pool.output_dependents))
+        self.assertEqual(
+            {'bar.1', 'baz.1'},
+            set(self.task_pool.output_dependents[
+                ('foo', '1', TASK_STATUS_SUCCEEDED)]))
+
+    def test_match_dependencies(self):
+        """Test that only dependents of changed outputs are satisfied."""
+        self.task_pool.match_dependencies()
+        for name in ('bar', 'baz'):
+            self.assertFalse(
+                self.itasks[name].state.prerequisites_are_all_satisfied())
+        self.assertFalse(self.task_pool._dep_changed_tasks)
+
+        self.itasks['foo'].state.reset(TASK_STATUS_SUCCEEDED)
+        self.assertEqual(
+            ['foo.1'], list(self.task_pool._dep_changed_tasks))
+        self.task_pool.match_dependencies()
+        for name in ('bar', 'baz'):
+            self.assertTrue(
+                self.itasks[name].state.prerequisites_are_all_satisfied())
+
+    def test_match_dependencies_after_reset(self):
+        """Test re-satisfying prerequisites reset by a reset to waiting."""
+        self.itasks['foo'].state.reset(TASK_STATUS_SUCCEEDED)
+        self.task_pool.match_dependencies()
+        bar = self.itasks['bar']
+        bar.state.reset(TASK_STATUS_SUCCEEDED)
+        bar.state.reset(TASK_STATUS_WAITING)
+        self.assertFalse(bar.state.prerequisites_are_all_satisfied())
+        self.task_pool.match_dependencies()
+        self.assertTrue(bar.state.prerequisites_are_all_satisfied())
+
+    def test_remove(self):
+        """Test that removed tasks are removed from the index."""
+        self.itasks['foo'].state.reset(TASK_STATUS_SUCCEEDED)
+        self.task_pool.match_dependencies()
+        self.assertIn(
+            ('foo', '1', TASK_STATUS_SUCCEEDED),
+            self.task_pool.completed_outputs)
+        self.task_pool.remove(self.itasks['foo'])
+        self.task_pool.remove(self.itasks['bar'])
+        self.assertNotIn(
+            ('foo', '1', TASK_STATUS_SUCCEEDED),
+            self.task_pool.completed_outputs)
+        self.assertEqual(
+            {'baz.1'},
+            set(self.task_pool.output_dependents[
+                ('foo', '1', TASK_STATUS_SUCCEEDED)]))
+
+    def test_get_pool_task(self):
+        """Test that tasks in the main pool are found by ID."""
+        self.assertIs(
+            self.itasks['foo'], self.task_pool.get_pool_task('foo.1'))
+        self.task_pool.remove(self.itasks['foo'])
+        self.assertIsNone(self.task_pool.get_pool_task('foo.1'))
+        self.assertIsNone(self.task_pool.get_pool_task('qux.1'))
+
+
+class TestTaskPoolRunahead(CylcWorkflowTestCase):
+
+    suite_name = "runahead"
+    suiterc = """
+[scheduling]
+    cycling mode = integer
+    initial cycle point = 1
+    final cycle point = 10
+    max active cycle points = 3
+    [[graph]]
+        P1 = "foo[-P1] => foo"
+    """
+
+    def setUp(self) -> None:
+        super(TestTaskPoolRunahead, self).setUp()
+        warnings = self.task_pool.insert_tasks(
+            items=['%d/foo' % i for i in range(1, 7)], stopcp=None)
+        assert 0 == warnings
+
+    def get_points(self, pool):
+        return sorted(int(str(point)) for point in pool)
+
+    def test_release_runahead_tasks(self):
+        """Test release up to the max active cycle points."""
+        self.assertEqual(
+            [1, 2, 3, 4, 5, 6], self.get_points(self.task_pool._points))
+        self.assertEqual(
+            [1, 2, 3, 4, 5, 6], self.get_points(self.task_pool._rh_points))
+        self.assertTrue(self.task_pool.release_runahead_tasks())
+        self.assertEqual([1, 2, 3], self.get_points(self.task_pool.pool))
+        self.assertEqual(
+            [4, 5, 6], self.get_points(self.task_pool._rh_points))
+        self.assertFalse(self.task_pool.release_runahead_tasks())
+
+        itasks = {
+            int(str(itask.point)): itask
+            for itask in self.task_pool.get_tasks()}
+        itasks[2].state.reset(TASK_STATUS_SUCCEEDED)
+        self.assertEqual(
+            [1, 3, 4, 5, 6],
+            self.get_points(self.task_pool._unfinished_points))
+        self.assertFalse(self.task_pool.release_runahead_tasks())
+        itasks[1].state.reset(TASK_STATUS_SUCCEEDED)
+        self.assertTrue(self.task_pool.release_runahead_tasks())
+        self.assertEqual(
+            [1, 2, 3, 4, 5], self.get_points(self.task_pool.pool))
+        self.assertEqual([6], self.get_points(self.task_pool._rh_points))
+
+        # Removing and resetting tasks keeps the index up to date.
+        self.task_pool.remove(itasks[1])
+        itasks[2].state.reset(TASK_STATUS_WAITING)
+        self.assertEqual(
+            [2, 3, 4, 5, 6], self.get_points(self.task_pool._points))
+        self.assertEqual(
+            [2, 3, 4, 5, 6],
+            self.get_points(self.task_pool._unfinished_points))
+
+    def test_release_finished_runahead_tasks(self):
+        """Test finished tasks are released from the runahead pool."""
+        itask = self.task_pool.runahead_pool[int_point(6)]['foo.6']
+        itask.state.reset(TASK_STATUS_SUCCEEDED)
+        self.assertEqual(
+            {'foo.6': itask}, self.task_pool._rh_finished_tasks)
+        self.task_pool.release_runahead_tasks()
+        self.assertEqual([1, 2, 3, 6], self.get_points(self.task_pool.pool))
+        self.assertFalse(self.task_pool._rh_finished_tasks)
+
+    def test_get_task_by_id(self):
+        """Test tasks are found by ID in the runahead and main pools."""
+        itask = self.task_pool.runahead_pool[int_point(2)]['foo.2']
+        self.assertIs(itask, self.task_pool.get_task_by_id('foo.2'))
+        self.task_pool.release_runahead_tasks()
+        self.assertNotIn('foo.2', self.task_pool._rh_tasks)
+        self.assertIs(itask, self.task_pool.get_task_by_id('foo.2'))
+        rh_itask = self.task_pool.runahead_pool[int_point(6)]['foo.6']
+        self.task_pool.remove(rh_itask)
+        self.assertEqual(
+            [4, 5], self.get_points(self.task_pool._rh_points))
+        self.assertIsNone(self.task_pool.get_task_by_id('foo.6'))
+        self.assertIsNone(self.task_pool.get_task_by_id('bar.1'))
+
+
+class TestTaskPoolDeadlines(CylcWorkflowTestCase):
+
+    suite_name = "deadlines"
+    suiterc = """
+[scheduling]
+    initial cycle point = 2000
+    final cycle point = 2000
+    [[special tasks]]
+        clock-trigger = foo(PT0S)
+        clock-expire = bar(PT1H)
+    [[graph]]
+        R1 = "foo & bar & baz"
+    """
+
+    def setUp(self) -> None:
+        super(TestTaskPoolDeadlines, self).setUp()
+        warnings = self.task_pool.insert_tasks(
+            items=['2000/foo', '2000/bar', '2000/baz'], stopcp=None)
+        assert 0 == warnings
+        self.task_pool.release_runahead_tasks()
+        self.itasks = {
+            itask.tdef.name: itask for itask in self.task_pool.get_tasks()}
+
+    def test_process_task_deadlines(self):
+        """Test clock triggered and clock expiring tasks are indexed."""
+        deadlines = self.task_pool._task_deadlines
+        self.assertIn(self.itasks['foo'], deadlines)
+        self.assertIn(self.itasks['bar'], deadlines)
+        self.assertNotIn(self.itasks['baz'], deadlines)
+        self.assertEqual(
+            self.itasks['foo'].get_clock_trigger_time(),
+            self.task_pool.get_next_task_deadline())
+
+        # Held tasks are not indexed until released.
+        self.itasks['foo'].state.reset(is_held=True)
+        self.assertNotIn(self.itasks['foo'], deadlines)
+        self.itasks['foo'].state.reset(is_held=False)
+        self.assertIn(self.itasks['foo'], deadlines)
+
+        self.task_pool.task_events_mgr = MagicMock()
+        self.assertTrue(self.task_pool.process_task_deadlines(time()))
+        self.assertTrue(self.itasks['bar'].state(TASK_STATUS_EXPIRED))
+        self.assertFalse(deadlines)
+        self.assertFalse(self.task_pool.process_task_deadlines(time()))
+
+    def test_active_tasks(self):
+        """Test active tasks are indexed."""
+        self.assertEqual([], self.task_pool.get_active_tasks())
+        self.itasks['baz'].state.reset(TASK_STATUS_RUNNING)
+        self.assertEqual(
+            [self.itasks['baz']], self.task_pool.get_active_tasks())
+        self.itasks['baz'].state.reset(TASK_STATUS_SUCCEEDED)
+        self.assertEqual([], self.task_pool.get_active_tasks())
+
+
+class TestTaskPoolInsertArchived(CylcWorkflowTestCase):
+
+    suite_name = "insert-archived"
+    suiterc = """
+[scheduling]
+    cycling mode = integer
+    initial cycle point = 1
+    final cycle point = 10
+    [[graph]]
+        P1 = "foo"
+    """
+
+    def select(self, path, stmt):
+        dao = CylcSuiteDAO(path, is_public=True)
+        try:
+            return list(dao.connect().execute(stmt))
+        finally:
+            dao.close()
+
+    def test_insert_archived(self):
+        """Test a task inserted at an archived cycle carries on its jobs."""
+        mgr = self.suite_db_mgr
+        self.task_pool.insert_tasks(items=['1/foo'], stopcp=None)
+        itask = self.task_pool.get_task_by_id('foo.1')
+        for submit_num in range(1, 4):
+            itask.submit_num = submit_num
+            mgr.put_insert_task_jobs(itask, {'batch_sys_job_id': 'old'})
+        itask.state.time_updated = '2020-01-01T00:00:00Z'
+        mgr.put_task_pool(self.task_pool)
+        self.task_pool.remove(itask)
+        mgr.process_queued_ops()
+        mgr.archive(int_point(5))
+        mgr.process_queued_ops()
+        archive_path = CylcSuiteDAO.get_archive_paths(mgr.pub_path)[0]
+        self.assertFalse(self.select(mgr.pri_path, 'SELECT * FROM task_jobs'))
+
+        # Submit numbers carry on from the archive.
+        self.task_pool.insert_tasks(items=['1/foo'], stopcp=None)
+        itask = self.task_pool.get_task_by_id('foo.1')
+        self.assertEqual(3, itask.submit_num)
+        self.assertEqual(
+            'old',
+            mgr.pri_dao.select_task_job('1', 'foo')['batch_sys_job_id'])
+        itask.submit_num = 4
+        mgr.put_insert_task_jobs(itask, {'batch_sys_job_id': 'new'})
+        itask.state.time_updated = '2020-01-01T00:00:00Z'
+        mgr.put_task_pool(self.task_pool)
+        self.task_pool.remove(itask)
+        mgr.process_queued_ops()
+        self.assertEqual(
+            'new',
+            mgr.pri_dao.select_task_job('1', 'foo')['batch_sys_job_id'])
+
+        # Archived rows are not replaced, on archiving the task again.
+        mgr.archive(int_point(6))
+        mgr.process_queued_ops()
+        self.assertTrue(mgr.pub_writer.flush(10))
+        self.assertEqual(
+            [(1, 'old'), (2, 'old'), (3, 'old'), (4, 'new')],
+            self.select(
+                archive_path,
+                'SELECT submit_num, batch_sys_job_id FROM task_jobs'
+                ' ORDER BY submit_num'))
+        stmt = 'SELECT submit_num FROM task_states'
+        self.assertEqual([(3,)], self.select(archive_path, stmt))
+        # The new task_states row stays in the databases, read first.
+        for path in [mgr.pri_path, mgr.pub_path]:
+            self.assertEqual([(4,)], self.select(path, stmt))
+
+
+if __name__ == '__main__':
+    main()
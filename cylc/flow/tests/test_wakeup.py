@@ -0,0 +1,62 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import signal
+from subprocess import Popen
+from threading import Thread
+
+import pytest
+
+from cylc.flow.wakeup import Wakeup, WakeupQueue
+
+
+@pytest.fixture
+def wakeup():
+    wakeup = Wakeup()
+    yield wakeup
+    wakeup.close()
+
+
+def test_wait(wakeup):
+    """Test that a wait returns when set, else on timeout."""
+    assert not wakeup.wait(0)
+    wakeup.set()
+    wakeup.set()
+    assert wakeup.wait(0)
+    assert not wakeup.wait(0.01)
+
+
+def test_queue_put(wakeup):
+    """Test that putting an item in a queue from a thread sets the wakeup."""
+    queue = WakeupQueue(wakeup)
+    thread = Thread(target=queue.put, args=('foo',))
+    thread.start()
+    assert wakeup.wait(5)
+    thread.join()
+    assert queue.get_nowait() == 'foo'
+
+
+def test_watch_child_exits(wakeup):
+    """Test that a child process exit sets the wakeup."""
+    handler = signal.getsignal(signal.SIGCHLD)
+    wakeup.watch_child_exits()
+    assert wakeup.is_watching_child_exits
+    proc = Popen(['true'])
+    assert wakeup.wait(5)
+    proc.wait()
+    wakeup.close()
+    assert not wakeup.is_watching_child_exits
+    assert signal.getsignal(signal.SIGCHLD) == handler
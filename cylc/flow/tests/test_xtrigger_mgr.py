@@ -14,6 +14,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+from unittest.mock import Mock
+
 import pytest
 
 from cylc.flow.broadcast_mgr import BroadcastMgr
@@ -222,6 +224,48 @@ def test_satisfy_xtrigger(xtrigger_mgr_procpool_broadcast):
     assert len(xtrigger_mgr_procpool_broadcast.active) == 0
 
 
+def test_satisfy_xtrigger_suite_state_service():
+    """Test suite_state calls are queued to the suite state service."""
+    proc_pool = Mock()
+    suite_state_service = Mock()
+    xtrigger_mgr = XtriggerManager(
+        suite="sample_suite",
+        user="john-foo",
+        proc_pool=proc_pool,
+        suite_state_service=suite_state_service,
+        suite_source_dir="fdir")
+    xtrigger_mgr.add_trig("other", SubFuncContext(
+        label="other",
+        func_name="suite_state",
+        func_args=["other", "foo", "%(point)s"],
+        func_kwargs={}
+    ), "fdir")
+    xtrigger_mgr.add_trig("echo", SubFuncContext(
+        label="echo",
+        func_name="echo",
+        func_args=[],
+        func_kwargs={}
+    ), "fdir")
+    tdef = TaskDef(
+        name="foo",
+        rtcfg=None,
+        run_mode="live",
+        start_point=1,
+        spawn_ahead=False
+    )
+    init()
+    sequence = ISO8601Sequence('P1D', '2000')
+    tdef.xtrig_labels[sequence] = ["other", "echo"]
+    itask = TaskProxy(tdef=tdef, start_point=ISO8601Point('2019'))
+    xtrigger_mgr.satisfy_xtriggers(itask)
+    assert len(xtrigger_mgr.active) == 2
+    ctx, callback = suite_state_service.put_command.call_args[0]
+    assert ctx.func_name == "suite_state"
+    assert callback == xtrigger_mgr.callback
+    ctx, callback = proc_pool.put_command.call_args[0]
+    assert ctx.func_name == "echo"
+
+
 def test_collate(xtrigger_mgr):
     """Test that collate properly tallies the totals of current xtriggers."""
     xtrigger_mgr.collate(itasks=[])
@@ -0,0 +1,131 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Deadlines of keyed timers, in a heap."""
+
+from heapq import heapify, heappop, heappush
+from itertools import count
+
+
+class TimerHeap(object):
+    """Deadlines of keyed timers, in a heap.
+
+    Each key has at most one deadline. Setting or removing the deadline of a
+    key leaves its old heap entry in place, to be skipped when it reaches the
+    top of the heap. Stale entries that do not reach the top, e.g. of keys
+    removed with far future deadlines, are dropped when they outnumber the
+    deadlines (see "COMPACT_MIN").
+
+    Examples:
+        >>> timers = TimerHeap()
+        >>> timers.set('foo', 20.0)
+        >>> timers.set('bar', 10.0)
+        >>> timers.set('baz', 30.0)
+        >>> timers.set('foo', 5.0)
+        >>> timers.remove('baz')
+        >>> timers.get_next_deadline()
+        5.0
+        >>> timers.pop_due(15.0)
+        ['foo', 'bar']
+        >>> timers.pop_due(40.0)
+        []
+        >>> len(timers)
+        0
+
+    """
+
+    __slots__ = ['_heap', '_deadlines', '_counter']
+
+    # Rebuild the heap from the deadlines when it has more entries than
+    # twice the number of deadlines plus this.
+    COMPACT_MIN = 64
+
+    def __init__(self):
+        # [(deadline, sequence number, key), ...]
+        self._heap = []
+        # {key: deadline, ...}
+        self._deadlines = {}
+        # Sequence numbers, so keys are never compared.
+        self._counter = count()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def set(self, key, deadline):
+        """Set the deadline of key, in seconds since epoch.
+
+        If deadline is None, remove the deadline of key.
+        """
+        if deadline is None:
+            self.remove(key)
+        elif self._deadlines.get(key) != deadline:
+            self._deadlines[key] = deadline
+            heappush(self._heap, (deadline, next(self._counter), key))
+            self._compact()
+
+    def remove(self, key):
+        """Remove the deadline of key, if any."""
+        if self._deadlines.pop(key, None) is not None:
+            self._compact()
+
+    def get_next_deadline(self):
+        """Return the earliest deadline, or None if there is no deadline."""
+        self._drop_stale()
+        if self._heap:
+            return self._heap[0][0]
+        return None
+
+    def pop_due(self, now):
+        """Remove and return keys with deadlines at or before now.
+
+        Keys are returned in deadline order.
+        """
+        keys = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heappop(self._heap)
+            if self._deadlines.get(key) == deadline:
+                del self._deadlines[key]
+                keys.append(key)
+        return keys
+
+    def _compact(self):
+        """Rebuild the heap from the deadlines, if mostly stale.
+
+        Examples:
+            >>> timers = TimerHeap()
+            >>> for deadline in range(1000):
+            ...     timers.set('foo', float(deadline))
+            >>> len(timers._heap) <= 2 * len(timers) + timers.COMPACT_MIN
+            True
+            >>> timers.pop_due(1000.0)
+            ['foo']
+
+        """
+        if len(self._heap) > 2 * len(self._deadlines) + self.COMPACT_MIN:
+            self._heap = [
+                (deadline, next(self._counter), key)
+                for key, deadline in self._deadlines.items()]
+            heapify(self._heap)
+
+    def _drop_stale(self):
+        """Drop stale entries from the top of the heap."""
+        while self._heap:
+            deadline, _, key = self._heap[0]
+            if self._deadlines.get(key) == deadline:
+                return
+            heappop(self._heap)
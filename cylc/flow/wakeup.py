@@ -0,0 +1,116 @@
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""Wake the suite server main loop on events.
+
+The main loop can wait on a single "Wakeup" object instead of sleeping for a
+fixed interval. The wakeup is set by:
+* Items put in a "WakeupQueue", e.g. by the network server thread.
+* Exits of child processes, e.g. from the subprocess pool, if watched.
+"""
+
+import os
+from queue import Queue
+import select
+import signal
+
+from cylc.flow import LOG
+
+
+class Wakeup(object):
+    """A readiness primitive based on a self-pipe.
+
+    Setting the wakeup writes a byte to the pipe, so it is safe to call from
+    any thread. Signals can write to the same pipe, via
+    "signal.set_wakeup_fd", so a wait also returns on child process exits.
+
+    Attributes:
+        .is_watching_child_exits (bool):
+            True if child process exits set the wakeup.
+    """
+
+    def __init__(self):
+        self._read_fd, self._write_fd = os.pipe()
+        for fd in (self._read_fd, self._write_fd):
+            os.set_blocking(fd, False)
+        self.is_watching_child_exits = False
+        self._prev_sigchld_handler = None
+        self._prev_wakeup_fd = None
+
+    def set(self):
+        """Wake up the waiting thread, or the next wait."""
+        try:
+            os.write(self._write_fd, b'\0')
+        except BlockingIOError:
+            pass  # pipe full, wakeup already pending
+
+    def wait(self, timeout=None):
+        """Wait until set or until timeout, in seconds.
+
+        Return True if set, False on timeout.
+        """
+        if not select.select([self._read_fd], [], [], timeout)[0]:
+            return False
+        try:
+            while os.read(self._read_fd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def watch_child_exits(self):
+        """Set the wakeup when a child process exits.
+
+        This can only be done in the main thread, and replaces any previous
+        wakeup file descriptor of the "signal" module.
+        """
+        try:
+            self._prev_wakeup_fd = signal.set_wakeup_fd(
+                self._write_fd, warn_on_full_buffer=False)
+        except ValueError as exc:
+            LOG.debug('cannot watch child process exits: %s', exc)
+            return
+        # A Python level handler is needed for the wakeup file descriptor to
+        # be written, but it has nothing to do.
+        self._prev_sigchld_handler = signal.signal(
+            signal.SIGCHLD, self._handle_sigchld)
+        self.is_watching_child_exits = True
+
+    def close(self):
+        """Stop watching child process exits, close the pipe."""
+        if self.is_watching_child_exits:
+            signal.signal(signal.SIGCHLD, self._prev_sigchld_handler)
+            signal.set_wakeup_fd(self._prev_wakeup_fd)
+            self.is_watching_child_exits = False
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._write_fd = None
+
+    @staticmethod
+    def _handle_sigchld(signum, frame):
+        """Do nothing, the signal module writes to the wakeup pipe."""
+
+
+class WakeupQueue(Queue):
+    """A queue that sets a wakeup when an item is put in it."""
+
+    def __init__(self, wakeup, maxsize=0):
+        super().__init__(maxsize)
+        self.wakeup = wakeup
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        self.wakeup.set()
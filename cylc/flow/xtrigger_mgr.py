@@ -23,11 +23,14 @@ from typing import List, Tuple, Union
 from cylc.flow import LOG
 import cylc.flow.flags
 from cylc.flow.hostuserutil import get_user
+from cylc.flow.xtriggers.suite_state import suite_state
 from cylc.flow.xtriggers.wall_clock import wall_clock
 
 from cylc.flow.subprocctx import SubFuncContext
 from cylc.flow.broadcast_mgr import BroadcastMgr
+from cylc.flow.func_worker_pool import FuncWorkerPool
 from cylc.flow.subprocpool import SubProcPool
+from cylc.flow.suite_state_service import SuiteStateService
 from cylc.flow.task_proxy import TaskProxy
 from cylc.flow.subprocpool import get_func
 
@@ -120,6 +123,8 @@ class XtriggerManager(object):
         *,  # following must be keyword args
         broadcast_mgr: BroadcastMgr = None,
         proc_pool: SubProcPool = None,
+        func_pool: FuncWorkerPool = None,
+        suite_state_service: SuiteStateService = None,
         suite_run_dir: str = None,
         suite_share_dir: str = None,
         suite_work_dir: str = None,
@@ -132,6 +137,11 @@ class XtriggerManager(object):
             user (str): suite owner
             broadcast_mgr (BroadcastMgr): the Broadcast Manager
             proc_pool (SubProcPool): pool of Subprocesses
+            func_pool (FuncWorkerPool): pool of function workers, to run
+                xtrigger functions instead of the pool of Subprocesses
+            suite_state_service (SuiteStateService): service to answer
+                calls of the built-in suite_state function, instead of the
+                pools
             suite_run_dir (str): suite run directory
             suite_share_dir (str): suite share directory
             suite_source_dir (str): suite source directory
@@ -160,6 +170,8 @@ class XtriggerManager(object):
             TMPL_DEBUG_MODE: cylc.flow.flags.debug
         }
         self.proc_pool = proc_pool
+        self.func_pool = func_pool
+        self.suite_state_service = suite_state_service
         self.broadcast_mgr = broadcast_mgr
         self.suite_source_dir = suite_source_dir
 
@@ -318,7 +330,16 @@ class XtriggerManager(object):
             self.t_next_call[sig] = now + ctx.intvl
             # Queue to the process pool, and record as active.
             self.active.append(sig)
-            self.proc_pool.put_command(ctx, self.callback)
+            if (
+                    self.suite_state_service is not None and
+                    get_func(ctx.func_name, self.suite_source_dir)
+                    is suite_state
+            ):
+                self.suite_state_service.put_command(ctx, self.callback)
+            elif self.func_pool is not None:
+                self.func_pool.put_command(ctx, self.callback)
+            else:
+                self.proc_pool.put_command(ctx, self.callback)
 
     def collate(self, itasks: List[TaskProxy]):
         """Get list of all current xtrigger signatures.
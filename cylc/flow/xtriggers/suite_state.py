@@ -69,9 +69,7 @@ def suite_state(suite, task, point, offset=None, status='succeeded',
             to this xtrigger (except ``debug``).
 
     """
-    cylc_run_dir = os.path.expandvars(
-        os.path.expanduser(
-            cylc_run_dir or glbl_cfg().get_host_item('run directory')))
+    cylc_run_dir = get_cylc_run_dir(cylc_run_dir)
     if offset is not None:
         point = str(add_offset(point, offset))
     try:
@@ -79,10 +77,7 @@ def suite_state(suite, task, point, offset=None, status='succeeded',
     except (OSError, sqlite3.Error):
         # Failed to connect to DB; target suite may not be started.
         return (False, None)
-    fmt = checker.get_remote_point_format()
-    if fmt:
-        my_parser = TimePointParser()
-        point = str(my_parser.parse(point, dump_format=fmt))
+    point = format_point(point, checker.get_remote_point_format())
     if message is not None:
         satisfied = checker.task_state_met(task, point, message=message)
     else:
@@ -97,3 +92,17 @@ def suite_state(suite, task, point, offset=None, status='succeeded',
         'cylc_run_dir': cylc_run_dir
     }
     return satisfied, results
+
+
+def get_cylc_run_dir(cylc_run_dir=None):
+    """Return the expanded cylc_run_dir, or the configured run directory."""
+    return os.path.expandvars(
+        os.path.expanduser(
+            cylc_run_dir or glbl_cfg().get_host_item('run directory')))
+
+
+def format_point(point, fmt):
+    """Return point in the cycle point format fmt of the target suite."""
+    if fmt:
+        point = str(TimePointParser().parse(point, dump_format=fmt))
+    return point
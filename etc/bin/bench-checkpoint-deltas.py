@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of task pool checkpoints.
+
+Take N_CHECKPOINTS checkpoints of a task pool of N_TASKS tasks, changing
+N_CHANGES tasks between checkpoints, into a private and a public database,
+as full checkpoints and as delta checkpoints. Then time the restart query
+of the task pool of each of the last CylcSuiteDAO.CHECKPOINT_MAX_DELTAS + 1
+checkpoints, a full checkpoint and its chain of deltas, and the checkpoint
+taken on restart.
+
+Usage:
+    bench-checkpoint-deltas.py [N_TASKS [N_CHECKPOINTS [N_CHANGES]]]
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from cylc.flow.rundb import CylcSuiteDAO
+
+N_REPEATS = 5
+
+
+def run(tmp_d, n_tasks, n_checkpoints, n_changes):
+    """Checkpoint, return (checkpoint time, DB bytes, restart time)."""
+    pri_dao = CylcSuiteDAO(os.path.join(tmp_d, 'pri'), is_persistent=True)
+    pub_dao = CylcSuiteDAO(os.path.join(tmp_d, 'pub'), is_public=True)
+    pub_dao.create_tables()
+    conn = pri_dao.connect()
+    conn.executemany(
+        'INSERT INTO task_pool VALUES (?,?,?,?,?)',
+        [('1', 't%d' % i, 0, 'waiting', 0) for i in range(n_tasks)])
+    conn.executemany(
+        'INSERT INTO task_states (name,cycle,submit_num,status)'
+        ' VALUES (?,?,?,?)',
+        [('t%d' % i, '1', 0, 'waiting') for i in range(n_tasks)])
+    conn.commit()
+    checkpoint_time = 0.0
+    for id_ in range(n_checkpoints):
+        conn.executemany(
+            'UPDATE task_pool SET status=? WHERE name==?',
+            [(str(id_), 't%d' % ((id_ * n_changes + i) % n_tasks))
+             for i in range(n_changes)])
+        conn.commit()
+        time0 = time()
+        pri_dao.take_checkpoints('test', other_daos=[pub_dao])
+        pri_dao.execute_queued_items()
+        pub_dao.execute_queued_items()
+        checkpoint_time += time() - time0
+    ids = list(range(
+        n_checkpoints - CylcSuiteDAO.CHECKPOINT_MAX_DELTAS, n_checkpoints + 1))
+    restart_time = 0.0
+    for i in range(N_REPEATS + 1):
+        time0 = time()
+        for id_ in ids:
+            rows = []
+            pri_dao.select_task_pool_for_restart(
+                lambda row_idx, row: rows.append(row), id_)
+            assert len(rows) == n_tasks
+        if i:  # the first round warms the cache
+            restart_time += time() - time0
+    restart_time /= N_REPEATS * len(ids)
+    pri_dao.close()
+    pub_dao.close()
+    # A restart takes a checkpoint with a new DAO.
+    pri_dao = CylcSuiteDAO(os.path.join(tmp_d, 'pri'), is_persistent=True)
+    time0 = time()
+    pri_dao.take_checkpoints('restart')
+    pri_dao.execute_queued_items()
+    restart_checkpoint_time = time() - time0
+    pri_dao.close()
+    return (
+        checkpoint_time / n_checkpoints,
+        os.stat(os.path.join(tmp_d, 'pri')).st_size,
+        restart_time,
+        restart_checkpoint_time,
+        restart_time + restart_checkpoint_time)
+
+
+def main(n_tasks=30000, n_checkpoints=28, n_changes=300):
+    max_deltas = CylcSuiteDAO.CHECKPOINT_MAX_DELTAS
+    results = []
+    for CylcSuiteDAO.CHECKPOINT_MAX_DELTAS in [0, max_deltas]:
+        tmp_d = mkdtemp()
+        try:
+            results.append(run(tmp_d, n_tasks, n_checkpoints, n_changes))
+        finally:
+            rmtree(tmp_d)
+    CylcSuiteDAO.CHECKPOINT_MAX_DELTAS = max_deltas
+    print('%d checkpoints of %d tasks, %d changed between checkpoints' % (
+        n_checkpoints, n_tasks, n_changes))
+    print('%-30s %12s %12s %8s' % ('', 'full', 'delta', 'ratio'))
+    for i, label in enumerate([
+            'checkpoint s (2 DBs)', 'private DB bytes', 'restart query s',
+            'restart checkpoint s', 'restart query + checkpoint s']):
+        print('%-30s %12.4f %12.4f %7.1fx' % (
+            label, results[0][i], results[1][i],
+            results[0][i] / results[1][i]))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
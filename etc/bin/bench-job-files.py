@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of job file writing.
+
+Write N_JOBS job files of N_TASKS tasks in batches of BATCH_SIZE, as a large
+job submission does, with each job file written in full and with job files
+filled in from per-task templates. Report job files written per second.
+
+Usage:
+    bench-job-files.py [N_JOBS [N_TASKS [BATCH_SIZE [CHECK_SYNTAX]]]]
+"""
+
+import os
+import sys
+from tempfile import TemporaryDirectory
+from time import time
+
+from cylc.flow.job_file import JobFileWriter
+
+
+def get_job_conf(name, point):
+    """Return a job_conf for a job of a task with a typical environment."""
+    return {
+        'batch_system_name': 'background',
+        'batch_submit_command_template': None,
+        'dependencies': ['prep.%d' % point],
+        'directives': {},
+        'env-script': '',
+        'environment': dict(
+            ('VAR_%d' % i, '$CYLC_TASK_CYCLE_POINT/%d' % i)
+            for i in range(50)),
+        'err-script': '',
+        'execution_time_limit': None,
+        'exit-script': '',
+        'host': 'localhost',
+        'init-script': '',
+        'job_d': '%d/%s/01' % (point, name),
+        'namespace_hierarchy': ['root', 'MODELS', name],
+        'owner': None,
+        'param_env_tmpl': {},
+        'param_var': {},
+        'post-script': 'echo "done"',
+        'pre-script': 'echo "starting"',
+        'remote_suite_d': None,
+        'script': 'for VAR in ${!VAR_*}; do\n    echo "${VAR}"\ndone',
+        'submit_num': 1,
+        'suite_name': 'bench',
+        'task_id': '%s.%d' % (name, point),
+        'try_num': 1,
+        'uuid_str': 'uuid',
+        'work_d': None,
+    }
+
+
+def write(n_jobs, n_tasks, batch_size, check_syntax, use_templates):
+    """Write job files, return seconds taken."""
+    writer = JobFileWriter()
+    with TemporaryDirectory() as tmp_d:
+        items = []
+        for i in range(n_jobs):
+            name = 'task%d' % (i % n_tasks)
+            point = i // n_tasks
+            items.append((
+                os.path.join(tmp_d, '%s.%d' % (name, point)),
+                get_job_conf(name, point),
+                name if use_templates else None))
+        time0 = time()
+        for i in range(0, n_jobs, batch_size):
+            excs = writer.write_batch(
+                items[i:i + batch_size], check_syntax=check_syntax)
+            assert not any(excs), excs
+        return time() - time0
+
+
+def main(n_jobs=2000, n_tasks=20, batch_size=100, check_syntax=1):
+    os.environ.setdefault('CYLC_SUITE_DEF_PATH', os.getcwd())
+    print('jobs: %d, tasks: %d, batch size: %d, check syntax: %s' % (
+        n_jobs, n_tasks, batch_size, bool(check_syntax)))
+    for label, use_templates in [('full', False), ('template', True)]:
+        seconds = write(
+            n_jobs, n_tasks, batch_size, bool(check_syntax), use_templates)
+        print('%-8s: %.3fs, %.1f job files/s' % (
+            label, seconds, n_jobs / seconds))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
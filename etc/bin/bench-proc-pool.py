@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of a burst of commands in the subprocess pool.
+
+Queue N_COMMANDS short commands at once, as a large job submission does, then
+process the pool as the scheduler main loop does until all are done. Report
+the time taken to drain the pool, with a fixed quick sleep between passes and
+with a wait on child process exits (the event driven main loop).
+
+Usage:
+    bench-proc-pool.py [N_COMMANDS [POOL_SIZE [SLEEP_SECONDS]]]
+"""
+
+import sys
+from time import sleep, time
+
+from cylc.flow.subprocctx import SubProcContext
+from cylc.flow.subprocpool import SubProcPool
+from cylc.flow.wakeup import Wakeup
+
+
+def drain(n_commands, pool_size, wait):
+    """Run a burst of commands in the pool, return (seconds, passes)."""
+    pool = SubProcPool()
+    pool.size = pool_size
+    n_done = []
+    time0 = time()
+    for _ in range(n_commands):
+        pool.put_command(
+            SubProcContext('bench', ['sleep', '0.01']),
+            lambda ctx: n_done.append(ctx.ret_code))
+    n_passes = 0
+    while pool.is_not_done():
+        pool.process()
+        n_passes += 1
+        wait()
+    assert len(n_done) == n_commands
+    return time() - time0, n_passes
+
+
+def main(n_commands=200, pool_size=4, sleep_seconds=0.5):
+    print('commands: %d, pool size: %d' % (n_commands, pool_size))
+    seconds, n_passes = drain(
+        n_commands, pool_size, lambda: sleep(sleep_seconds))
+    print('sleep %.2fs per pass: %.3fs, %d passes, %.1f commands/s' % (
+        sleep_seconds, seconds, n_passes, n_commands / seconds))
+    wakeup = Wakeup()
+    wakeup.watch_child_exits()
+    try:
+        seconds, n_passes = drain(
+            n_commands, pool_size, lambda: wakeup.wait(sleep_seconds))
+    finally:
+        wakeup.close()
+    print('wait on child exits: %.3fs, %d passes, %.1f commands/s' % (
+        seconds, n_passes, n_commands / seconds))
+
+
+if __name__ == '__main__':
+    main(*(float(arg) if i == 2 else int(arg)
+           for i, arg in enumerate(sys.argv[1:])))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of the task pool reload on restart.
+
+Fill the private database of an ensemble suite, "prep => mem<i> => post"
+with N_MEMBERS members, with a task pool of N_CYCLES cycle points of all
+tasks, in a mix of states, with their jobs, outputs and retry timers. Then
+time the reload of the task pool and of its task action timers, as
+"Scheduler.load_tasks_for_restart" does.
+
+Usage:
+    bench-restart.py [N_CYCLES [N_MEMBERS]]
+"""
+
+import json
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from cylc.flow.config import SuiteConfig
+from cylc.flow.job_pool import JobPool
+from cylc.flow.suite_db_mgr import SuiteDatabaseManager
+from cylc.flow.task_events_mgr import TaskEventsManager
+from cylc.flow.task_pool import TaskPool
+
+SUITERC = '''
+[scheduling]
+    cycling mode = integer
+    initial cycle point = 1
+    runahead limit = P%(n_cycles)d
+    [[graph]]
+        P1 = """
+            post[-P1] => prep => MEMBERS
+            MEMBERS:succeed-all => post
+        """
+[runtime]
+    [[MEMBERS]]
+%(members)s
+'''
+STATUSES = ['waiting', 'submitted', 'running', 'succeeded', 'failed']
+TIME = '2020-01-01T00:00:00Z'
+
+
+def fill(dao, n_cycles, names):
+    """Fill the task pool and history tables of dao."""
+    rows = {
+        dao.TABLE_TASK_POOL: [],
+        dao.TABLE_TASK_STATES: [],
+        dao.TABLE_TASK_JOBS: [],
+        dao.TABLE_TASK_OUTPUTS: [],
+        dao.TABLE_TASK_ACTION_TIMERS: [],
+    }
+    for cycle in range(1, n_cycles + 1):
+        cycle = str(cycle)
+        for i, name in enumerate(names):
+            status = STATUSES[i % len(STATUSES)]
+            rows[dao.TABLE_TASK_POOL].append((cycle, name, 1, status, 0))
+            rows[dao.TABLE_TASK_STATES].append(
+                (name, cycle, TIME, TIME, 1, status))
+            rows[dao.TABLE_TASK_JOBS].append(
+                (cycle, name, 1, 0, 1, TIME, TIME, 0, TIME, None, None,
+                 None, 'localhost', 'background', str(i)))
+            rows[dao.TABLE_TASK_OUTPUTS].append((cycle, name, json.dumps(
+                {'submitted': 'submitted', 'started': 'started'})))
+            rows[dao.TABLE_TASK_ACTION_TIMERS].append(
+                (cycle, name, json.dumps(['try_timers', 'retrying']),
+                 json.dumps(None), json.dumps([60.0]), 0, None, None))
+    conn = dao.connect()
+    for table, table_rows in rows.items():
+        conn.executemany(dao.tables[table].get_insert_stmt(), table_rows)
+    conn.commit()
+
+
+def main(n_cycles=300, n_members=98):
+    tmp_d = mkdtemp()
+    try:
+        names = ['prep', 'post'] + ['mem%d' % i for i in range(n_members)]
+        suite_rc = os.path.join(tmp_d, 'suite.rc')
+        with open(suite_rc, 'w') as handle:
+            handle.write(SUITERC % {
+                'n_cycles': n_cycles,
+                'members': '\n'.join(
+                    '    [[%s]]\n        inherit = MEMBERS' % name
+                    for name in names[2:])})
+        config = SuiteConfig('bench', suite_rc)
+        pub_d = os.path.join(tmp_d, 'pub')
+        os.mkdir(pub_d)
+        suite_db_mgr = SuiteDatabaseManager(pri_d=tmp_d, pub_d=pub_d)
+        suite_db_mgr.on_suite_start(is_restart=False)
+        fill(suite_db_mgr.pri_dao, n_cycles, names)
+        job_pool = JobPool('bench', 'me')
+        task_events_mgr = TaskEventsManager(
+            'bench', None, suite_db_mgr, None, job_pool)
+        pool = TaskPool(config, suite_db_mgr, task_events_mgr, job_pool)
+        time0 = time()
+        suite_db_mgr.pri_dao.select_task_pool_for_restart(
+            pool.load_db_task_pool_for_restart)
+        time1 = time()
+        suite_db_mgr.pri_dao.select_task_action_timers(
+            pool.load_db_task_action_timers)
+        time2 = time()
+        n_tasks = len(pool.get_rh_tasks())
+        suite_db_mgr.on_suite_shutdown()
+    finally:
+        rmtree(tmp_d)
+    print('%d tasks (%d cycle points x %d tasks)' % (
+        n_tasks, n_cycles, len(names)))
+    print('%-24s %8.2fs %10.0f tasks/s' % (
+        'task pool', time1 - time0, n_tasks / (time1 - time0)))
+    print('%-24s %8.2fs' % ('task action timers', time2 - time1))
+    print('%-24s %8.2fs' % ('total', time2 - time0))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
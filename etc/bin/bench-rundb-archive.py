@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of the archival of suite run database history.
+
+Fill the private database of a suite with the history of N_CYCLES daily
+cycle points of N_NAMES tasks, and a checkpoint per cycle point, then time
+the restart vacuum and the copy of the private database to the public one,
+before and after archiving all but the last N_KEEP cycle points. Archival is
+done in chunks, over calls to "process_queued_ops", timed one by one.
+
+Usage:
+    bench-rundb-archive.py [N_CYCLES [N_NAMES [N_KEEP]]]
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from cylc.flow.cycling.iso8601 import init
+from cylc.flow.cycling.loader import (
+    ISO8601_CYCLING_TYPE, DefaultCycler, get_interval, get_point)
+from cylc.flow.rundb import CylcSuiteDAO
+from cylc.flow.suite_db_mgr import SuiteDatabaseManager
+
+
+def fill(dao, n_cycles, n_names):
+    """Fill the history and checkpoint tables of dao."""
+    conn = dao.connect()
+    point = get_point('20000101T00Z')
+    interval = get_interval('P1D')
+    for id_ in range(1, n_cycles + 1):
+        cycle = str(point)
+        states, jobs, events, pool = [], [], [], []
+        for i in range(n_names):
+            name = 't%d' % i
+            states.append((name, cycle, cycle, cycle, 1, 'succeeded'))
+            jobs.append(
+                (cycle, name, 1, 0, 1, cycle, cycle, 0, cycle, cycle, None,
+                 0, 'localhost', 'background', str(i)))
+            events.extend(
+                (name, cycle, cycle, 1, event, '')
+                for event in ['submitted', 'started', 'succeeded'])
+            pool.append((id_, cycle, name, 1, 'succeeded', 0))
+        for table, rows in [
+                (dao.TABLE_TASK_STATES, states),
+                (dao.TABLE_TASK_JOBS, jobs),
+                (dao.TABLE_TASK_EVENTS, events),
+                (dao.TABLE_TASK_POOL_CHECKPOINTS, pool),
+                (dao.TABLE_CHECKPOINT_ID, [(id_, cycle, 'restart')])]:
+            conn.executemany(dao.tables[table].get_insert_stmt(), rows)
+        point += interval
+    conn.commit()
+    return point
+
+
+def time_restart(mgr):
+    """Restart mgr, return (DB size, vacuum time, start time).
+
+    On start, the private database is copied to the public database.
+    """
+    time0 = time()
+    mgr.restart_upgrade()
+    time1 = time()
+    mgr.on_suite_start(is_restart=True)
+    time2 = time()
+    return os.stat(mgr.pri_path).st_size, time1 - time0, time2 - time1
+
+
+def main(n_cycles=3650, n_names=100, n_keep=10):
+    init(time_zone='Z')
+    DefaultCycler.TYPE = ISO8601_CYCLING_TYPE
+    tmp_d = mkdtemp()
+    try:
+        mgr = SuiteDatabaseManager(
+            os.path.join(tmp_d, '.service'), os.path.join(tmp_d, 'log'))
+        for path in (mgr.pri_path, mgr.pub_path):
+            os.makedirs(os.path.dirname(path))
+        dao = CylcSuiteDAO(mgr.pri_path)
+        time0 = time()
+        end_point = fill(dao, n_cycles, n_names)
+        dao.close()
+        print('fill %d cycles x %d tasks: %.1fs' % (
+            n_cycles, n_names, time() - time0))
+        before = time_restart(mgr)
+        mgr.archive(end_point - get_interval('P%dD' % n_keep))
+        times = []
+        while not times or mgr._archive_chunks:
+            time0 = time()
+            mgr.process_queued_ops()
+            times.append(time() - time0)
+        print('archive %d cycles: %.1fs in %d calls, max %.3fs a call' % (
+            n_cycles - n_keep, sum(times), len(times), max(times)))
+        mgr.on_suite_shutdown()
+        after = time_restart(mgr)
+        mgr.on_suite_shutdown()
+    finally:
+        rmtree(tmp_d)
+    print('%-24s %12s %12s %8s' % ('', 'full', 'archived', 'ratio'))
+    for i, label in enumerate(
+            ['private DB bytes', 'restart vacuum s', 'start (copy) s']):
+        print('%-24s %12.3f %12.3f %7.1fx' % (
+            label, before[i], after[i], before[i] / after[i]))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
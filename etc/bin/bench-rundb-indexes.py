@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of the secondary indexes of the suite run database.
+
+Fill the task_states, task_jobs, task_events and task_outputs tables of a
+suite run database with a synthetic history of N_ROWS rows each, of N_NAMES
+tasks per cycle, then time the queries of "cylc report-timings", restart,
+and "suite_state" xtriggers and "cylc suite-state" polls, with and without
+the indexes of "CylcSuiteDAO.INDEXES". Each lookup is run N_QUERIES times,
+with different tasks and cycles. Queries of the whole history are run
+N_QUERIES / 10 times.
+
+Usage:
+    bench-rundb-indexes.py [N_ROWS [N_NAMES [N_QUERIES]]]
+"""
+
+import itertools
+import json
+import os
+import random
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+
+from cylc.flow.dbstatecheck import CylcSuiteDBChecker
+from cylc.flow.rundb import CylcSuiteDAO
+
+TIME_FMT = '2020-01-01T%02d:%02d:%02dZ'
+
+
+def fill(dao, n_rows, n_names):
+    """Fill the history tables with n_rows rows each."""
+    conn = dao.connect()
+    rand = random.Random(0)
+    states, jobs, events, outputs = [], [], [], []
+    for i in range(n_rows):
+        cycle, name = str(i // n_names + 1), 't%d' % (i % n_names)
+        # Most jobs succeed, some fail, a few are still going.
+        run_status = rand.choice([0] * 17 + [1] * 2 + [None])
+        status = {0: 'succeeded', 1: 'failed', None: 'running'}[run_status]
+        times = [TIME_FMT % (i % 24, j, i % 60) for j in range(3)]
+        states.append((name, cycle, times[0], times[2], 1, status))
+        jobs.append(
+            (cycle, name, 1, 0, 1, times[0], times[0], 0, times[1],
+             times[2], None, run_status, 'localhost', 'background',
+             str(i)))
+        events.append((name, cycle, times[2], 1, status, ''))
+        outputs.append((cycle, name, json.dumps({status: status})))
+    for table, rows in [
+            (dao.TABLE_TASK_STATES, states),
+            (dao.TABLE_TASK_JOBS, jobs),
+            (dao.TABLE_TASK_EVENTS, events),
+            (dao.TABLE_TASK_OUTPUTS, outputs)]:
+        conn.executemany(dao.tables[table].get_insert_stmt(), rows)
+    conn.commit()
+
+
+def get_queries(dao, checker, n_rows, n_names, n_queries):
+    """Return [(description, function, n_times), ...] of queries to time."""
+    rand = random.Random(1)
+    n_cycles = n_rows // n_names
+    keys = [
+        ('t%d' % rand.randrange(n_names), str(rand.randrange(n_cycles) + 1))
+        for _ in range(n_queries)]
+    next_key = itertools.cycle(keys).__next__
+    conn = dao.connect()
+    # Queries of the whole history are slow, run them less often.
+    n_full = max(1, n_queries // 10)
+    return [
+        ('report-timings: select_task_times',
+         dao.select_task_times, n_full),
+        ('restart: select_task_job_run_times',
+         lambda: dao.select_task_job_run_times(lambda *_: None), n_full),
+        ('suite_state: task, cycle, status',
+         lambda: checker.suite_state_query(*next_key(), 'succeeded'),
+         n_queries),
+        ('suite_state: cycle',
+         lambda: checker.suite_state_query(None, next_key()[1]),
+         n_queries),
+        ('suite_state: task, message',
+         lambda: checker.suite_state_query(
+             next_key()[0], None, message='failed'),
+         n_queries),
+        ('task_events: cycle, name',
+         lambda: conn.execute(
+             'SELECT event, message FROM task_events'
+             ' WHERE cycle==? AND name==?', next_key()[::-1]).fetchall(),
+         n_queries),
+    ]
+
+
+def time_queries(dao, checker, n_rows, n_names, n_queries):
+    """Return {description: mean seconds per query, ...}."""
+    results = {}
+    for description, func, n_times in get_queries(
+            dao, checker, n_rows, n_names, n_queries):
+        func()  # warm up the page cache
+        time0 = time()
+        for _ in range(n_times):
+            func()
+        results[description] = (time() - time0) / n_times
+    return results
+
+
+def main(n_rows=1000000, n_names=100, n_queries=20):
+    tmp_d = mkdtemp()
+    try:
+        log_d = os.path.join(tmp_d, 'bench', 'log')
+        os.makedirs(log_d)
+        dao = CylcSuiteDAO(
+            os.path.join(log_d, CylcSuiteDAO.DB_FILE_BASE_NAME))
+        time0 = time()
+        fill(dao, n_rows, n_names)
+        print('fill %d rows x 4 tables: %.1fs' % (n_rows, time() - time0))
+        checker = CylcSuiteDBChecker(tmp_d, 'bench')
+        with_indexes = time_queries(dao, checker, n_rows, n_names, n_queries)
+        conn = dao.connect()
+        for name in dao.INDEXES:
+            conn.execute('DROP INDEX %s' % name)
+        conn.commit()
+        checker.close()
+        checker = CylcSuiteDBChecker(tmp_d, 'bench')
+        without_indexes = time_queries(
+            dao, checker, n_rows, n_names, n_queries)
+        checker.close()
+        dao.close()
+    finally:
+        rmtree(tmp_d)
+    print('mean seconds per query')
+    print('%-40s %10s %10s %8s' % ('query', 'no index', 'index', 'speedup'))
+    for description, seconds in without_indexes.items():
+        print('%-40s %10.5f %10.5f %7.1fx' % (
+            description, seconds, with_indexes[description],
+            seconds / with_indexes[description]))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
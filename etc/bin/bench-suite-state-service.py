@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of "suite_state" xtrigger calls.
+
+Create the database of an upstream suite with N_NAMES tasks in each of
+N_CYCLES cycles, then time N_POLLS polls of one "suite_state" xtrigger per
+task and cycle, as N_NAMES x N_CYCLES calls of the "suite_state" function,
+and as calls answered by the "SuiteStateService". The upstream database is
+modified between polls, so the service reads it again on each poll.
+
+Usage:
+    bench-suite-state-service.py [N_NAMES [N_CYCLES [N_POLLS]]]
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import sleep, time
+
+from cylc.flow.rundb import CylcSuiteDAO
+from cylc.flow.subprocctx import SubFuncContext
+from cylc.flow.suite_state_service import SuiteStateService
+from cylc.flow.xtriggers.suite_state import suite_state
+
+
+def modify(dao, poll):
+    """Modify the upstream database, by an update in place."""
+    dao.add_update_item(
+        CylcSuiteDAO.TABLE_TASK_STATES,
+        {'status': 'succeeded' if poll % 2 else 'running'},
+        {'name': 't0', 'cycle': '1'})
+    dao.execute_queued_items()
+
+
+def main(n_names=100, n_cycles=5, n_polls=5):
+    tmp_d = mkdtemp()
+    try:
+        log_d = os.path.join(tmp_d, 'upstream', 'log')
+        os.makedirs(log_d)
+        dao = CylcSuiteDAO(
+            os.path.join(log_d, CylcSuiteDAO.DB_FILE_BASE_NAME))
+        for cycle in range(1, n_cycles + 1):
+            for i in range(n_names):
+                dao.add_insert_item(CylcSuiteDAO.TABLE_TASK_STATES, {
+                    'name': 't%d' % i, 'cycle': str(cycle),
+                    'status': 'succeeded' if i % 2 else 'running'})
+        dao.execute_queued_items()
+        calls = [
+            (['upstream', 't%d' % i, str(cycle)], {'cylc_run_dir': tmp_d})
+            for cycle in range(1, n_cycles + 1) for i in range(n_names)]
+
+        time0 = time()
+        for poll in range(n_polls):
+            for args, kwargs in calls:
+                suite_state(*args, **kwargs)
+            modify(dao, poll)
+        func_time = time() - time0
+
+        service = SuiteStateService()
+        time0 = time()
+        for poll in range(n_polls):
+            done = []
+            for args, kwargs in calls:
+                service.put_command(
+                    SubFuncContext('x', 'suite_state', args, kwargs),
+                    done.append)
+            while len(done) < len(calls):
+                service.process()
+                sleep(0.001)
+            modify(dao, poll)
+        service_time = time() - time0
+        service.terminate()
+        dao.close()
+    finally:
+        rmtree(tmp_d)
+    print('%d polls of %d suite_state xtriggers' % (n_polls, len(calls)))
+    print('%-30s %10.3fs' % ('suite_state function calls', func_time))
+    print('%-30s %10.3fs' % ('SuiteStateService', service_time))
+    print('%-30s %10.1fx' % ('speedup', func_time / service_time))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
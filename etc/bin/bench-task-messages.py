@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of task message processing.
+
+Fill a task pool with N_TASKS tasks, then process N_MESSAGES progress
+messages for N_ACTIVE of them in bursts of BURST_SIZE, as received from
+jobs, and report messages processed per second. Messages are dispatched by
+scanning the pool for each burst, as before, and by task ID in one batch, as
+"Scheduler.process_queued_task_messages" does.
+
+Usage:
+    bench-task-messages.py [N_TASKS [N_MESSAGES [N_ACTIVE [BURST_SIZE]]]]
+"""
+
+import os
+from queue import Queue
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+from types import SimpleNamespace
+
+from cylc.flow.config import SuiteConfig
+from cylc.flow.cycling.loader import get_point
+from cylc.flow.job_pool import JobPool
+from cylc.flow.scheduler import Scheduler
+from cylc.flow.suite_db_mgr import SuiteDatabaseManager
+from cylc.flow.task_events_mgr import TaskEventsManager
+from cylc.flow.task_id import TaskID
+from cylc.flow.task_pool import TaskPool
+from cylc.flow.task_proxy import TaskProxy
+
+SUITERC = """
+[scheduling]
+    cycling mode = integer
+    initial cycle point = 1
+    runahead limit = P%(n_tasks)d
+    [[graph]]
+        P1 = foo
+"""
+
+
+def get_schd(tmp_d, n_tasks):
+    """Return the parts of a scheduler that process task messages."""
+    suite_rc = os.path.join(tmp_d, 'suite.rc')
+    with open(suite_rc, 'w') as handle:
+        handle.write(SUITERC % {'n_tasks': n_tasks})
+    config = SuiteConfig('bench', suite_rc)
+    pub_d = os.path.join(tmp_d, 'pub')
+    os.mkdir(pub_d)
+    suite_db_mgr = SuiteDatabaseManager(pri_d=tmp_d, pub_d=pub_d)
+    suite_db_mgr.on_suite_start(is_restart=False)
+    job_pool = JobPool('bench', 'me')
+    task_events_mgr = TaskEventsManager(
+        'bench', None, suite_db_mgr, None, job_pool)
+    pool = TaskPool(config, suite_db_mgr, task_events_mgr, job_pool)
+    tdef = config.get_taskdef('foo')
+    for i in range(1, n_tasks + 1):
+        itask = TaskProxy(tdef, get_point(str(i)), submit_num=1)
+        pool.add_to_runahead_pool(itask, is_new=False)
+        pool.release_runahead_task(itask)
+    return SimpleNamespace(
+        job_pool=job_pool,
+        job_status_watcher=None,
+        message_queue=Queue(),
+        pool=pool,
+        suite='bench',
+        suite_db_mgr=suite_db_mgr,
+        task_events_mgr=task_events_mgr,
+        task_job_mgr=SimpleNamespace(poll_task_jobs=lambda *_, **__: None))
+
+
+def process_by_scan(schd):
+    """Dispatch queued messages by scanning the pool, as before."""
+    messages = {}
+    while schd.message_queue.qsize():
+        task_job, event_time, severity, message = (
+            schd.message_queue.get(block=False))
+        schd.message_queue.task_done()
+        cycle, task_name, submit_num = schd.job_pool.parse_job_item(task_job)
+        messages.setdefault(TaskID.get(task_name, cycle), []).append(
+            (submit_num, event_time, severity, message))
+    for itask in schd.pool.get_tasks():
+        message_items = messages.get(itask.identity)
+        if message_items is None:
+            continue
+        for submit_num, event_time, severity, message in message_items:
+            schd.task_events_mgr.process_message(
+                itask, severity, message, event_time,
+                schd.task_events_mgr.FLAG_RECEIVED, submit_num)
+
+
+def run(schd, process, n_messages, n_active, burst_size):
+    """Process messages in bursts, return seconds taken."""
+    seconds = 0.0
+    for i in range(0, n_messages, burst_size):
+        for j in range(i, min(i + burst_size, n_messages)):
+            schd.message_queue.put((
+                '%d/foo/01' % (j % n_active + 1), '2020-01-01T00:00:00Z',
+                'INFO', 'progress %d' % j))
+        time0 = time()
+        process(schd)
+        seconds += time() - time0
+        # Keep the DB and data store work of each burst in its measure.
+        time0 = time()
+        schd.suite_db_mgr.process_queued_ops()
+        schd.job_pool.updates.clear()
+        seconds += time() - time0
+    return seconds
+
+
+def main(n_tasks=10000, n_messages=20000, n_active=1000, burst_size=100):
+    tmp_d = mkdtemp()
+    try:
+        schd = get_schd(tmp_d, n_tasks)
+        print('tasks: %d, messages: %d, active tasks: %d, burst size: %d' % (
+            n_tasks, n_messages, n_active, burst_size))
+        for label, process in [
+            ('scan', process_by_scan),
+            ('by ID', Scheduler.process_queued_task_messages),
+        ]:
+            seconds = run(schd, process, n_messages, n_active, burst_size)
+            print('%-6s: %.3fs, %.1f messages/s' % (
+                label, seconds, n_messages / seconds))
+        schd.suite_db_mgr.on_suite_shutdown()
+    finally:
+        rmtree(tmp_d)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# THIS FILE IS PART OF THE CYLC SUITE ENGINE.
+# Copyright (C) 2008-2019 NIWA & British Crown (Met Office) & Contributors.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Standalone benchmark of task pool persistence in the suite run databases.
+
+Put a synthetic task pool to the private and public databases, as the
+scheduler does on each main loop iteration with changes, and report the
+number of rows written and the time taken per iteration.
+
+Usage:
+    bench-task-pool-db.py [N_TASKS [N_CHANGED [N_ITERATIONS [PERSISTENT]]]]
+
+Set PERSISTENT to 1 to keep a persistent connection to the private database.
+"""
+
+import os
+import sys
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import time
+from types import SimpleNamespace
+
+from cylc.flow.suite_db_mgr import SuiteDatabaseManager
+
+
+def make_itask(name, point):
+    """Return a minimal task proxy for putting to the task pool tables."""
+    return SimpleNamespace(
+        tdef=SimpleNamespace(name=name),
+        point=point,
+        has_spawned=False,
+        state=SimpleNamespace(
+            status='waiting', is_held=False, time_updated=None),
+        timeout=None,
+        poll_timer=None,
+        try_timers={},
+        submit_num=0,
+        get_try_num=lambda: 1)
+
+
+def count_queued_rows(suite_db_mgr):
+    """Return the number of rows queued for writing to each database."""
+    return sum(
+        len(items)
+        for items_map in (
+            suite_db_mgr.db_deletes_map,
+            suite_db_mgr.db_inserts_map,
+            suite_db_mgr.db_updates_map)
+        for items in items_map.values())
+
+
+def main(n_tasks=10000, n_changed=100, n_iterations=20, is_persistent=0):
+    tmp_d = mkdtemp()
+    try:
+        pub_d = os.path.join(tmp_d, 'pub')
+        os.mkdir(pub_d)
+        suite_db_mgr = SuiteDatabaseManager(
+            pri_d=tmp_d, pub_d=pub_d, is_persistent=bool(is_persistent))
+        suite_db_mgr.on_suite_start(is_restart=False)
+        itasks = [make_itask('t%d' % i, '1') for i in range(n_tasks)]
+        pool = SimpleNamespace(get_all_tasks=lambda: itasks)
+        statuses = ['submitted', 'running', 'succeeded']
+        n_rows_list = []
+        times = []
+        for i in range(n_iterations):
+            for itask in itasks[i * n_changed:(i + 1) * n_changed]:
+                itask.state.status = statuses[i % len(statuses)]
+            time0 = time()
+            suite_db_mgr.put_task_pool(pool)
+            n_rows_list.append(count_queued_rows(suite_db_mgr))
+            suite_db_mgr.process_queued_ops()
+            times.append(time() - time0)
+        pub_writer = suite_db_mgr.pub_writer
+        pub_writer.flush()
+        pub_metrics = pub_writer.get_metrics()
+        suite_db_mgr.on_suite_shutdown()
+    finally:
+        rmtree(tmp_d)
+    print('tasks: %d, changed per iteration: %d, persistent: %s' % (
+        n_tasks, n_changed, bool(is_persistent)))
+    print('first iteration: %d rows, %.4fs' % (n_rows_list[0], times[0]))
+    print('later iterations: mean %.1f rows, mean %.4fs' % (
+        sum(n_rows_list[1:]) / (n_iterations - 1),
+        sum(times[1:]) / (n_iterations - 1)))
+    print('(rows are written to both the private and public database)')
+    print('public database writer: %(batches_written)d batches in '
+          '%(commits)d commits, %(write_time).4fs, '
+          'max queue depth %(max_queue_depth)d' % pub_metrics)
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))